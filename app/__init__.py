@@ -0,0 +1,59 @@
+from config import config
+from types import SimpleNamespace
+
+authorizations = {
+    'apiKey': {
+        'type': 'apiKey',
+        'in': 'header',
+        'name': 'Authorization',
+        'description': "Type in the 'Bearer <JWT_TOKEN>' value"
+    }
+}
+
+def create_app(config_name='default'):
+    # Imported here so that importing the package (e.g. app.repositories) does
+    # not pull in Flask or the controllers, and through them the services.
+    from flask import Flask
+    from flask_restx import Api
+    from app.jwt_cache import CachingJWTManager
+    from app.controllers.auth_controller import auth_ns
+    from app.controllers.user_controller import users_ns
+    from app.controllers.todo_controller import todos_ns
+    from app.controllers.metrics_controller import metrics_ns
+    from app.services.container import ServiceContainer
+    from app.repositories.connection_pool import pool_stats
+    from app.cli import register_commands
+
+    app = Flask(__name__)
+    app.config.from_object(config[config_name])
+    # Attribute view of app.config for the factories that read config classes
+    settings = SimpleNamespace(**app.config)
+
+    if app.config['STORAGE_BACKEND'] == 'dynamodb':
+        from app.repositories.dynamodb_models import TodoModel, UserModel, configure_models
+        configure_models(settings)
+        pool_stats.install([UserModel, TodoModel])
+    services = app.extensions['services'] = ServiceContainer(settings)
+    if app.config['STORAGE_BACKEND'] == 'memory' and app.config['MEMORY_SEED_USERS']:
+        from app.services.seed_service import SeedService
+        SeedService(services.user_repo, services.todo_repo).seed(
+            app.config['MEMORY_SEED_USERS'], app.config['MEMORY_SEED_TODOS_PER_USER'], 'password123'
+        )
+
+    api = Api(app, version='1.0', title='User and Todo Management API',
+              description='A simple API for user and todo management with JWT authentication',
+              doc='/swagger-ui',
+              security='apiKey',
+              authorizations=authorizations)
+
+    jwt = CachingJWTManager(app, max_entries=app.config['JWT_VERIFICATION_CACHE_MAX_ENTRIES'])
+    jwt.token_in_blocklist_loader(lambda jwt_header, jwt_payload: services.token_blocklist.is_revoked(jwt_payload))
+
+    # Register Namespaces
+    api.add_namespace(auth_ns)
+    api.add_namespace(users_ns)
+    api.add_namespace(todos_ns)
+    api.add_namespace(metrics_ns)
+
+    register_commands(app)
+    return app
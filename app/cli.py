@@ -0,0 +1,85 @@
+import json
+import click
+from types import SimpleNamespace
+from flask import current_app
+
+from app.services.container import current_services
+from app.services.password_hasher import benchmark_method, recommend_method
+from app.services.seed_service import SEED_PASSWORD_HASH_METHOD, SeedService
+
+@click.command('export-users')
+@click.option('--output', type=click.File('w'), default='-', help='NDJSON output file (default: stdout)')
+@click.option('--segments', type=int, default=None, help='Number of parallel scan segments')
+def export_users(output, segments):
+    '''Streams every user as NDJSON using a parallel table scan.'''
+    total_segments = segments or current_app.config['USER_EXPORT_SCAN_SEGMENTS']
+    count = 0
+    for user in current_services().user_service.iter_all_users(total_segments, current_app.config['USER_EXPORT_PAGE_SIZE']):
+        output.write(json.dumps(user, default=str) + '\n')
+        count += 1
+    click.echo(f"Exported {count} users.", err=True)
+
+@click.command('bench-kdf')
+@click.option('--method', default=None, help='Werkzeug hash method to measure (default: PASSWORD_HASH_METHOD)')
+@click.option('--target-ms', type=float, default=250.0, help='Desired time per hash in milliseconds')
+@click.option('--rounds', type=int, default=5, help='Number of hashes to average over')
+def bench_kdf(method, target_ms, rounds):
+    '''Measures the password KDF on this CPU and recommends a cost.'''
+    method = method or current_app.config['PASSWORD_HASH_METHOD']
+    seconds = benchmark_method(method, rounds)
+    click.echo(f"{method}: {seconds * 1000:.1f} ms per hash (average of {rounds})")
+    recommended = recommend_method(method, seconds, target_ms / 1000)
+    click.echo(f"Recommended PASSWORD_HASH_METHOD for ~{target_ms:.0f} ms: {recommended}")
+
+@click.command('seed-data')
+@click.option('--users', type=int, default=2, help='Number of users to create')
+@click.option('--todos-per-user', type=int, default=3, help='Number of todos for each user')
+@click.option('--password', default='password123', help='Password shared by every seeded user')
+@click.option('--prefix', default='testuser', help='Username prefix; users are named <prefix><n>')
+@click.option('--hash-method', default=SEED_PASSWORD_HASH_METHOD, help='Werkzeug hash method for the shared password hash')
+@click.option('--batch-size', type=int, default=1000, help='Users or todos written per add_users/add_todos call')
+def seed_data(users, todos_per_user, password, prefix, hash_method, batch_size):
+    '''Creates synthetic users and todos in the configured storage backend.'''
+    services = current_services()
+    service = SeedService(services.user_repo, services.todo_repo)
+    users_created, todos_created = service.seed(
+        users, todos_per_user, password, prefix=prefix, hash_method=hash_method, batch_size=batch_size,
+        progress=lambda users, todos: click.echo(f"{users} users, {todos} todos", err=True)
+    )
+    click.echo(f"Created {users_created} users and {todos_created} todos.", err=True)
+
+@click.command('provision-tables')
+def provision_tables_command():
+    '''Creates or updates the DynamoDB tables to the configured capacity settings.'''
+    from botocore.exceptions import BotoCoreError, ClientError
+    from pynamodb.exceptions import PynamoDBException
+    from app.repositories.provisioning import provision_tables
+    try:
+        provision_tables(SimpleNamespace(**current_app.config), log=click.echo)
+    except (RuntimeError, ValueError, PynamoDBException, BotoCoreError, ClientError) as e:
+        raise click.ClickException(str(e))
+
+@click.command('reserve-usernames')
+@click.option('--segments', type=int, default=None, help='Number of parallel scan segments')
+def reserve_usernames(segments):
+    '''Backfills username reservation items for users created before they existed.'''
+    user_repo = current_services().user_repo
+    if not hasattr(user_repo, 'reserve_usernames'):
+        raise click.ClickException("Username reservations only exist with STORAGE_BACKEND=dynamodb")
+    if not current_app.config['USERNAME_INDEX_FALLBACK']:
+        click.echo("Run the app with USERNAME_INDEX_FALLBACK=True until this backfill has finished, "
+                   "so users without a reservation can still log in.", err=True)
+    total_segments = segments or current_app.config['USER_EXPORT_SCAN_SEGMENTS']
+    reserved, conflicts = user_repo.reserve_usernames(total_segments, current_app.config['USER_EXPORT_PAGE_SIZE'])
+    for user in conflicts:
+        click.echo(f"Username {user['username']} of user {user['id']} is reserved by another user.", err=True)
+    click.echo(f"Reserved {reserved} usernames, {len(conflicts)} conflicts.", err=True)
+    if not conflicts:
+        click.echo("Every user has a reservation: set USERNAME_INDEX_FALLBACK=False.", err=True)
+
+def register_commands(app):
+    app.cli.add_command(export_users)
+    app.cli.add_command(bench_kdf)
+    app.cli.add_command(seed_data)
+    app.cli.add_command(provision_tables_command)
+    app.cli.add_command(reserve_usernames)
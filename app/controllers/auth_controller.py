@@ -1,29 +1,41 @@
 from flask import request
 from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import create_access_token
-from app.services.user_service import UserService
+from flask_jwt_extended import create_access_token, create_refresh_token, get_jti, get_jwt, get_jwt_identity, jwt_required
+from werkzeug.local import LocalProxy
+from app.services.container import current_services
+from app.services.password_hasher import PasswordHasherBusyError
 
 auth_ns = Namespace('auth', description='Authentication operations')
 
-user_service = UserService()
+# Resolved per request from the application's ServiceContainer
+user_service = LocalProxy(lambda: current_services().user_service)
 
 user_auth_model = auth_ns.model('UserAuth', {
     'username': fields.String(required=True, description='The user username'),
     'password': fields.String(required=True, description='The user password', min_length=6)
 })
 
+token_model = auth_ns.model('Tokens', {
+    'access_token': fields.String(description='Short-lived token for the protected endpoints'),
+    'refresh_token': fields.String(description='Long-lived token for POST /auth/refresh')
+})
+
 @auth_ns.route('/signup')
 class UserSignup(Resource):
     @auth_ns.expect(user_auth_model, validate=True)
     @auth_ns.response(201, 'User successfully created')
     @auth_ns.response(409, 'Username already exists')
+    @auth_ns.response(503, 'Too many concurrent signups or logins, retry later')
     def post(self):
         '''Creates a new user'''
         data = request.json
         username = data['username']
         password = data['password']
 
-        user, error = user_service.signup_user(username, password)
+        try:
+            user, error = user_service.signup_user(username, password)
+        except PasswordHasherBusyError as e:
+            auth_ns.abort(503, str(e))
         if error:
             auth_ns.abort(409, error)
         
@@ -32,17 +44,44 @@ class UserSignup(Resource):
 @auth_ns.route('/login')
 class UserLogin(Resource):
     @auth_ns.expect(user_auth_model, validate=True)
-    @auth_ns.response(200, 'Login successful')
+    @auth_ns.response(200, 'Login successful', token_model)
     @auth_ns.response(401, 'Invalid credentials')
+    @auth_ns.response(503, 'Too many concurrent signups or logins, retry later')
     def post(self):
-        '''Logs in a user and returns an access token'''
+        '''Logs in a user and returns an access token and a refresh token'''
         data = request.json
         username = data['username']
         password = data['password']
 
-        user = user_service.authenticate_user(username, password)
+        try:
+            user = user_service.authenticate_user(username, password)
+        except PasswordHasherBusyError as e:
+            auth_ns.abort(503, str(e))
         if user:
-            access_token = create_access_token(identity=user['id'])
-            return {'access_token': access_token}, 200
+            refresh_token = create_refresh_token(identity=user['id'])
+            # Ties the access token to this login, so logging out with it also revokes the refresh token
+            access_token = create_access_token(identity=user['id'], additional_claims={'refresh_jti': get_jti(refresh_token)})
+            return {'access_token': access_token, 'refresh_token': refresh_token}, 200
         else:
             auth_ns.abort(401, 'Invalid username or password')
+
+@auth_ns.route('/refresh')
+class TokenRefresh(Resource):
+    @auth_ns.doc(security='apiKey')
+    @jwt_required(refresh=True)
+    @auth_ns.response(200, 'New access token issued')
+    @auth_ns.response(401, 'Refresh token missing, expired or revoked')
+    def post(self):
+        '''Issues a new access token for a refresh token, without checking the password again'''
+        access_token = create_access_token(identity=get_jwt_identity(), additional_claims={'refresh_jti': get_jwt()['jti']})
+        return {'access_token': access_token}, 200
+
+@auth_ns.route('/logout')
+class UserLogout(Resource):
+    @auth_ns.doc(security='apiKey')
+    @jwt_required(verify_type=False)
+    @auth_ns.response(204, 'Tokens revoked')
+    def post(self):
+        '''Revokes the refresh token of the login and every access token issued for it'''
+        user_service.revoke_token(get_jwt())
+        return '', 204
@@ -0,0 +1,29 @@
+from flask import current_app
+from flask_restx import Namespace, Resource, fields
+from flask_jwt_extended import jwt_required
+from app.repositories.connection_pool import pool_stats
+from app.services.container import current_services
+
+metrics_ns = Namespace('metrics', description='Runtime metrics of the serving process')
+
+metrics_model = metrics_ns.model('Metrics', {
+    'dynamodb_connections': fields.Raw(description='DynamoDB requests and connection pool misses'),
+    'user_cache': fields.Raw(description='User lookup cache counters'),
+    'todo_list_cache': fields.Raw(description='Todo list page cache counters'),
+    'jwt_verification_cache': fields.Raw(description='Verified token cache counters')
+})
+
+@metrics_ns.route('/')
+class Metrics(Resource):
+    @metrics_ns.doc('get_metrics', security='apiKey')
+    @jwt_required()
+    @metrics_ns.marshal_with(metrics_model)
+    def get(self):
+        '''Counters of the worker process that serves this request'''
+        services = current_services()
+        return {
+            'dynamodb_connections': pool_stats.stats(),
+            'user_cache': services.user_service.get_user_cache_stats(),
+            'todo_list_cache': services.todo_list_cache.stats(),
+            'jwt_verification_cache': current_app.extensions['flask-jwt-extended'].token_cache.stats()
+        }
@@ -0,0 +1,21 @@
+from flask import current_app
+from flask_restx import reqparse
+
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 200
+
+
+def build_pagination_parser():
+    parser = reqparse.RequestParser()
+    parser.add_argument('limit', type=int, location='args', help='Maximum number of items to return')
+    parser.add_argument('cursor', type=str, location='args', help='Opaque cursor returned as next_cursor by the previous page')
+    return parser
+
+
+def resolve_page_limit(requested_limit):
+    # Clamp the client's limit so every request does a bounded amount of work.
+    default_limit = current_app.config.get('PAGINATION_DEFAULT_LIMIT', DEFAULT_PAGE_LIMIT)
+    max_limit = current_app.config.get('PAGINATION_MAX_LIMIT', MAX_PAGE_LIMIT)
+    if requested_limit is None:
+        return min(default_limit, max_limit)
+    return max(1, min(requested_limit, max_limit))
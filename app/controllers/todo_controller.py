@@ -1,11 +1,21 @@
-from flask import request
-from flask_restx import Namespace, Resource, fields
+import csv
+import hashlib
+import io
+import json
+from datetime import datetime
+from flask import request, current_app, make_response, stream_with_context, Response
+from flask_restx import Namespace, Resource, fields, marshal, reqparse
+from jsonschema import Draft4Validator
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.services.todo_service import TodoService
+from werkzeug.local import LocalProxy
+from app.services.container import current_services
+from app.repositories.pagination import InvalidCursorError
+from app.controllers.pagination import build_pagination_parser, resolve_page_limit
 
 todos_ns = Namespace('todos', description='Todo list operations')
 
-todo_service = TodoService()
+# Resolved per request from the application's ServiceContainer
+todo_service = LocalProxy(lambda: current_services().todo_service)
 
 todo_model = todos_ns.model('Todo', {
     'id': fields.String(readOnly=True, description='The unique identifier of a todo'),
@@ -21,15 +31,176 @@ todo_input_model = todos_ns.model('TodoInput', {
     'status': fields.String(description='The status of the todo (e.g., pending, completed)', default='pending')
 })
 
+todo_page_model = todos_ns.model('TodoPage', {
+    'items': fields.List(fields.Nested(todo_model), description='Todos on this page, oldest first'),
+    'next_cursor': fields.String(description='Cursor for the next page; null when there are no more todos')
+})
+
+todo_list_parser = build_pagination_parser()
+
+todo_export_parser = reqparse.RequestParser()
+todo_export_parser.add_argument('format', choices=('ndjson', 'csv'), default='ndjson', location='args',
+                                help='Export format: ndjson (one JSON object per line) or csv')
+
+TODO_EXPORT_FIELDS = ('id', 'user_id', 'description', 'status', 'created_at', 'updated_at')
+TODO_EXPORT_MIMETYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+# Rows are sent in chunks of about this many bytes rather than one write per row.
+TODO_EXPORT_CHUNK_BYTES = 64 * 1024
+
+def _export_row(todo):
+    return [
+        value.isoformat() if isinstance(value, datetime) else value
+        for value in (todo.get(field) for field in TODO_EXPORT_FIELDS)
+    ]
+
+# Spreadsheets evaluate cells starting with these as formulas, so the CSV export
+# prefixes them with a quote (CSV injection). Cells that already start with a
+# quote get one too, so the CSV import can always strip exactly one.
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+CSV_ESCAPED_PREFIXES = CSV_FORMULA_PREFIXES + ("'",)
+
+def _csv_cell(value):
+    if isinstance(value, str) and value.startswith(CSV_ESCAPED_PREFIXES):
+        return "'" + value
+    return value
+
+def _csv_value(cell):
+    if cell.startswith("'") and cell[1:].startswith(CSV_ESCAPED_PREFIXES):
+        return cell[1:]
+    return cell
+
+def _ndjson_lines(todos):
+    for todo in todos:
+        yield json.dumps(dict(zip(TODO_EXPORT_FIELDS, _export_row(todo))), ensure_ascii=False) + '\n'
+
+def _csv_lines(todos):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(TODO_EXPORT_FIELDS)
+    for todo in todos:
+        writer.writerow([_csv_cell(value) for value in _export_row(todo)])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def _chunked(lines, chunk_bytes=TODO_EXPORT_CHUNK_BYTES):
+    chunk = []
+    size = 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            yield ''.join(chunk).encode('utf-8')
+            chunk = []
+            size = 0
+    if chunk:
+        yield ''.join(chunk).encode('utf-8')
+
+todo_import_parser = reqparse.RequestParser()
+todo_import_parser.add_argument('format', choices=('ndjson', 'csv'), location='args',
+                                help='Upload format; defaults to csv for a text/csv body, otherwise ndjson')
+
+# Every imported row is checked against the same schema POST /todos/ validates with.
+todo_input_validator = Draft4Validator(todo_input_model.__schema__)
+
+def _import_item(line, item):
+    error = next(todo_input_validator.iter_errors(item), None)
+    if error is not None:
+        return line, None, error.message
+    return line, item, None
+
+def _ndjson_rows(stream):
+    # Reads the body one line at a time, so only the current row is in memory.
+    for line, raw in enumerate(stream, start=1):
+        if not raw.strip():
+            continue
+        try:
+            item = json.loads(raw)
+        except ValueError as e:
+            yield line, None, f"Invalid JSON: {e}"
+            continue
+        yield _import_item(line, item)
+
+def _csv_rows(stream):
+    # Columns other than the todo_input_model fields (e.g. the id and timestamps
+    # of an export) are ignored; empty cells count as missing. A body that is
+    # not UTF-8 or not CSV ends the import at the offending line. Cells escaped
+    # by the CSV export are read back unescaped.
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8', newline=''))
+    try:
+        if 'description' not in (reader.fieldnames or ()):
+            yield 1, None, "CSV header must include a description column"
+            return
+        for row in reader:
+            yield _import_item(reader.line_num, {name: _csv_value(row[name]) for name in todo_input_model if row.get(name)})
+    except (csv.Error, UnicodeDecodeError) as e:
+        yield reader.line_num + 1, None, f"Unreadable CSV: {e}"
+
+todo_batch_get_input_model = todos_ns.model('TodoBatchGetInput', {
+    'ids': fields.List(fields.String, required=True, description='The todo identifiers to fetch')
+})
+
+todo_batch_get_model = todos_ns.model('TodoBatchGet', {
+    'items': fields.List(fields.Nested(todo_model), description='Found todos, in request order'),
+    'missing': fields.List(fields.String, description='Requested ids that do not exist or are not yours')
+})
+
+todo_batch_result_model = todos_ns.model('TodoBatchResult', {
+    'index': fields.Integer(description='Position of the item in the request array'),
+    'id': fields.String(description='The id of the created todo, or null if it failed'),
+    'error': fields.String(description='Why the item was not created, or null on success')
+})
+
+todo_batch_response_model = todos_ns.model('TodoBatchResponse', {
+    'created': fields.Integer(description='Number of todos created'),
+    'failed': fields.Integer(description='Number of todos that could not be created'),
+    'results': fields.List(fields.Nested(todo_batch_result_model))
+})
+
 @todos_ns.route('/')
 class TodoList(Resource):
     @todos_ns.doc(security='apiKey')
     @jwt_required()
-    @todos_ns.marshal_list_with(todo_model)
+    @todos_ns.expect(todo_list_parser)
+    @todos_ns.response(200, 'Success', todo_page_model)
+    @todos_ns.response(304, 'Not modified since the ETag given in If-None-Match')
+    @todos_ns.response(400, 'Invalid cursor')
     def get(self):
-        '''Lists all todos for the authenticated user'''
+        '''Lists one page of todos for the authenticated user'''
         current_user_id = get_jwt_identity()
-        return todo_service.get_user_todos(current_user_id)
+        args = todo_list_parser.parse_args()
+        limit = resolve_page_limit(args['limit'])
+        cursor = args['cursor']
+
+        # The ETag changes whenever the user's todos change, so a matching
+        # If-None-Match is answered without touching DynamoDB or marshalling.
+        # Right after a write there is no version yet and so no ETag: the page
+        # may not show the write, and a client must not keep it.
+        version = todo_service.get_todos_version(current_user_id)
+        etag = None
+        if version is not None:
+            etag = hashlib.sha1(f"{current_user_id}:{version}:{limit}:{cursor}".encode('utf-8')).hexdigest()
+            # ETags matches every tag when the header is `*`; only a client
+            # holding this exact ETag has seen the page.
+            if not request.if_none_match.star_tag and request.if_none_match.contains(etag):
+                response = make_response('', 304)
+                response.set_etag(etag)
+                return response
+
+        def serialize(todos, next_cursor):
+            return json.dumps(marshal({'items': todos, 'next_cursor': next_cursor}, todo_page_model))
+
+        try:
+            body = todo_service.get_serialized_todos_page(current_user_id, limit, cursor, version, serialize)
+        except InvalidCursorError as e:
+            todos_ns.abort(400, str(e))
+        response = make_response(body, 200)
+        response.mimetype = 'application/json'
+        if etag:
+            response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
 
     @todos_ns.doc(security='apiKey')
     @jwt_required()
@@ -45,6 +216,107 @@ class TodoList(Resource):
             todos_ns.abort(500, "Failed to create todo item")
         return todo, 201
 
+@todos_ns.route('/batch')
+class TodoBatch(Resource):
+    @todos_ns.doc(security='apiKey')
+    @jwt_required()
+    @todos_ns.expect([todo_input_model], validate=True)
+    @todos_ns.marshal_with(todo_batch_response_model, code=201)
+    @todos_ns.response(400, 'Invalid or too many items')
+    def post(self):
+        '''Creates many todo items for the authenticated user'''
+        current_user_id = get_jwt_identity()
+        items = request.json
+        max_items = current_app.config.get('TODO_BATCH_MAX_ITEMS', 10000)
+        if not isinstance(items, list) or not items:
+            todos_ns.abort(400, "Request body must be a non-empty array of todos")
+        if len(items) > max_items:
+            todos_ns.abort(400, f"A batch may contain at most {max_items} todos")
+
+        results = todo_service.create_todos(
+            current_user_id,
+            items,
+            max_workers=current_app.config.get('TODO_BATCH_WRITE_WORKERS', 4)
+        )
+        failed = sum(1 for result in results if result['error'])
+        return {
+            'created': len(results) - failed,
+            'failed': failed,
+            'results': [{'index': index, **result} for index, result in enumerate(results)]
+        }, 201
+
+@todos_ns.route('/export')
+class TodoExport(Resource):
+    @todos_ns.doc(security='apiKey')
+    @jwt_required()
+    @todos_ns.expect(todo_export_parser)
+    @todos_ns.produces(list(TODO_EXPORT_MIMETYPES.values()))
+    @todos_ns.response(200, 'All todos of the authenticated user, oldest first')
+    @todos_ns.response(400, 'Unknown format')
+    def get(self):
+        '''Streams every todo of the authenticated user as NDJSON or CSV'''
+        current_user_id = get_jwt_identity()
+        export_format = todo_export_parser.parse_args()['format']
+        # The generator pulls one index page at a time while the response is
+        # written, so memory stays flat however many todos the user has. A read
+        # error after the first chunk aborts the transfer instead of ending it
+        # as if the list were complete.
+        todos = todo_service.iter_user_todos(current_user_id, current_app.config.get('TODO_EXPORT_PAGE_SIZE', 1000))
+        lines = _ndjson_lines(todos) if export_format == 'ndjson' else _csv_lines(todos)
+        response = Response(_chunked(lines), mimetype=TODO_EXPORT_MIMETYPES[export_format])
+        response.headers['Content-Disposition'] = f'attachment; filename="todos.{export_format}"'
+        response.headers['Cache-Control'] = 'private, no-store'
+        return response
+
+@todos_ns.route('/import')
+class TodoImport(Resource):
+    @todos_ns.doc(security='apiKey')
+    @jwt_required()
+    @todos_ns.expect(todo_import_parser)
+    @todos_ns.response(200, 'NDJSON stream of error and progress events, ending with a done event')
+    @todos_ns.response(400, 'Unknown format')
+    def post(self):
+        '''Imports todos for the authenticated user from an NDJSON or CSV upload'''
+        current_user_id = get_jwt_identity()
+        import_format = todo_import_parser.parse_args()['format']
+        if import_format is None:
+            import_format = 'csv' if request.mimetype == 'text/csv' else 'ndjson'
+        parse = _ndjson_rows if import_format == 'ndjson' else _csv_rows
+
+        # The body is parsed while the events are being sent, so the request
+        # context has to stay alive for the whole response.
+        events = todo_service.import_todos(
+            current_user_id,
+            parse(request.stream),
+            batch_size=current_app.config.get('TODO_IMPORT_BATCH_SIZE', 1000),
+            max_in_flight=current_app.config.get('TODO_IMPORT_MAX_IN_FLIGHT', 2),
+            max_workers=current_app.config.get('TODO_BATCH_WRITE_WORKERS', 4)
+        )
+        body = stream_with_context(json.dumps(event) + '\n' for event in events)
+        response = Response(body, mimetype='application/x-ndjson')
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+@todos_ns.route('/batch-get')
+class TodoBatchGet(Resource):
+    @todos_ns.doc(security='apiKey')
+    @jwt_required()
+    @todos_ns.expect(todo_batch_get_input_model, validate=True)
+    @todos_ns.marshal_with(todo_batch_get_model)
+    @todos_ns.response(400, 'Too many ids')
+    def post(self):
+        '''Fetches many todos of the authenticated user by id'''
+        current_user_id = get_jwt_identity()
+        todo_ids = request.json['ids']
+        max_ids = current_app.config.get('TODO_BATCH_GET_MAX_IDS', 1000)
+        if len(todo_ids) > max_ids:
+            todos_ns.abort(400, f"At most {max_ids} ids may be requested at once")
+
+        todos = todo_service.get_todos_by_ids(todo_ids, current_user_id)
+        found_ids = {todo['id'] for todo in todos}
+        missing = [todo_id for todo_id in dict.fromkeys(todo_ids) if todo_id not in found_ids]
+        return {'items': todos, 'missing': missing}
+
 @todos_ns.route('/<string:todo_id>')
 @todos_ns.param('todo_id', 'The todo identifier')
 class Todo(Resource):
@@ -1,11 +1,16 @@
 from flask import request
-from flask_restx import Namespace, Resource, fields
+from flask_restx import Namespace, Resource, fields, inputs
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.services.user_service import UserService
+from werkzeug.local import LocalProxy
+from app.services.container import current_services
+from app.services.user_service import UserDeletionError
+from app.repositories.pagination import InvalidCursorError
+from app.controllers.pagination import build_pagination_parser, resolve_page_limit
 
 users_ns = Namespace('users', description='User profile operations')
 
-user_service = UserService()
+# Resolved per request from the application's ServiceContainer
+user_service = LocalProxy(lambda: current_services().user_service)
 
 user_model = users_ns.model('User', {
     'id': fields.String(readOnly=True, description='The unique identifier of a user'),
@@ -20,6 +25,26 @@ user_update_model = users_ns.model('UserUpdate', {
     'email': fields.String(description='The user email')
 })
 
+user_page_model = users_ns.model('UserPage', {
+    'items': fields.List(fields.Nested(user_model), description='Users on this page'),
+    'next_cursor': fields.String(description='Cursor for the next page; null when there are no more users')
+})
+
+user_list_parser = build_pagination_parser()
+
+user_delete_parser = users_ns.parser()
+user_delete_parser.add_argument('background', type=inputs.boolean, location='args', default=False,
+                                help="Delete the user's todos in a background job and return 202 with its id")
+
+deletion_job_model = users_ns.model('DeletionJob', {
+    'id': fields.String(description='The job identifier'),
+    'state': fields.String(description='pending, running, completed or failed'),
+    'progress': fields.Raw(description='Number of todos deleted / failed so far'),
+    'error': fields.String(description='Error message if the job failed'),
+    'created_at': fields.String(description='Timestamp of job creation'),
+    'finished_at': fields.String(description='Timestamp of job completion')
+})
+
 @users_ns.route('/<string:user_id>')
 @users_ns.param('user_id', 'The user identifier')
 class User(Resource):
@@ -45,6 +70,7 @@ class User(Resource):
     @users_ns.expect(user_update_model, validate=True)
     @users_ns.marshal_with(user_model)
     @users_ns.response(404, 'User not found')
+    @users_ns.response(409, 'Username already exists')
     @users_ns.response(403, 'Forbidden: You can only update your own profile')
     def put(self, user_id):
         '''Updates a user given its identifier'''
@@ -53,16 +79,23 @@ class User(Resource):
             users_ns.abort(403, "Forbidden: You can only update your own profile")
 
         data = request.json
-        user = user_service.update_user_profile(user_id, data)
-        if not user:
-            users_ns.abort(404, "User not found")
+        user, error = user_service.update_user_profile(user_id, data)
+        if error == "User not found":
+            users_ns.abort(404, error)
+        if error == "Username already exists":
+            users_ns.abort(409, error)
+        if error:
+            users_ns.abort(500, error)
         
         return user
 
     @users_ns.doc(security='apiKey')
     @jwt_required()
+    @users_ns.expect(user_delete_parser)
     @users_ns.response(204, 'User successfully deleted')
+    @users_ns.response(202, 'The todos and then the user are being deleted in the background; sessions end once the user is gone')
     @users_ns.response(404, 'User not found')
+    @users_ns.response(503, 'Some todos could not be deleted; the user was kept, retry the request')
     @users_ns.response(403, 'Forbidden: You can only delete your own profile')
     def delete(self, user_id):
         '''Deletes a user given its identifier'''
@@ -70,15 +103,53 @@ class User(Resource):
         if user_id != current_user_id:
             users_ns.abort(403, "Forbidden: You can only delete your own profile")
 
-        success = user_service.delete_user(user_id)
+        if user_delete_parser.parse_args()['background']:
+            job_id = user_service.delete_user_in_background(user_id)
+            if not job_id:
+                users_ns.abort(404, "User not found")
+            return {'job_id': job_id}, 202
+
+        try:
+            success = user_service.delete_user(user_id)
+        except UserDeletionError as e:
+            users_ns.abort(503, str(e))
         if not success:
             users_ns.abort(404, "User not found")
         
         return '', 204
 
+@users_ns.route('/<string:user_id>/deletion-jobs/<string:job_id>')
+@users_ns.param('user_id', 'The user identifier')
+@users_ns.param('job_id', 'The background deletion job identifier')
+class UserDeletionJob(Resource):
+    @users_ns.doc(security='apiKey')
+    @jwt_required()
+    @users_ns.marshal_with(deletion_job_model)
+    @users_ns.response(404, 'Job not found')
+    @users_ns.response(403, 'Forbidden: You can only access your own deletion jobs')
+    def get(self, user_id, job_id):
+        '''Fetches the status of a background user deletion job'''
+        current_user_id = get_jwt_identity()
+        if user_id != current_user_id:
+            users_ns.abort(403, "Forbidden: You can only access your own deletion jobs")
+
+        job = user_service.get_deletion_job(job_id)
+        if not job or job['owner_id'] != user_id:
+            users_ns.abort(404, "Job not found")
+
+        return job
+
 @users_ns.route('/')
 class UserList(Resource):
-    @users_ns.marshal_list_with(user_model)
+    @users_ns.expect(user_list_parser)
+    @users_ns.marshal_with(user_page_model)
+    @users_ns.response(400, 'Invalid cursor')
     def get(self):
-        '''Lists all users'''
-        return user_service.get_all_users()
+        '''Lists one page of users'''
+        args = user_list_parser.parse_args()
+        limit = resolve_page_limit(args['limit'])
+        try:
+            users, next_cursor = user_service.get_users_page(limit, args['cursor'])
+        except InvalidCursorError as e:
+            users_ns.abort(400, str(e))
+        return {'items': users, 'next_cursor': next_cursor}
@@ -0,0 +1,79 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask_jwt_extended import JWTManager
+
+
+class VerifiedTokenCache:
+    # Thread-safe LRU of token digest -> verified claims. An entry is only served
+    # until the token's own `exp`, so caching never extends a token's lifetime.
+
+    def __init__(self, max_entries=10000, clock=time.time):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.verifications = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            claims, expires_at = entry
+            if expires_at is not None and expires_at <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return dict(claims)
+
+    def set(self, key, claims):
+        with self._lock:
+            self.verifications += 1
+            if self.max_entries <= 0:
+                return
+            self._entries[key] = (dict(claims), claims.get('exp'))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.verifications = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "verifications": self.verifications
+            }
+
+
+class CachingJWTManager(JWTManager):
+    # JWTManager that verifies each distinct bearer token once: later requests
+    # with the same token reuse its claims instead of decoding it and checking
+    # the HMAC again. Blocklist and user lookups still run on every request.
+    # _decode_jwt_from_config is private to Flask-JWT-Extended; tests/test_jwt_cache.py
+    # fails if an upgrade changes its signature.
+
+    def __init__(self, app=None, max_entries=10000):
+        self.token_cache = VerifiedTokenCache(max_entries)
+        super().__init__(app)
+
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        if csrf_value is not None or allow_expired:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+        key = hashlib.sha256(encoded_token.encode()).digest()
+        claims = self.token_cache.get(key)
+        if claims is None:
+            # Invalid or expired tokens raise here and are never cached
+            claims = super()._decode_jwt_from_config(encoded_token)
+            self.token_cache.set(key, claims)
+        return claims
@@ -0,0 +1,56 @@
+import random
+import time
+
+# DynamoDB accepts at most 25 put/delete requests per BatchWriteItem call.
+BATCH_WRITE_LIMIT = 25
+UNPROCESSED_ITEMS = 'UnprocessedItems'
+PUT_REQUEST = 'PutRequest'
+DELETE_REQUEST = 'DeleteRequest'
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _hash_key_value(key_map, hash_key_name):
+    value = key_map[hash_key_name]
+    if isinstance(value, dict):
+        return next(iter(value.values()))
+    return value
+
+
+def batch_write(model_cls, put_models=(), delete_models=(), max_attempts=5, base_delay=0.05):
+    # Sends one BatchWriteItem (at most BATCH_WRITE_LIMIT requests) and retries
+    # UnprocessedItems with exponential backoff and full jitter. Returns the hash
+    # keys of the requests that were still unprocessed after max_attempts.
+    put_items = [model.serialize() for model in put_models]
+    delete_items = [model._get_keys() for model in delete_models]
+    if len(put_items) + len(delete_items) > BATCH_WRITE_LIMIT:
+        raise ValueError(f"DynamoDB allows a maximum of {BATCH_WRITE_LIMIT} batch operations")
+    if not put_items and not delete_items:
+        return []
+
+    connection = model_cls._get_connection()
+    table_name = model_cls.Meta.table_name
+    hash_key_name = model_cls._hash_key_attribute().attr_name
+
+    attempt = 0
+    while True:
+        data = connection.batch_write_item(put_items=put_items, delete_items=delete_items) or {}
+        unprocessed = data.get(UNPROCESSED_ITEMS, {}).get(table_name)
+        if not unprocessed:
+            return []
+
+        put_items = [request[PUT_REQUEST]['Item'] for request in unprocessed if PUT_REQUEST in request]
+        delete_items = [request[DELETE_REQUEST]['Key'] for request in unprocessed if DELETE_REQUEST in request]
+        attempt += 1
+        if attempt >= max_attempts:
+            return [_hash_key_value(item, hash_key_name) for item in put_items + delete_items]
+        time.sleep(random.uniform(0, base_delay * (2 ** attempt)))
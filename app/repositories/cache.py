@@ -0,0 +1,224 @@
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+
+class TTLCache:
+    # Thread-safe per-process LRU cache whose entries also expire after ttl_seconds.
+    # Values are deep-copied in and out so callers can mutate what they get back.
+
+    def __init__(self, max_entries=10000, ttl_seconds=60, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(value)
+
+    def set(self, key, value):
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (value, self._clock() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Cannot cache value of type {type(value).__name__}")
+
+
+def _decode_value(obj):
+    if "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+class RedisCache:
+    # Shared cache tier on any Redis-protocol server, so entries survive across
+    # Gunicorn workers and nodes. Each process keeps a small near-cache in front
+    # of Redis; every delete is published on a channel and all processes evict
+    # the keys from their near-cache, keeping them coherent. Redis errors are
+    # logged and treated as misses, so callers fall through to the database.
+
+    def __init__(self, client, namespace, ttl_seconds=60, local_cache=None,
+                 channel='cache-invalidations'):
+        import redis
+        self.client = client
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.local_cache = local_cache
+        self.channel = f"{channel}:{namespace}"
+        self._redis_errors = redis.RedisError
+        self._subscriber = None
+        self._subscriber_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        local_cache = self._near_cache()
+        if local_cache is not None:
+            value = local_cache.get(key)
+            if value is not None:
+                self._count(hit=True)
+                return value
+        try:
+            raw = self.client.get(self._redis_key(key))
+        except self._redis_errors as e:
+            print(f"Error reading cache key {key}: {e}")
+            raw = None
+        if raw is None:
+            self._count(hit=False)
+            return None
+        self._count(hit=True)
+        value = json.loads(raw, object_hook=_decode_value)
+        if local_cache is not None:
+            local_cache.set(key, value)
+        return value
+
+    def set(self, key, value):
+        local_cache = self._near_cache()
+        try:
+            self.client.set(self._redis_key(key), json.dumps(value, default=_encode_value), ex=max(1, int(self.ttl_seconds)))
+        except self._redis_errors as e:
+            print(f"Error writing cache key {key}: {e}")
+            return
+        if local_cache is not None:
+            local_cache.set(key, value)
+
+    def delete(self, *keys):
+        if not keys:
+            return
+        if self.local_cache is not None:
+            self.local_cache.delete(*keys)
+        self._ensure_subscribed()
+        try:
+            self.client.delete(*[self._redis_key(key) for key in keys])
+            self.client.publish(self.channel, json.dumps(list(keys)))
+        except self._redis_errors as e:
+            # The entries stay in Redis until their TTL expires
+            print(f"Error invalidating cache keys {list(keys)}: {e}")
+
+    def clear(self):
+        redis_keys = list(self.client.scan_iter(match=f"{self.namespace}:*"))
+        if redis_keys:
+            self.client.delete(*redis_keys)
+        if self.local_cache is not None:
+            self.local_cache.clear()
+        with self._stats_lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "backend": "redis",
+                "local_entries": self.local_cache.stats()["entries"] if self.local_cache is not None else 0,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+    def _redis_key(self, key):
+        return f"{self.namespace}:{key}"
+
+    def _count(self, hit):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _near_cache(self):
+        # The near-cache is only used while this process receives invalidations.
+        if self.local_cache is None or not self._ensure_subscribed():
+            return None
+        return self.local_cache
+
+    def _ensure_subscribed(self):
+        # Subscribes on the first use of the cache (whichever method it is);
+        # returns whether invalidations are being received.
+        if self.local_cache is None or self._subscriber is not None:
+            return self._subscriber is not None
+        with self._subscriber_lock:
+            if self._subscriber is not None:
+                return True
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{self.channel: self._on_invalidation})
+            except self._redis_errors as e:
+                print(f"Error subscribing to {self.channel}: {e}")
+                return False
+            self._subscriber = pubsub.run_in_thread(
+                sleep_time=0.1, daemon=True, exception_handler=self._on_subscriber_error
+            )
+            return True
+
+    def _on_invalidation(self, message):
+        self.local_cache.delete(*json.loads(message['data']))
+
+    def _on_subscriber_error(self, error, pubsub, thread):
+        # Invalidations may have been missed while the connection was down.
+        # PubSub resubscribes when it reconnects on the next poll.
+        print(f"Cache invalidation subscriber error: {error}")
+        self.local_cache.clear()
+        time.sleep(1)
+
+
+def create_cache(config, namespace, max_entries, ttl_seconds, near_cache=True):
+    # Builds the cache backend selected by CACHE_BACKEND in config.py. Without
+    # near_cache every read goes to Redis, for values that change without a delete.
+    if config.CACHE_BACKEND == 'memory':
+        return TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+    if config.CACHE_BACKEND == 'redis':
+        import redis
+        local_cache = None
+        if near_cache and config.CACHE_LOCAL_TTL_SECONDS > 0:
+            local_cache = TTLCache(max_entries=max_entries, ttl_seconds=config.CACHE_LOCAL_TTL_SECONDS)
+        return RedisCache(
+            redis.Redis.from_url(config.CACHE_REDIS_URL),
+            namespace,
+            ttl_seconds=ttl_seconds,
+            local_cache=local_cache
+        )
+    raise ValueError(f"Unknown CACHE_BACKEND: {config.CACHE_BACKEND}")
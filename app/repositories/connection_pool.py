@@ -0,0 +1,85 @@
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+# botocore keeps its HTTP connections in non-blocking urllib3 pools: a request that
+# finds no idle connection does not wait, it opens a new one (TCP + TLS handshake),
+# and that connection is discarded afterwards if the pool is already full. Those
+# pool misses are what this module reports, from the counters urllib3 keeps on
+# each pool (num_requests, num_connections); no logger is touched.
+
+
+class ConnectionPoolStats:
+    # Requests and pool misses per process, summed over the pools of the botocore
+    # clients the installed models have opened. Counters start when a client is
+    # created, so they restart if configure_models replaces the connections, and
+    # reset() moves their start to now (after the warm-up, whose connections are
+    # opened on purpose and are not misses).
+
+    def __init__(self):
+        self._models_lock = threading.Lock()
+        self._models = []
+        self._baselines = weakref.WeakKeyDictionary()
+
+    def install(self, models):
+        with self._models_lock:
+            self._models = [model_cls for model_cls in models if model_cls not in self._models] + self._models
+
+    def reset(self):
+        for pool in self._pools():
+            self._baselines[pool] = (pool.num_requests, pool.num_connections)
+
+    def stats(self):
+        counts = {'requests': 0, 'new_connections': 0}
+        for pool in self._pools():
+            requests, connections = self._baselines.get(pool, (0, 0))
+            counts['requests'] += pool.num_requests - requests
+            counts['new_connections'] += pool.num_connections - connections
+        # Share of requests that could not reuse a pooled connection
+        counts['pool_miss_ratio'] = (
+            round(counts['new_connections'] / counts['requests'], 4) if counts['requests'] else 0.0
+        )
+        return counts
+
+    def _pools(self):
+        with self._models_lock:
+            models = list(self._models)
+        clients = {}
+        for model_cls in models:
+            # Only clients that already exist; reading stats never opens one
+            table_connection = model_cls._connection
+            client = table_connection.connection._client if table_connection is not None else None
+            if client is not None:
+                clients[id(client)] = client
+        for client in clients.values():
+            http_session = client._endpoint.http_session
+            for manager in [http_session._manager, *http_session._proxy_managers.values()]:
+                for key in manager.pools.keys():
+                    pool = manager.pools.get(key)
+                    if pool is not None:
+                        yield pool
+
+
+pool_stats = ConnectionPoolStats()
+
+
+def warm_up_connections(models, connections):
+    # Opens `connections` pooled connections per model by issuing that many
+    # concurrent DescribeTable calls, so the first requests skip the handshakes,
+    # then resets pool_stats so these connections are not counted as misses.
+    # Returns the number of calls that failed; a cold pool is not fatal.
+    if connections < 1:
+        return 0
+
+    def describe(model_cls):
+        try:
+            model_cls.describe_table()
+            return True
+        except Exception as e:
+            print(f"Error warming up connection to {model_cls.Meta.table_name}: {e}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=connections, thread_name_prefix='dynamodb-warm-up') as executor:
+        results = list(executor.map(describe, [model_cls for model_cls in models for _ in range(connections)]))
+    pool_stats.reset()
+    return results.count(False)
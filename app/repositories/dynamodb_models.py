@@ -1,55 +1,45 @@
+from botocore.config import Config
 from pynamodb.models import Model
 from pynamodb.attributes import UnicodeAttribute, UTCDateTimeAttribute
 from pynamodb.indexes import GlobalSecondaryIndex, AllProjection
 from datetime import datetime
 import os
+import threading
 
-from dotenv import load_dotenv
-import sys
-
-print("Starting dynamodb_models.py script...") # Added for debugging
-
-# Add project root to sys.path to allow importing config
-project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-sys.path.append(project_root)
-
-from config import config # Assuming this import works now
-
-print("Config module imported.", flush=True)
-
-# Load environment variables from .env file if not already loaded
-load_dotenv() # Ensure .env is loaded if not already
-
-# Get the current configuration based on FLASK_ENV
-config_name = os.getenv('FLASK_ENV', 'default')
-current_config = config[config_name]
-
-# Ensure AWS credentials and region are set in environment or .env
-if not (current_config.AWS_ACCESS_KEY_ID and             current_config.AWS_SECRET_ACCESS_KEY and             current_config.AWS_REGION):
-        print("Error: AWS credentials and region must be set in .env file.", flush=True)
-        exit(1)
+# Importing this module has no side effects: connection settings and table names
+# are applied by configure_models(), which create_app() calls, or on the first
+# DynamoDB call from the FLASK_ENV configuration.
+_configured = False
+_configure_lock = threading.Lock()
 
 class BaseModel(Model):
+    # Billing mode and capacity units are set by configure_models as well
     class Meta:
-        # Use the region and credentials from config.py
-        region = current_config.AWS_REGION
-        aws_access_key_id = current_config.AWS_ACCESS_KEY_ID
-        aws_secret_access_key = current_config.AWS_SECRET_ACCESS_KEY
-        read_capacity_units = 1
-        write_capacity_units = 1
+        tcp_keepalive = False
+
+    @classmethod
+    def _get_connection(cls):
+        if not _configured:
+            ensure_models_configured()
+        connection = super()._get_connection()
+        # PynamoDB builds the client's botocore Config itself and has no
+        # tcp_keepalive option, so it is set as the default client config of
+        # this thread's botocore session, which create_client merges in.
+        session = connection.connection.session
+        if session.get_default_client_config() is None:
+            session.set_default_client_config(Config(tcp_keepalive=cls.Meta.tcp_keepalive))
+        return connection
 
 class UsernameIndex(GlobalSecondaryIndex):
     class Meta:
         index_name = 'username_index'
-        read_capacity_units = 1
-        write_capacity_units = 1
         projection = AllProjection()
 
     username = UnicodeAttribute(hash_key=True)
 
 class UserModel(BaseModel):
     class Meta(BaseModel.Meta):
-        table_name = current_config.DYNAMODB_USERS_TABLE_NAME
+        table_name = None # Set by configure_models
 
     id = UnicodeAttribute(hash_key=True)
     username = UnicodeAttribute(null=False)
@@ -64,11 +54,27 @@ class UserModel(BaseModel):
         self.updated_at = datetime.now()
         super(UserModel, self).save(*args, **kwargs)
 
+# Hash key prefix of the username reservation items in the users table
+USERNAME_RESERVATION_PREFIX = 'USERNAME#'
+
+class UsernameReservationModel(BaseModel):
+    # One item per taken username, stored in the users table next to the user
+    # items and written in the same transaction, so a conditional put on it
+    # enforces uniqueness and a GetItem on it resolves a username consistently.
+    class Meta(BaseModel.Meta):
+        table_name = None # Set by configure_models
+
+    id = UnicodeAttribute(hash_key=True) # USERNAME#<username>
+    user_id = UnicodeAttribute(null=False)
+
+    @classmethod
+    def _get_connection(cls):
+        # Same table as UserModel, so share its connection pool
+        return UserModel._get_connection()
+
 class TodoUserIdIndex(GlobalSecondaryIndex):
     class Meta:
         index_name = 'user_id_index'
-        read_capacity_units = 1
-        write_capacity_units = 1
         projection = AllProjection()
 
     user_id = UnicodeAttribute(hash_key=True)
@@ -76,7 +82,7 @@ class TodoUserIdIndex(GlobalSecondaryIndex):
 
 class TodoModel(BaseModel):
     class Meta(BaseModel.Meta):
-        table_name = current_config.DYNAMODB_TODOS_TABLE_NAME
+        table_name = None # Set by configure_models
 
     id = UnicodeAttribute(hash_key=True)
     user_id = UnicodeAttribute(null=False)
@@ -91,13 +97,54 @@ class TodoModel(BaseModel):
         self.updated_at = datetime.now()
         super(TodoModel, self).save(*args, **kwargs)
 
-# Optional: Create tables if they don't exist (for development/testing)
+def configure_models(current_config):
+    global _configured
+    with _configure_lock:
+        for model_cls, table_name, capacity_prefix in (
+            (UserModel, current_config.DYNAMODB_USERS_TABLE_NAME, 'DYNAMODB_USERS'),
+            (UsernameReservationModel, current_config.DYNAMODB_USERS_TABLE_NAME, 'DYNAMODB_USERS'),
+            (TodoModel, current_config.DYNAMODB_TODOS_TABLE_NAME, 'DYNAMODB_TODOS')
+        ):
+            model_cls.Meta.table_name = table_name
+            model_cls.Meta.billing_mode = current_config.DYNAMODB_BILLING_MODE
+            _set_capacity(model_cls.Meta, current_config, capacity_prefix)
+            model_cls.Meta.region = current_config.AWS_REGION
+            model_cls.Meta.aws_access_key_id = current_config.AWS_ACCESS_KEY_ID
+            model_cls.Meta.aws_secret_access_key = current_config.AWS_SECRET_ACCESS_KEY
+            model_cls.Meta.host = current_config.DYNAMODB_ENDPOINT_URL
+            model_cls.Meta.max_pool_connections = current_config.DYNAMODB_MAX_POOL_CONNECTIONS
+            model_cls.Meta.max_retry_attempts = current_config.DYNAMODB_MAX_RETRY_ATTEMPTS
+            model_cls.Meta.connect_timeout_seconds = current_config.DYNAMODB_CONNECT_TIMEOUT_SECONDS
+            model_cls.Meta.read_timeout_seconds = current_config.DYNAMODB_READ_TIMEOUT_SECONDS
+            model_cls.Meta.tcp_keepalive = current_config.DYNAMODB_TCP_KEEPALIVE
+            # Drop any connection built with the previous settings
+            model_cls._connection = None
+        _set_capacity(UsernameIndex.Meta, current_config, 'DYNAMODB_USERNAME_INDEX')
+        _set_capacity(TodoUserIdIndex.Meta, current_config, 'DYNAMODB_TODO_USER_INDEX')
+        _configured = True
+
+def _set_capacity(meta, current_config, prefix):
+    meta.read_capacity_units = getattr(current_config, f'{prefix}_READ_CAPACITY_UNITS')
+    meta.write_capacity_units = getattr(current_config, f'{prefix}_WRITE_CAPACITY_UNITS')
+
+def ensure_models_configured(current_config=None):
+    # First-use fallback for code that runs without create_app (scripts, shells).
+    if _configured:
+        return
+    if current_config is None:
+        from config import config
+        current_config = config[os.getenv('FLASK_ENV', 'default')]
+    configure_models(current_config)
+
+# Optional: Create or update tables (for development/testing), same as `flask provision-tables`
 # In production, tables should be created via IaC (e.g., CloudFormation, Terraform)
 if __name__ == '__main__':
-    from pynamodb.exceptions import TableError
+    import sys
 
-    # Ensure environment variables are loaded for config
-    load_dotenv() # Ensure .env is loaded if not already
+    # Run as a script: make the project root importable to load config.py (and .env)
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+    from config import config
+    from app.repositories.provisioning import provision_tables
 
     # Get the current configuration based on FLASK_ENV
     config_name = os.getenv('FLASK_ENV', 'default')
@@ -110,39 +157,9 @@ if __name__ == '__main__':
         print("Error: AWS credentials and region must be set in .env file.", flush=True)
         exit(1)
 
-    # Set the connection details for PynamoDB models directly
-    # This ensures the models use the correct credentials and region when run standalone
-    UserModel.Meta.region = current_config.AWS_REGION
-    UserModel.Meta.aws_access_key_id = current_config.AWS_ACCESS_KEY_ID
-    UserModel.Meta.aws_secret_access_key = current_config.AWS_SECRET_ACCESS_KEY
-    UserModel.Meta.table_name = current_config.DYNAMODB_USERS_TABLE_NAME
-
-    TodoModel.Meta.region = current_config.AWS_REGION
-    TodoModel.Meta.aws_access_key_id = current_config.AWS_ACCESS_KEY_ID
-    TodoModel.Meta.aws_secret_access_key = current_config.AWS_SECRET_ACCESS_KEY
-    TodoModel.Meta.table_name = current_config.DYNAMODB_TODOS_TABLE_NAME
-
-    print(f"Attempting to create tables in region: {current_config.AWS_REGION}", flush=True)
-
-    try:
-        print(f"Checking if table {UserModel.Meta.table_name} exists...", flush=True)
-        if not UserModel.exists():
-            print(f"Creating table: {UserModel.Meta.table_name}...", flush=True)
-            UserModel.create_table(wait=True)
-            print(f"Table {UserModel.Meta.table_name} created.", flush=True)
-        else:
-            print(f"Table {UserModel.Meta.table_name} already exists.", flush=True)
-    except TableError as e:
-        print(f"Error creating table {UserModel.Meta.table_name}: {e}", flush=True)
-        exit(1)
-
+    print(f"Provisioning tables in region: {current_config.AWS_REGION}", flush=True)
     try:
-        if not TodoModel.exists():
-            print(f"Creating table: {TodoModel.Meta.table_name}...", flush=True)
-            TodoModel.create_table(wait=True)
-            print(f"Table {TodoModel.Meta.table_name} created.", flush=True)
-        else:
-            print(f"Table {TodoModel.Meta.table_name} already exists.", flush=True)
-    except TableError as e:
-        print(f"Error creating table {TodoModel.Meta.table_name}: {e}", flush=True)
+        provision_tables(current_config, log=lambda message: print(message, flush=True))
+    except Exception as e:
+        print(f"Error provisioning tables: {e}", flush=True)
         exit(1)
@@ -1,68 +1,148 @@
-# 이 파일은 이제 DynamoDB를 데이터 영속성 계층으로 사용하므로 더 이상 사용되지 않습니다.
-# 사용자 요청에 따라 여기에 유지됩니다.
-
-import uuid
-from datetime import datetime
-from werkzeug.security import generate_password_hash
-
-users_db = {}
-todos_db = {}
-
-def add_dummy_data():
-    global users_db, todos_db
-    users_db.clear()
-    todos_db.clear()
-
-    user1_id = str(uuid.uuid4())
-    users_db[user1_id] = {
-        "id": user1_id,
-        "username": "test",
-        "email": "test1@example.com",
-        "password_hash": generate_password_hash("123456"),
-        "created_at": datetime.now().isoformat(),
-        "updated_at": datetime.now().isoformat()
-    }
-    user2_id = str(uuid.uuid4())
-    users_db[user2_id] = {
-        "id": user2_id,
-        "username": "testuser2",
-        "email": "test2@example.com",
-        "password_hash": generate_password_hash("password123"),
-        "created_at": datetime.now().isoformat(),
-        "updated_at": datetime.now().isoformat()
-    }
-
-    # Add dummy todos for testuser1
-    todo1_id = str(uuid.uuid4())
-    todos_db[todo1_id] = {
-        "id": todo1_id,
-        "user_id": user1_id,
-        "description": "Buy groceries",
-        "status": "pending",
-        "created_at": datetime.now().isoformat(),
-        "updated_at": datetime.now().isoformat()
-    }
-    todo2_id = str(uuid.uuid4())
-    todos_db[todo2_id] = {
-        "id": todo2_id,
-        "user_id": user1_id,
-        "description": "Walk the dog",
-        "status": "completed",
-        "created_at": datetime.now().isoformat(),
-        "updated_at": datetime.now().isoformat()
-    }
-
-    # Add dummy todos for testuser2
-    todo3_id = str(uuid.uuid4())
-    todos_db[todo3_id] = {
-        "id": todo3_id,
-        "user_id": user2_id,
-        "description": "Pay bills",
-        "status": "pending",
-        "created_at": datetime.now().isoformat(),
-        "updated_at": datetime.now().isoformat()
-    }
-    print("Dummy data added to users_db and todos_db.")
-
-# Call dummy data function on startup
-add_dummy_data()
\ No newline at end of file
+# STORAGE_BACKEND=memory 일 때 저장소(repository)가 사용하는 인메모리 데이터베이스입니다.
+# AWS 없이 테스트, CI, 부하 테스트, 단일 노드 배포를 메모리 속도로 실행할 수 있습니다.
+# 데이터베이스는 비어 있는 상태로 시작합니다. 샘플 데이터는 `flask seed-data` 명령으로 넣습니다.
+
+import bisect
+import threading
+
+
+class InMemoryDB:
+    # Dict tables plus the indexes the repositories query: usernames hash to ids,
+    # each user's todos are kept sorted by (created_at, id) like user_id_index, and
+    # user ids are kept sorted for keyset pagination. Every access holds one lock,
+    # so writes are atomic and readers never see a half-updated index.
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._users = {}
+            self._user_ids = []
+            self._usernames = {}
+            self._todos = {}
+            self._user_todos = {}
+
+    # Users
+
+    def get_user(self, user_id):
+        with self._lock:
+            user = self._users.get(user_id)
+            return dict(user) if user else None
+
+    def get_user_by_username(self, username):
+        with self._lock:
+            user_id = self._usernames.get(username)
+            return dict(self._users[user_id]) if user_id else None
+
+    def users_after(self, start_id, limit=None):
+        # Users ordered by id, starting after start_id (None = from the beginning).
+        with self._lock:
+            start = bisect.bisect_right(self._user_ids, start_id) if start_id is not None else 0
+            end = start + limit if limit is not None else len(self._user_ids)
+            return [dict(self._users[user_id]) for user_id in self._user_ids[start:end]]
+
+    def has_users_after(self, start_id):
+        with self._lock:
+            return bisect.bisect_right(self._user_ids, start_id) < len(self._user_ids)
+
+    def insert_user(self, user):
+        # Returns False when the username is already taken.
+        with self._lock:
+            if user['username'] in self._usernames or user['id'] in self._users:
+                return False
+            self._users[user['id']] = dict(user)
+            bisect.insort(self._user_ids, user['id'])
+            self._usernames[user['username']] = user['id']
+            return True
+
+    def update_user(self, user_id, changes):
+        # Returns (user, error) like UserRepository.update_user.
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return None, "User not found"
+            new_username = changes.get('username', user['username'])
+            if self._usernames.get(new_username, user_id) != user_id:
+                return None, "Username already exists"
+            del self._usernames[user['username']]
+            user.update(changes)
+            self._usernames[user['username']] = user_id
+            return dict(user), None
+
+    def replace_password_hash(self, user_id, old_hash, new_hash):
+        # Compare-and-set; returns False when the user is gone or the hash changed.
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None or user['password_hash'] != old_hash:
+                return False
+            user['password_hash'] = new_hash
+            return True
+
+    def delete_user(self, user_id):
+        with self._lock:
+            user = self._users.pop(user_id, None)
+            if user is None:
+                return False
+            del self._user_ids[bisect.bisect_left(self._user_ids, user_id)]
+            del self._usernames[user['username']]
+            return True
+
+    # Todos
+
+    def get_todo(self, todo_id):
+        with self._lock:
+            todo = self._todos.get(todo_id)
+            return dict(todo) if todo else None
+
+    def todos_after(self, user_id, start_key=None, limit=None):
+        # The user's todos ordered by (created_at, id), starting after start_key.
+        with self._lock:
+            index = self._user_todos.get(user_id, [])
+            start = bisect.bisect_right(index, start_key) if start_key is not None else 0
+            end = start + limit if limit is not None else len(index)
+            return [dict(self._todos[todo_id]) for _, todo_id in index[start:end]]
+
+    def has_todos_after(self, user_id, start_key):
+        with self._lock:
+            index = self._user_todos.get(user_id, [])
+            return bisect.bisect_right(index, start_key) < len(index)
+
+    def insert_todos(self, todos):
+        with self._lock:
+            for todo in todos:
+                self._todos[todo['id']] = dict(todo)
+                bisect.insort(self._user_todos.setdefault(todo['user_id'], []), (todo['created_at'], todo['id']))
+
+    def update_todo(self, todo_id, user_id, changes):
+        # Returns the updated todo, or None when it does not exist or belongs to someone else.
+        with self._lock:
+            todo = self._todos.get(todo_id)
+            if todo is None or todo['user_id'] != user_id:
+                return None
+            todo.update(changes)
+            return dict(todo)
+
+    def delete_todo(self, todo_id, user_id):
+        with self._lock:
+            todo = self._todos.get(todo_id)
+            if todo is None or todo['user_id'] != user_id:
+                return False
+            del self._todos[todo_id]
+            index = self._user_todos[user_id]
+            del index[bisect.bisect_left(index, (todo['created_at'], todo_id))]
+            if not index:
+                del self._user_todos[user_id]
+            return True
+
+    def delete_user_todos(self, user_id):
+        with self._lock:
+            index = self._user_todos.pop(user_id, [])
+            for _, todo_id in index:
+                del self._todos[todo_id]
+            return len(index)
+
+
+# Shared by every in-memory repository in the process.
+db = InMemoryDB()
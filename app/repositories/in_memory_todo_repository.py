@@ -0,0 +1,99 @@
+from app.repositories import in_memory_db
+from app.repositories.pagination import InvalidCursorError, encode_cursor, decode_cursor
+from app.repositories.storage import TODO_INDEX_KEY_NAMES, TODO_UPDATABLE_FIELDS
+from datetime import datetime
+import uuid
+
+def _todo_cursor(todo):
+    # Same shape as a user_id_index LastEvaluatedKey, so cursors validate the same way.
+    return encode_cursor({
+        'id': {'S': todo['id']},
+        'user_id': {'S': todo['user_id']},
+        'created_at': {'S': todo['created_at'].isoformat()}
+    })
+
+class InMemoryTodoRepository:
+    # TodoRepository on the in-memory database (STORAGE_BACKEND=memory).
+
+    def __init__(self, db=None):
+        self.db = db or in_memory_db.db
+
+    def get_todos_by_user_id(self, user_id):
+        return self.db.todos_after(user_id)
+
+    def get_todos_page_by_user_id(self, user_id, limit, cursor=None):
+        start_key = decode_cursor(cursor, TODO_INDEX_KEY_NAMES)
+        if start_key:
+            if start_key['user_id'] != {'S': user_id}:
+                raise InvalidCursorError("Cursor does not belong to this user")
+            try:
+                start_key = (datetime.fromisoformat(start_key['created_at']['S']), start_key['id']['S'])
+            except (KeyError, TypeError, ValueError):
+                raise InvalidCursorError("Malformed cursor")
+        todos = self.db.todos_after(user_id, start_key, limit)
+        if not todos or not self.db.has_todos_after(user_id, (todos[-1]['created_at'], todos[-1]['id'])):
+            return todos, None
+        return todos, _todo_cursor(todos[-1])
+
+    def iter_todos_by_user_id(self, user_id, page_size=None):
+        page_size = page_size or 1000
+        start_key = None
+        while True:
+            todos = self.db.todos_after(user_id, start_key, page_size)
+            yield from todos
+            if len(todos) < page_size:
+                return
+            start_key = (todos[-1]['created_at'], todos[-1]['id'])
+
+    def get_todo_by_id(self, todo_id):
+        return self.db.get_todo(todo_id)
+
+    def get_todos_by_ids(self, todo_ids, user_id):
+        todos = []
+        for todo_id in dict.fromkeys(todo_ids):
+            todo = self.db.get_todo(todo_id)
+            if todo and todo['user_id'] == user_id:
+                todos.append(todo)
+        return todos
+
+    def get_todo_by_id_and_user(self, todo_id, user_id):
+        todo = self.db.get_todo(todo_id)
+        if todo and todo['user_id'] == user_id:
+            return todo
+        return None
+
+    def _new_todo(self, todo_data):
+        now = datetime.now()
+        return {
+            "id": str(uuid.uuid4()),
+            "user_id": todo_data['user_id'],
+            "description": todo_data['description'],
+            "status": todo_data['status'],
+            "created_at": now,
+            "updated_at": now
+        }
+
+    def add_todo(self, todo_data):
+        todo = self._new_todo(todo_data)
+        self.db.insert_todos([todo])
+        return dict(todo)
+
+    def add_todos(self, todos_data, max_workers=4):
+        # One locked insert for the whole batch; max_workers is accepted for interface compatibility.
+        todos = [self._new_todo(todo_data) for todo_data in todos_data]
+        self.db.insert_todos(todos)
+        return [{"id": todo['id'], "error": None} for todo in todos]
+
+    def update_todo(self, todo_id, user_id, todo_data):
+        changes = {key: todo_data[key] for key in TODO_UPDATABLE_FIELDS if key in todo_data}
+        changes['updated_at'] = datetime.now()
+        return self.db.update_todo(todo_id, user_id, changes)
+
+    def delete_todo(self, todo_id, user_id):
+        return self.db.delete_todo(todo_id, user_id)
+
+    def delete_todos_by_user_id(self, user_id, max_workers=4, page_size=None, progress=None):
+        deleted = self.db.delete_user_todos(user_id)
+        if progress:
+            progress(deleted=deleted, failed=0)
+        return deleted, []
@@ -0,0 +1,82 @@
+from app.repositories import in_memory_db
+from app.repositories.pagination import InvalidCursorError, encode_cursor, decode_cursor
+from app.repositories.storage import USER_TABLE_KEY_NAMES, USER_UPDATABLE_FIELDS, public_user
+from datetime import datetime
+import uuid
+
+class InMemoryUserRepository:
+    # UserRepository on the in-memory database (STORAGE_BACKEND=memory). Lookups
+    # are dict reads, so there is no user cache in front of it.
+
+    def __init__(self, db=None):
+        self.db = db or in_memory_db.db
+
+    def get_all_users(self):
+        return self.db.users_after(None)
+
+    def get_users_page(self, limit, cursor=None):
+        start_key = decode_cursor(cursor, USER_TABLE_KEY_NAMES)
+        start_id = None
+        if start_key:
+            start_id = start_key['id'].get('S')
+            if not isinstance(start_id, str):
+                raise InvalidCursorError("Malformed cursor")
+        users = [public_user(user) for user in self.db.users_after(start_id, limit)]
+        if not users or not self.db.has_users_after(users[-1]['id']):
+            return users, None
+        return users, encode_cursor({'id': {'S': users[-1]['id']}})
+
+    def iter_all_users(self, total_segments, page_size=None):
+        # Pages through the id index; segments only matter for DynamoDB.
+        page_size = page_size or 1000
+        start_id = None
+        while True:
+            users = self.db.users_after(start_id, page_size)
+            for user in users:
+                yield public_user(user)
+            if len(users) < page_size:
+                return
+            start_id = users[-1]['id']
+
+    def get_user_by_id(self, user_id):
+        return self.db.get_user(user_id)
+
+    def get_user_by_username(self, username):
+        return self.db.get_user_by_username(username)
+
+    def cache_stats(self):
+        return None
+
+    def add_user(self, user_data):
+        now = datetime.now()
+        user = {
+            "id": str(uuid.uuid4()),
+            "username": user_data['username'],
+            "email": user_data['email'],
+            "password_hash": user_data['password_hash'],
+            "created_at": now,
+            "updated_at": now
+        }
+        # The username check and the insert happen under one lock.
+        if not self.db.insert_user(user):
+            return None, "Username already exists"
+        return dict(user), None
+
+    def add_users(self, users_data, max_workers=4):
+        # Inserts are dict writes, so the batch is a plain loop.
+        results = []
+        for user_data in users_data:
+            user, error = self.add_user(user_data)
+            results.append({"id": user['id'] if user else None, "error": error})
+        return results
+
+    def update_user(self, user_id, user_data):
+        changes = {key: user_data[key] for key in USER_UPDATABLE_FIELDS if key in user_data}
+        changes['updated_at'] = datetime.now()
+        return self.db.update_user(user_id, changes)
+
+    def update_password_hash(self, user_id, old_hash, new_hash):
+        return self.db.replace_password_hash(user_id, old_hash, new_hash)
+
+    def delete_user(self, user_id):
+        return self.db.delete_user(user_id)
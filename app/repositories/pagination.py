@@ -0,0 +1,33 @@
+import base64
+import binascii
+import json
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(last_evaluated_key):
+    # DynamoDB's LastEvaluatedKey is handed back to clients as an opaque,
+    # URL-safe token so they never depend on our key schema.
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(last_evaluated_key, separators=(',', ':'), sort_keys=True)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, key_names):
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidCursorError("Malformed cursor")
+
+    if not isinstance(key, dict) or set(key) != set(key_names):
+        raise InvalidCursorError("Malformed cursor")
+    for value in key.values():
+        if not isinstance(value, dict) or len(value) != 1:
+            raise InvalidCursorError("Malformed cursor")
+    return key
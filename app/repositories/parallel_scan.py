@@ -0,0 +1,62 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Sentinel a worker puts on the queue once its segment is exhausted.
+_SEGMENT_DONE = object()
+
+
+def parallel_scan(model_cls, total_segments, page_size=None, attributes_to_get=None, filter_condition=None,
+                  max_buffered_items=1000):
+    # Scans `model_cls` with DynamoDB parallel scan segments, one worker thread per
+    # segment, and yields items as they arrive. The bounded queue applies
+    # back-pressure so a slow consumer never causes the whole table to be buffered.
+    if total_segments < 1:
+        raise ValueError("total_segments must be at least 1")
+
+    results = queue.Queue(maxsize=max_buffered_items)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def scan_segment(segment):
+        try:
+            for model in model_cls.scan(
+                segment=segment,
+                total_segments=total_segments,
+                page_size=page_size,
+                attributes_to_get=attributes_to_get,
+                filter_condition=filter_condition
+            ):
+                if not put(model):
+                    return
+        except Exception as e:
+            put(e)
+        finally:
+            put(_SEGMENT_DONE)
+
+    executor = ThreadPoolExecutor(max_workers=total_segments, thread_name_prefix='parallel-scan')
+    try:
+        for segment in range(total_segments):
+            executor.submit(scan_segment, segment)
+
+        remaining = total_segments
+        while remaining:
+            item = results.get()
+            if item is _SEGMENT_DONE:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        # Also runs when the consumer stops iterating early: release the workers.
+        stop.set()
+        executor.shutdown(wait=False)
@@ -0,0 +1,162 @@
+import time
+
+from app.repositories.dynamodb_models import TodoModel, UserModel, configure_models
+
+PAY_PER_REQUEST = 'PAY_PER_REQUEST'
+PROVISIONED = 'PROVISIONED'
+BILLING_MODES = (PAY_PER_REQUEST, PROVISIONED)
+
+
+def _throughput(meta):
+    return {'ReadCapacityUnits': meta.read_capacity_units, 'WriteCapacityUnits': meta.write_capacity_units}
+
+
+def _current_throughput(description):
+    throughput = description.get('ProvisionedThroughput', {})
+    return {key: throughput.get(key) for key in ('ReadCapacityUnits', 'WriteCapacityUnits')}
+
+
+def table_update(model_cls, table, manage_throughput=True):
+    # UpdateTable arguments that bring `table` (a DescribeTable result) to the
+    # billing mode and capacity on the model's Meta; {} when nothing differs.
+    # With manage_throughput=False the capacity of an already provisioned table
+    # is left to auto scaling.
+    billing_mode = model_cls.Meta.billing_mode
+    current_mode = table.get('BillingModeSummary', {}).get('BillingMode', PROVISIONED)
+    update = {}
+    if billing_mode != current_mode:
+        update['BillingMode'] = billing_mode
+    if billing_mode != PROVISIONED or not (manage_throughput or current_mode != PROVISIONED):
+        return update
+
+    switching = current_mode != PROVISIONED
+    if switching or _current_throughput(table) != _throughput(model_cls.Meta):
+        update['ProvisionedThroughput'] = _throughput(model_cls.Meta)
+    current_indexes = {index['IndexName']: index for index in table.get('GlobalSecondaryIndexes', [])}
+    index_updates = [
+        {'Update': {'IndexName': index.Meta.index_name, 'ProvisionedThroughput': _throughput(index.Meta)}}
+        for index in model_cls._indexes.values()
+        if index.Meta.index_name in current_indexes and (
+            switching or _current_throughput(current_indexes[index.Meta.index_name]) != _throughput(index.Meta)
+        )
+    ]
+    if index_updates:
+        update['GlobalSecondaryIndexUpdates'] = index_updates
+    return update
+
+
+def _wait_until_active(client, table_name, delay=2):
+    while True:
+        table = client.describe_table(TableName=table_name)['Table']
+        statuses = [table['TableStatus']] + [index['IndexStatus'] for index in table.get('GlobalSecondaryIndexes', [])]
+        if all(status == 'ACTIVE' for status in statuses):
+            return
+        time.sleep(delay)
+
+
+def provision_table(model_cls, manage_throughput=True, log=print):
+    # Creates the table with the configured billing mode and capacity, or updates
+    # an existing one in place. Running it again changes nothing.
+    table_name = model_cls.Meta.table_name
+    if not model_cls.exists():
+        log(f"Creating table {table_name} ({model_cls.Meta.billing_mode})...")
+        model_cls.create_table(wait=True)
+        log(f"Table {table_name} created.")
+        return True
+
+    client = model_cls._get_connection().connection.client
+    update = table_update(model_cls, client.describe_table(TableName=table_name)['Table'], manage_throughput)
+    if not update:
+        log(f"Table {table_name} is up to date.")
+        return False
+    log(f"Updating table {table_name}: {', '.join(sorted(update))}...")
+    client.update_table(TableName=table_name, **update)
+    _wait_until_active(client, table_name)
+    log(f"Table {table_name} updated.")
+    return True
+
+
+def scalable_targets(model_cls):
+    # (resource id, scalable dimension, predefined metric, minimum capacity) for
+    # the read and write capacity of the table and each of its indexes.
+    table_name = model_cls.Meta.table_name
+    resources = [(f"table/{table_name}", 'table', model_cls.Meta)]
+    resources += [
+        (f"table/{table_name}/index/{index.Meta.index_name}", 'index', index.Meta)
+        for index in model_cls._indexes.values()
+    ]
+    for resource_id, resource_type, meta in resources:
+        yield (resource_id, f'dynamodb:{resource_type}:ReadCapacityUnits',
+               'DynamoDBReadCapacityUtilization', meta.read_capacity_units)
+        yield (resource_id, f'dynamodb:{resource_type}:WriteCapacityUnits',
+               'DynamoDBWriteCapacityUtilization', meta.write_capacity_units)
+
+
+def apply_autoscaling(autoscaling, model_cls, max_capacity, target_utilization, log=print):
+    # Registering a target and putting a policy are both upserts, so this is
+    # idempotent. On-demand tables have their scalable targets removed instead.
+    for resource_id, dimension, metric, min_capacity in scalable_targets(model_cls):
+        if model_cls.Meta.billing_mode != PROVISIONED:
+            targets = autoscaling.describe_scalable_targets(
+                ServiceNamespace='dynamodb', ResourceIds=[resource_id], ScalableDimension=dimension
+            )['ScalableTargets']
+            if targets:
+                autoscaling.deregister_scalable_target(
+                    ServiceNamespace='dynamodb', ResourceId=resource_id, ScalableDimension=dimension
+                )
+                log(f"Removed auto scaling of {resource_id} ({dimension}).")
+            continue
+        autoscaling.register_scalable_target(
+            ServiceNamespace='dynamodb',
+            ResourceId=resource_id,
+            ScalableDimension=dimension,
+            MinCapacity=min_capacity,
+            MaxCapacity=max(min_capacity, max_capacity)
+        )
+        autoscaling.put_scaling_policy(
+            PolicyName=f"{resource_id.replace('/', '-')}-{dimension.rsplit(':', 1)[1]}",
+            ServiceNamespace='dynamodb',
+            ResourceId=resource_id,
+            ScalableDimension=dimension,
+            PolicyType='TargetTrackingScaling',
+            TargetTrackingScalingPolicyConfiguration={
+                'TargetValue': target_utilization,
+                'PredefinedMetricSpecification': {'PredefinedMetricType': metric}
+            }
+        )
+        log(f"Auto scaling {resource_id} ({dimension}) between {min_capacity} and "
+            f"{max(min_capacity, max_capacity)} at {target_utilization:g}% utilization.")
+
+
+def create_autoscaling_client(current_config):
+    import botocore.session
+    return botocore.session.get_session().create_client(
+        'application-autoscaling',
+        region_name=current_config.AWS_REGION,
+        aws_access_key_id=current_config.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=current_config.AWS_SECRET_ACCESS_KEY
+    )
+
+
+def provision_tables(current_config, autoscaling=None, log=print):
+    # Applies the DYNAMODB_BILLING_MODE, capacity and auto scaling settings of
+    # `current_config` to the users and todos tables. Auto scaling is only
+    # touched when DYNAMODB_AUTOSCALING_ENABLED is set.
+    if not current_config.DYNAMODB_DDL_ENABLED:
+        raise RuntimeError("Table provisioning is disabled (DYNAMODB_DDL=False)")
+    if current_config.DYNAMODB_BILLING_MODE not in BILLING_MODES:
+        raise ValueError(f"DYNAMODB_BILLING_MODE must be one of {', '.join(BILLING_MODES)}")
+    configure_models(current_config)
+    autoscaling_enabled = current_config.DYNAMODB_AUTOSCALING_ENABLED
+    if autoscaling_enabled and autoscaling is None:
+        autoscaling = create_autoscaling_client(current_config)
+
+    for model_cls in (UserModel, TodoModel):
+        provision_table(model_cls, manage_throughput=not autoscaling_enabled, log=log)
+        if autoscaling_enabled:
+            apply_autoscaling(
+                autoscaling, model_cls,
+                current_config.DYNAMODB_AUTOSCALING_MAX_CAPACITY_UNITS,
+                current_config.DYNAMODB_AUTOSCALING_TARGET_UTILIZATION,
+                log=log
+            )
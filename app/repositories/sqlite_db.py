@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id TEXT PRIMARY KEY,
+        username TEXT NOT NULL,
+        email TEXT NOT NULL,
+        password_hash TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    )
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS users_username ON users (username)",
+    """
+    CREATE TABLE IF NOT EXISTS todos (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        description TEXT NOT NULL,
+        status TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    )
+    """,
+    # Serves the per-user listing, keyset pagination and cascade delete
+    "CREATE INDEX IF NOT EXISTS todos_user_created ON todos (user_id, created_at, id)",
+)
+
+
+def to_db_time(value):
+    # Fixed-width ISO text, so string order is time order.
+    return value.isoformat(timespec='microseconds')
+
+
+def from_db_row(row):
+    record = dict(row)
+    for key in ('created_at', 'updated_at'):
+        if key in record:
+            record[key] = datetime.fromisoformat(record[key])
+    return record
+
+
+class SQLiteDB:
+    # One SQLite database file in WAL mode, so readers never block the writer.
+    # Every thread gets its own connection; sqlite3 keeps the compiled form of
+    # each parameterised statement in a per-connection cache, so the constant SQL
+    # strings in the repositories are prepared once per thread.
+
+    def __init__(self, path, busy_timeout_ms=5000, cached_statements=256):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory and self.path != ':memory:':
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self.path,
+                timeout=self.busy_timeout_ms / 1000,
+                isolation_level=None,
+                cached_statements=self.cached_statements,
+                check_same_thread=True
+            )
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._ensure_schema(connection)
+        return connection
+
+    def _ensure_schema(self, connection):
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._schema_ready = True
+
+    def execute(self, sql, parameters=()):
+        return self.connection().execute(sql, parameters)
+
+    def transaction(self):
+        return _Transaction(self.connection())
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+class _Transaction:
+    # BEGIN IMMEDIATE takes the write lock up front, so a transaction never fails
+    # half way with SQLITE_BUSY when it upgrades from read to write.
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.connection.execute('COMMIT')
+        else:
+            self.connection.execute('ROLLBACK')
+        return False
+
+
+_databases = {}
+_databases_lock = threading.Lock()
+
+
+def get_database(path):
+    # One SQLiteDB per file and process, shared by all repositories.
+    with _databases_lock:
+        if path not in _databases:
+            _databases[path] = SQLiteDB(path)
+        return _databases[path]
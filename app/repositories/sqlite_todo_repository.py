@@ -0,0 +1,182 @@
+from app.repositories.sqlite_db import from_db_row, to_db_time
+from app.repositories.pagination import InvalidCursorError, encode_cursor, decode_cursor
+from app.repositories.storage import TODO_INDEX_KEY_NAMES, TODO_UPDATABLE_FIELDS
+from datetime import datetime
+import sqlite3
+import uuid
+
+TODO_COLUMNS = 'id, user_id, description, status, created_at, updated_at'
+
+def _todo_cursor(todo):
+    # Same shape as a user_id_index LastEvaluatedKey, so cursors validate the same way.
+    return encode_cursor({
+        'id': {'S': todo['id']},
+        'user_id': {'S': todo['user_id']},
+        'created_at': {'S': to_db_time(todo['created_at'])}
+    })
+
+class SQLiteTodoRepository:
+    # TodoRepository on SQLite (STORAGE_BACKEND=sqlite). Listings walk the
+    # (user_id, created_at, id) index with keyset pagination.
+
+    def __init__(self, db):
+        self.db = db
+
+    def get_todos_by_user_id(self, user_id):
+        try:
+            rows = self.db.execute(
+                f"SELECT {TODO_COLUMNS} FROM todos WHERE user_id = ? ORDER BY created_at, id",
+                (user_id,)
+            ).fetchall()
+            return [from_db_row(row) for row in rows]
+        except sqlite3.Error as e:
+            print(f"Error querying todos by user ID: {e}")
+            return []
+
+    def get_todos_page_by_user_id(self, user_id, limit, cursor=None):
+        start_key = decode_cursor(cursor, TODO_INDEX_KEY_NAMES)
+        if start_key and start_key['user_id'] != {'S': user_id}:
+            raise InvalidCursorError("Cursor does not belong to this user")
+        try:
+            # One extra row tells whether there is a next page.
+            if start_key:
+                rows = self.db.execute(
+                    f"SELECT {TODO_COLUMNS} FROM todos WHERE user_id = ? AND (created_at, id) > (?, ?) "
+                    "ORDER BY created_at, id LIMIT ?",
+                    (user_id, start_key['created_at'].get('S'), start_key['id'].get('S'), limit + 1)
+                ).fetchall()
+            else:
+                rows = self.db.execute(
+                    f"SELECT {TODO_COLUMNS} FROM todos WHERE user_id = ? ORDER BY created_at, id LIMIT ?",
+                    (user_id, limit + 1)
+                ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Error querying todos page by user ID: {e}")
+            return [], None
+        todos = [from_db_row(row) for row in rows[:limit]]
+        if len(rows) <= limit:
+            return todos, None
+        return todos, _todo_cursor(todos[-1])
+
+    def iter_todos_by_user_id(self, user_id, page_size=None):
+        # Keyset pages, so no cursor stays open between pages; errors propagate.
+        page_size = page_size or 1000
+        rows = self.db.execute(
+            f"SELECT {TODO_COLUMNS} FROM todos WHERE user_id = ? ORDER BY created_at, id LIMIT ?",
+            (user_id, page_size)
+        ).fetchall()
+        while True:
+            for row in rows:
+                yield from_db_row(row)
+            if len(rows) < page_size:
+                return
+            rows = self.db.execute(
+                f"SELECT {TODO_COLUMNS} FROM todos WHERE user_id = ? AND (created_at, id) > (?, ?) "
+                "ORDER BY created_at, id LIMIT ?",
+                (user_id, rows[-1]['created_at'], rows[-1]['id'], page_size)
+            ).fetchall()
+
+    def get_todo_by_id(self, todo_id):
+        try:
+            row = self.db.execute(f"SELECT {TODO_COLUMNS} FROM todos WHERE id = ?", (todo_id,)).fetchone()
+            return from_db_row(row) if row else None
+        except sqlite3.Error as e:
+            print(f"Error getting todo by ID: {e}")
+            return None
+
+    def get_todos_by_ids(self, todo_ids, user_id):
+        unique_ids = list(dict.fromkeys(todo_ids))
+        if not unique_ids:
+            return []
+        found = {}
+        try:
+            # Stay below SQLite's bound-parameter limit
+            for offset in range(0, len(unique_ids), 500):
+                chunk = unique_ids[offset:offset + 500]
+                rows = self.db.execute(
+                    f"SELECT {TODO_COLUMNS} FROM todos WHERE user_id = ? AND id IN ({', '.join('?' * len(chunk))})",
+                    [user_id] + chunk
+                ).fetchall()
+                found.update((row['id'], from_db_row(row)) for row in rows)
+        except sqlite3.Error as e:
+            print(f"Error batch getting todos: {e}")
+            return []
+        return [found[todo_id] for todo_id in unique_ids if todo_id in found]
+
+    def get_todo_by_id_and_user(self, todo_id, user_id):
+        todo = self.get_todo_by_id(todo_id)
+        if todo and todo['user_id'] == user_id:
+            return todo
+        return None
+
+    def _new_todo(self, todo_data):
+        now = datetime.now()
+        return {
+            "id": str(uuid.uuid4()),
+            "user_id": todo_data['user_id'],
+            "description": todo_data['description'],
+            "status": todo_data['status'],
+            "created_at": now,
+            "updated_at": now
+        }
+
+    def _insert_rows(self, connection, todos):
+        connection.executemany(
+            f"INSERT INTO todos ({TODO_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (todo['id'], todo['user_id'], todo['description'], todo['status'],
+                 to_db_time(todo['created_at']), to_db_time(todo['updated_at']))
+                for todo in todos
+            ]
+        )
+
+    def add_todo(self, todo_data):
+        todo = self._new_todo(todo_data)
+        try:
+            self._insert_rows(self.db.connection(), [todo])
+            return todo
+        except sqlite3.Error as e:
+            print(f"Error adding todo: {e}")
+            return None
+
+    def add_todos(self, todos_data, max_workers=4):
+        # One transaction for the whole batch (SQLite has a single writer, so
+        # max_workers is accepted for interface compatibility only).
+        todos = [self._new_todo(todo_data) for todo_data in todos_data]
+        try:
+            with self.db.transaction() as connection:
+                self._insert_rows(connection, todos)
+        except sqlite3.Error as e:
+            print(f"Error batch adding todos: {e}")
+            return [{"id": None, "error": "Failed to create todo item"} for _ in todos]
+        return [{"id": todo['id'], "error": None} for todo in todos]
+
+    def update_todo(self, todo_id, user_id, todo_data):
+        # Single UPDATE conditioned on ownership, like the DynamoDB conditional update.
+        changes = {key: todo_data[key] for key in TODO_UPDATABLE_FIELDS if key in todo_data}
+        changes['updated_at'] = to_db_time(datetime.now())
+        assignments = ', '.join(f"{key} = ?" for key in changes)
+        try:
+            # fetchall() steps the statement to completion so the write is committed
+            rows = self.db.execute(
+                f"UPDATE todos SET {assignments} WHERE id = ? AND user_id = ? RETURNING {TODO_COLUMNS}",
+                list(changes.values()) + [todo_id, user_id]
+            ).fetchall()
+            return from_db_row(rows[0]) if rows else None
+        except sqlite3.Error as e:
+            print(f"Error updating todo: {e}")
+            return None
+
+    def delete_todo(self, todo_id, user_id):
+        try:
+            return self.db.execute("DELETE FROM todos WHERE id = ? AND user_id = ?", (todo_id, user_id)).rowcount > 0
+        except sqlite3.Error as e:
+            print(f"Error deleting todo: {e}")
+            return False
+
+    def delete_todos_by_user_id(self, user_id, max_workers=4, page_size=None, progress=None):
+        # One indexed DELETE; nothing is left half-deleted, so failed_ids is always empty.
+        deleted = self.db.execute("DELETE FROM todos WHERE user_id = ?", (user_id,)).rowcount
+        if progress:
+            progress(deleted=deleted, failed=0)
+        return deleted, []
@@ -0,0 +1,162 @@
+from app.repositories.sqlite_db import from_db_row, to_db_time
+from app.repositories.pagination import InvalidCursorError, encode_cursor, decode_cursor
+from app.repositories.storage import USER_PUBLIC_ATTRIBUTES, USER_TABLE_KEY_NAMES, USER_UPDATABLE_FIELDS
+from datetime import datetime
+import sqlite3
+import uuid
+
+USER_COLUMNS = 'id, username, email, password_hash, created_at, updated_at'
+USER_PUBLIC_COLUMNS = ', '.join(USER_PUBLIC_ATTRIBUTES)
+
+class SQLiteUserRepository:
+    # UserRepository on SQLite (STORAGE_BACKEND=sqlite). The unique username
+    # index makes duplicate signups fail atomically.
+
+    def __init__(self, db):
+        self.db = db
+
+    def get_all_users(self):
+        try:
+            return [from_db_row(row) for row in self.db.execute(f"SELECT {USER_COLUMNS} FROM users ORDER BY id")]
+        except sqlite3.Error as e:
+            print(f"Error scanning users: {e}")
+            return []
+
+    def _users_after(self, start_id, limit):
+        if start_id is None:
+            return self.db.execute(
+                f"SELECT {USER_PUBLIC_COLUMNS} FROM users ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        return self.db.execute(
+            f"SELECT {USER_PUBLIC_COLUMNS} FROM users WHERE id > ? ORDER BY id LIMIT ?", (start_id, limit)
+        ).fetchall()
+
+    def get_users_page(self, limit, cursor=None):
+        start_key = decode_cursor(cursor, USER_TABLE_KEY_NAMES)
+        start_id = None
+        if start_key:
+            start_id = start_key['id'].get('S')
+            if not isinstance(start_id, str):
+                raise InvalidCursorError("Malformed cursor")
+        try:
+            rows = self._users_after(start_id, limit + 1)
+        except sqlite3.Error as e:
+            print(f"Error scanning users page: {e}")
+            return [], None
+        users = [from_db_row(row) for row in rows[:limit]]
+        if len(rows) <= limit:
+            return users, None
+        return users, encode_cursor({'id': {'S': users[-1]['id']}})
+
+    def iter_all_users(self, total_segments, page_size=None):
+        # Keyset pages over the primary key; segments only matter for DynamoDB.
+        page_size = page_size or 1000
+        start_id = None
+        while True:
+            rows = self._users_after(start_id, page_size)
+            for row in rows:
+                yield from_db_row(row)
+            if len(rows) < page_size:
+                return
+            start_id = rows[-1]['id']
+
+    def get_user_by_id(self, user_id):
+        try:
+            row = self.db.execute(f"SELECT {USER_COLUMNS} FROM users WHERE id = ?", (user_id,)).fetchone()
+            return from_db_row(row) if row else None
+        except sqlite3.Error as e:
+            print(f"Error getting user by ID: {e}")
+            return None
+
+    def get_user_by_username(self, username):
+        try:
+            row = self.db.execute(f"SELECT {USER_COLUMNS} FROM users WHERE username = ?", (username,)).fetchone()
+            return from_db_row(row) if row else None
+        except sqlite3.Error as e:
+            print(f"Error querying for username: {e}")
+            return None
+
+    def cache_stats(self):
+        return None
+
+    def add_user(self, user_data):
+        now = datetime.now()
+        user = {
+            "id": str(uuid.uuid4()),
+            "username": user_data['username'],
+            "email": user_data['email'],
+            "password_hash": user_data['password_hash'],
+            "created_at": now,
+            "updated_at": now
+        }
+        try:
+            self.db.execute(
+                f"INSERT INTO users ({USER_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                (user['id'], user['username'], user['email'], user['password_hash'], to_db_time(now), to_db_time(now))
+            )
+            return user, None
+        except sqlite3.IntegrityError:
+            return None, "Username already exists"
+        except sqlite3.Error as e:
+            print(f"Error adding user: {e}")
+            return None, "Failed to add user"
+
+    def add_users(self, users_data, max_workers=4):
+        # One transaction for the whole batch; taken usernames are skipped and
+        # reported per user (max_workers is accepted for interface compatibility).
+        now = datetime.now()
+        users = [
+            (str(uuid.uuid4()), user_data['username'], user_data['email'], user_data['password_hash'],
+             to_db_time(now), to_db_time(now))
+            for user_data in users_data
+        ]
+        try:
+            with self.db.transaction() as connection:
+                inserted = [
+                    connection.execute(
+                        f"INSERT INTO users ({USER_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(username) DO NOTHING",
+                        user
+                    ).rowcount > 0
+                    for user in users
+                ]
+        except sqlite3.Error as e:
+            print(f"Error batch adding users: {e}")
+            return [{"id": None, "error": "Failed to add user"} for _ in users]
+        return [
+            {"id": user[0], "error": None} if ok else {"id": None, "error": "Username already exists"}
+            for user, ok in zip(users, inserted)
+        ]
+
+    def update_user(self, user_id, user_data):
+        changes = {key: user_data[key] for key in USER_UPDATABLE_FIELDS if key in user_data}
+        changes['updated_at'] = to_db_time(datetime.now())
+        assignments = ', '.join(f"{key} = ?" for key in changes)
+        try:
+            rows = self.db.execute(
+                f"UPDATE users SET {assignments} WHERE id = ? RETURNING {USER_COLUMNS}",
+                list(changes.values()) + [user_id]
+            ).fetchall()
+            return (from_db_row(rows[0]), None) if rows else (None, "User not found")
+        except sqlite3.IntegrityError:
+            # The new username belongs to someone else
+            return None, "Username already exists"
+        except sqlite3.Error as e:
+            print(f"Error updating user: {e}")
+            return None, "Failed to update user"
+
+    def update_password_hash(self, user_id, old_hash, new_hash):
+        # Only replaces the hash the caller read, like the DynamoDB conditional update.
+        try:
+            return self.db.execute(
+                "UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?", (new_hash, user_id, old_hash)
+            ).rowcount > 0
+        except sqlite3.Error as e:
+            print(f"Error updating password hash: {e}")
+            return False
+
+    def delete_user(self, user_id):
+        try:
+            return self.db.execute("DELETE FROM users WHERE id = ?", (user_id,)).rowcount > 0
+        except sqlite3.Error as e:
+            print(f"Error deleting user: {e}")
+            return False
@@ -0,0 +1,57 @@
+# Storage backends. Every backend provides a todo and a user repository with the
+# methods (and return values) of TodoRepository and UserRepository; the services
+# get theirs from the factories below, selected by STORAGE_BACKEND in config.py.
+# Backend modules are imported lazily so that the memory and SQLite backends
+# never load the DynamoDB models.
+
+# Key attributes of a todo list page cursor (a user_id_index LastEvaluatedKey
+# in DynamoDB): the table hash key plus the index hash/range keys.
+TODO_INDEX_KEY_NAMES = ('id', 'user_id', 'created_at')
+# Fields a caller may change through update_todo
+TODO_UPDATABLE_FIELDS = ('description', 'status')
+
+# Attributes exposed through the users API; password_hash is never read by listings.
+USER_PUBLIC_ATTRIBUTES = ['id', 'username', 'email', 'created_at', 'updated_at']
+USER_TABLE_KEY_NAMES = ('id',)
+# Fields update_user writes; updated_at is always set by the repository.
+USER_UPDATABLE_FIELDS = ('username', 'email', 'password_hash')
+
+def public_user(user):
+    # A user without its password hash: the only form user caches may hold, so
+    # a shared cache server never stores credential material.
+    return {key: user[key] for key in USER_PUBLIC_ATTRIBUTES if key in user}
+
+def create_todo_repository(config):
+    if config.STORAGE_BACKEND == 'memory':
+        from app.repositories.in_memory_todo_repository import InMemoryTodoRepository
+        return InMemoryTodoRepository()
+    if config.STORAGE_BACKEND == 'sqlite':
+        from app.repositories.sqlite_db import get_database
+        from app.repositories.sqlite_todo_repository import SQLiteTodoRepository
+        return SQLiteTodoRepository(get_database(config.SQLITE_PATH))
+    if config.STORAGE_BACKEND == 'dynamodb':
+        from app.repositories.todo_repository import TodoRepository
+        return TodoRepository()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {config.STORAGE_BACKEND}")
+
+def create_user_repository(config):
+    if config.STORAGE_BACKEND == 'memory':
+        from app.repositories.in_memory_user_repository import InMemoryUserRepository
+        return InMemoryUserRepository()
+    if config.STORAGE_BACKEND == 'sqlite':
+        from app.repositories.sqlite_db import get_database
+        from app.repositories.sqlite_user_repository import SQLiteUserRepository
+        return SQLiteUserRepository(get_database(config.SQLITE_PATH))
+    if config.STORAGE_BACKEND == 'dynamodb':
+        # Read-through cache of users (and, with the redis backend, shared by
+        # every process). Only DynamoDB lookups are worth caching.
+        from app.repositories.cache import create_cache
+        user_cache = create_cache(
+            config,
+            namespace='users',
+            max_entries=config.USER_CACHE_MAX_ENTRIES,
+            ttl_seconds=config.USER_CACHE_TTL_SECONDS
+        )
+        from app.repositories.user_repository import UserRepository
+        return UserRepository(user_cache, config.USERNAME_INDEX_FALLBACK)
+    raise ValueError(f"Unknown STORAGE_BACKEND: {config.STORAGE_BACKEND}")
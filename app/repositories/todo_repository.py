@@ -1,7 +1,14 @@
 from app.repositories.dynamodb_models import TodoModel, TodoUserIdIndex
-from pynamodb.exceptions import DoesNotExist, GetError, PutError, DeleteError, QueryError
+from app.repositories.pagination import InvalidCursorError, encode_cursor, decode_cursor
+from app.repositories.batch_writer import BATCH_WRITE_LIMIT, batch_write, chunked
+from pynamodb.exceptions import DoesNotExist, GetError, PutError, UpdateError, DeleteError, QueryError
+from app.repositories.storage import TODO_INDEX_KEY_NAMES, TODO_UPDATABLE_FIELDS
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
 import uuid
 
+CONDITIONAL_CHECK_FAILED = 'ConditionalCheckFailedException'
+
 class TodoRepository:
     def get_todos_by_user_id(self, user_id):
         try:
@@ -14,6 +21,33 @@ class TodoRepository:
             print(f"Error querying todos by user ID: {e}")
             return []
 
+    def get_todos_page_by_user_id(self, user_id, limit, cursor=None):
+        # Reads at most `limit` todos from the user_id_index (ordered by created_at)
+        # and returns them with a cursor for the next page, or None on the last page.
+        start_key = decode_cursor(cursor, TODO_INDEX_KEY_NAMES)
+        if start_key and start_key['user_id'] != {'S': user_id}:
+            raise InvalidCursorError("Cursor does not belong to this user")
+
+        try:
+            results = TodoModel.user_id_index.query(
+                user_id,
+                limit=limit,
+                page_size=limit,
+                last_evaluated_key=start_key
+            )
+            todos = [todo_model.attribute_values for todo_model in results]
+            return todos, encode_cursor(results.last_evaluated_key)
+        except QueryError as e:
+            print(f"Error querying todos page by user ID: {e}")
+            return [], None
+
+    def iter_todos_by_user_id(self, user_id, page_size=None):
+        # Streams the user's todos from the user_id_index (ordered by created_at),
+        # fetching one query page at a time. QueryError propagates, so a consumer
+        # never mistakes a failed read for the end of the list.
+        for todo_model in TodoModel.user_id_index.query(user_id, page_size=page_size):
+            yield todo_model.attribute_values
+
     def get_todo_by_id(self, todo_id):
         # This method is not used directly by the service layer with user_id
         # The service layer uses get_todo_by_id_and_user
@@ -26,6 +60,23 @@ class TodoRepository:
             print(f"Error getting todo by ID: {e}")
             return None
 
+    def get_todos_by_ids(self, todo_ids, user_id):
+        # BatchGetItem (PynamoDB splits keys into 100-key requests and resends
+        # UnprocessedKeys). Only the caller's todos are returned, in request order.
+        unique_ids = list(dict.fromkeys(todo_ids))
+        if not unique_ids:
+            return []
+        try:
+            found = {
+                todo_model.id: todo_model.attribute_values
+                for todo_model in TodoModel.batch_get(unique_ids)
+                if todo_model.user_id == user_id
+            }
+        except GetError as e:
+            print(f"Error batch getting todos: {e}")
+            return []
+        return [found[todo_id] for todo_id in unique_ids if todo_id in found]
+
     def get_todo_by_id_and_user(self, todo_id, user_id):
         try:
             # Get by primary key (id) and then verify user_id
@@ -56,32 +107,101 @@ class TodoRepository:
             print(f"Error adding todo: {e}")
             return None
 
+    def add_todos(self, todos_data, max_workers=4):
+        # Bulk insert with 25-item BatchWriteItem chunks written in parallel.
+        # Returns one {"id", "error"} result per input item, in input order.
+        todo_models = [
+            TodoModel(
+                id=str(uuid.uuid4()),
+                user_id=todo_data['user_id'],
+                description=todo_data['description'],
+                status=todo_data['status']
+            )
+            for todo_data in todos_data
+        ]
+        results = [{"id": todo_model.id, "error": None} for todo_model in todo_models]
+
+        def write_chunk(offset, chunk):
+            try:
+                failed_ids = set(batch_write(TodoModel, put_models=chunk))
+                error = "Todo was not written after retries"
+            except PutError as e:
+                print(f"Error batch adding todos: {e}")
+                failed_ids = {todo_model.id for todo_model in chunk}
+                error = "Failed to create todo item"
+            for index, todo_model in enumerate(chunk, start=offset):
+                if todo_model.id in failed_ids:
+                    results[index] = {"id": None, "error": error}
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='batch-add') as executor:
+            futures = [
+                executor.submit(write_chunk, offset, todo_models[offset:offset + BATCH_WRITE_LIMIT])
+                for offset in range(0, len(todo_models), BATCH_WRITE_LIMIT)
+            ]
+            for future in futures:
+                future.result()
+        return results
+
     def update_todo(self, todo_id, user_id, todo_data):
+        # Single UpdateItem conditioned on ownership; the condition also fails when the
+        # todo does not exist, so both cases return None without a prior read.
+        actions = [TodoModel.updated_at.set(datetime.now())]
+        for key in TODO_UPDATABLE_FIELDS:
+            if key in todo_data:
+                actions.append(getattr(TodoModel, key).set(todo_data[key]))
         try:
-            todo_model = TodoModel.get(todo_id)
-            if todo_model.user_id != user_id:
-                return None # Todo found but doesn't belong to the user
-
-            for key, value in todo_data.items():
-                setattr(todo_model, key, value)
-            todo_model.save()
+            todo_model = TodoModel(todo_id)
+            todo_model.update(actions=actions, condition=(TodoModel.user_id == user_id))
             return todo_model.attribute_values
-        except DoesNotExist:
-            return None
-        except (GetError, PutError) as e:
+        except UpdateError as e:
+            if e.cause_response_code == CONDITIONAL_CHECK_FAILED:
+                return None
             print(f"Error updating todo: {e}")
             return None
 
     def delete_todo(self, todo_id, user_id):
+        # Single DeleteItem conditioned on ownership; returns whether the todo was deleted.
         try:
-            todo_model = TodoModel.get(todo_id)
-            if todo_model.user_id != user_id:
-                return False # Todo found but doesn't belong to the user
-
-            todo_model.delete()
+            TodoModel(todo_id).delete(condition=(TodoModel.user_id == user_id))
             return True
-        except DoesNotExist:
-            return False
         except DeleteError as e:
+            if e.cause_response_code == CONDITIONAL_CHECK_FAILED:
+                return False
             print(f"Error deleting todo: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    def delete_todos_by_user_id(self, user_id, max_workers=4, page_size=None, progress=None):
+        # Cascade delete: pages the user_id_index reading only ids and fans out
+        # BatchWriteItem deletes of 25 keys over a bounded thread pool. At most
+        # 2 * max_workers batches are in flight, so memory stays flat for any
+        # number of todos. Returns (deleted_count, failed_ids).
+        deleted = 0
+        failed_ids = []
+
+        def delete_chunk(todo_ids):
+            return len(todo_ids), batch_write(TodoModel, delete_models=[TodoModel(todo_id) for todo_id in todo_ids])
+
+        def collect(done):
+            nonlocal deleted
+            for future in done:
+                attempted, failed = future.result()
+                deleted += attempted - len(failed)
+                failed_ids.extend(failed)
+            if progress:
+                progress(deleted=deleted, failed=len(failed_ids))
+
+        todo_ids = (
+            todo_model.id
+            for todo_model in TodoModel.user_id_index.query(user_id, attributes_to_get=['id'], page_size=page_size)
+        )
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='cascade-delete') as executor:
+            in_flight = set()
+            for chunk in chunked(todo_ids, BATCH_WRITE_LIMIT):
+                if len(in_flight) >= 2 * max_workers:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                in_flight.add(executor.submit(delete_chunk, chunk))
+            done, _ = wait(in_flight)
+            collect(done)
+
+        return deleted, failed_ids
@@ -1,82 +1,350 @@
-from app.repositories.dynamodb_models import UserModel
-from pynamodb.exceptions import DoesNotExist, GetError, PutError, DeleteError, ScanError, QueryError
+from app.repositories.dynamodb_models import USERNAME_RESERVATION_PREFIX, UserModel, UsernameReservationModel
+from app.repositories.pagination import encode_cursor, decode_cursor
+from app.repositories.parallel_scan import parallel_scan
+from app.repositories.cache import TTLCache
+from app.repositories.storage import USER_PUBLIC_ATTRIBUTES, USER_TABLE_KEY_NAMES, USER_UPDATABLE_FIELDS, public_user
+from pynamodb.exceptions import DoesNotExist, GetError, PutError, QueryError, ScanError, TransactWriteError, UpdateError
+from pynamodb.transactions import TransactWrite
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 import uuid
 
+CONDITIONAL_CHECK_FAILED = 'ConditionalCheckFailedException'
+# Cancellation reason code of a transaction item whose condition failed
+TRANSACTION_CONDITION_FAILED = 'ConditionalCheckFailed'
+# TransactWriteItems takes up to 100 items: a user and its reservation each
+USERS_PER_TRANSACTION = 50
+
+def _id_key(user_id):
+    return f"user:id:{user_id}"
+
+def _username_key(username):
+    return f"user:username:{username}"
+
+def _reservation_id(username):
+    return f"{USERNAME_RESERVATION_PREFIX}{username}"
+
+def _user_items_only():
+    # Scans skip the username reservation items stored in the same table
+    return ~UserModel.id.startswith(USERNAME_RESERVATION_PREFIX)
+
+def _condition_failed(error, index):
+    # Whether the transaction was cancelled because item `index` failed its condition
+    reasons = error.cancellation_reasons or []
+    return len(reasons) > index and reasons[index] is not None and reasons[index].code == TRANSACTION_CONDITION_FAILED
+
+def _transaction():
+    return TransactWrite(connection=UserModel._get_connection().connection)
+
+def _new_user_model(user_data):
+    return UserModel(
+        id=str(uuid.uuid4()),
+        username=user_data['username'],
+        email=user_data['email'],
+        password_hash=user_data['password_hash'] # Store hashed password
+    )
+
+def _save_new_user(transaction, user_model):
+    # The username reservation first: a cancellation reason at index 0 means the name is taken
+    transaction.save(
+        UsernameReservationModel(_reservation_id(user_model.username), user_id=user_model.id),
+        condition=UsernameReservationModel.id.does_not_exist()
+    )
+    transaction.save(user_model, condition=UserModel.id.does_not_exist())
+
+def _release_condition(user_id):
+    # A reservation may only be released by its owner; users created before
+    # reservations existed have none to release.
+    return (UsernameReservationModel.user_id == user_id) | UsernameReservationModel.id.does_not_exist()
+
 class UserRepository:
+    # Users are cached under their id, without their password hash; usernames
+    # only map to an id, so invalidating the id entry is enough to make every
+    # lookup path go back to DynamoDB. Logins always read the user item itself.
+    # Without a cache (CLI tools, tests) each instance keeps its own.
+    # With username_index_fallback (only meant for the migration window, since
+    # it adds a GSI query to signups, renames and login misses), users created
+    # before reservations existed are still found, and their usernames stay
+    # taken, through username_index until `flask reserve-usernames` has
+    # backfilled their reservations.
+
+    def __init__(self, cache=None, username_index_fallback=False):
+        self.cache = cache if cache is not None else TTLCache()
+        self.username_index_fallback = username_index_fallback
+
     def get_all_users(self):
         try:
             # Scan is generally not recommended for large tables in production
             # but for a simple list all users, it works.
             # Consider pagination or other query patterns for large datasets.
             users = []
-            for user_model in UserModel.scan():
+            for user_model in UserModel.scan(filter_condition=_user_items_only()):
                 users.append(user_model.attribute_values)
             return users
         except ScanError as e:
             print(f"Error scanning users: {e}")
             return []
 
-    def get_user_by_id(self, user_id):
+    def get_users_page(self, limit, cursor=None):
+        # Scans at most `limit` users and returns them with a cursor for the next page.
+        start_key = decode_cursor(cursor, USER_TABLE_KEY_NAMES)
+        try:
+            results = UserModel.scan(
+                limit=limit,
+                page_size=limit,
+                last_evaluated_key=start_key,
+                attributes_to_get=USER_PUBLIC_ATTRIBUTES,
+                filter_condition=_user_items_only()
+            )
+            users = [user_model.attribute_values for user_model in results]
+            return users, encode_cursor(results.last_evaluated_key)
+        except ScanError as e:
+            print(f"Error scanning users page: {e}")
+            return [], None
+
+    def iter_all_users(self, total_segments, page_size=None):
+        # Streams every user using parallel scan segments; intended for admin exports.
+        for user_model in parallel_scan(
+            UserModel,
+            total_segments,
+            page_size=page_size,
+            attributes_to_get=USER_PUBLIC_ATTRIBUTES,
+            filter_condition=_user_items_only()
+        ):
+            yield user_model.attribute_values
+
+    def get_user_by_id(self, user_id, consistent_read=False):
+        # Returns the public attributes of the user (no password hash)
+        user = self.cache.get(_id_key(user_id))
+        if user is not None:
+            return user
+        user = self._get_user_item(user_id, consistent_read)
+        if user is None:
+            return None
+        self.cache.set(_id_key(user_id), public_user(user))
+        return public_user(user)
+
+    def get_user_by_username(self, username):
+        # Used by logins, so the user item (with its password hash) is always
+        # read from the table; only the username -> id mapping is cached.
+        cached_user_id = self.cache.get(_username_key(username))
+        if cached_user_id is not None:
+            user = self._get_user_item(cached_user_id, consistent_read=True)
+            if user and user['username'] == username:
+                return user
+            # The user was deleted or renamed since the mapping was cached
+            self.cache.delete(_username_key(username))
         try:
-            user_model = UserModel.get(user_id)
-            return user_model.attribute_values
+            # Strongly consistent GetItem on the reservation instead of a GSI query
+            reservation = UsernameReservationModel.get(_reservation_id(username), consistent_read=True)
+        except DoesNotExist:
+            legacy_user_id = self._legacy_username_holder(username)
+            if legacy_user_id is None:
+                return None
+            user = self._get_user_item(legacy_user_id, consistent_read=True)
+            return user if user and user['username'] == username else None
+        except GetError as e:
+            print(f"Error getting username reservation: {e}")
+            return None
+        user = self._get_user_item(reservation.user_id, consistent_read=True)
+        if user and user['username'] == username:
+            self.cache.set(_id_key(user['id']), public_user(user))
+            self.cache.set(_username_key(username), user['id'])
+            return user
+        return None
+
+    def _get_user_item(self, user_id, consistent_read):
+        try:
+            return UserModel.get(user_id, consistent_read=consistent_read).attribute_values
         except DoesNotExist:
             return None
         except GetError as e:
             print(f"Error getting user by ID: {e}")
             return None
 
-    def get_user_by_username(self, username):
-        try:
-            # Use the GSI for efficient lookup by username
-            for user_model in UserModel.username_index.query(username):
-                return user_model.attribute_values
+    def _legacy_username_holder(self, username):
+        # Id of a user holding `username` according to username_index (which
+        # only users have, not reservations), or None. The index is eventually
+        # consistent, so this only covers users that predate reservations.
+        if not self.username_index_fallback:
             return None
+        try:
+            for user_model in UserModel.username_index.query(username, limit=1):
+                return user_model.id
         except QueryError as e:
-            print(f"Error querying for username: {e}")
-            return None
+            print(f"Error querying username index: {e}")
+        return None
+
+    def cache_stats(self):
+        return self.cache.stats()
 
     def add_user(self, user_data):
+        # The reservation and the user are written in one transaction, both
+        # conditional on not existing yet: one round trip, and concurrent signups
+        # for the same username cannot both succeed.
+        if self._legacy_username_holder(user_data['username']) is not None:
+            return None, "Username already exists"
+        user_model = _new_user_model(user_data)
         try:
-            # Check if username already exists before adding
-            if self.get_user_by_username(user_data['username']):
+            with _transaction() as transaction:
+                _save_new_user(transaction, user_model)
+        except TransactWriteError as e:
+            if _condition_failed(e, 0):
                 return None, "Username already exists"
-
-            user_id = str(uuid.uuid4())
-            # Create a dictionary for model attributes, ensuring 'id' is set only once
-            model_attributes = {
-                "id": user_id,
-                "username": user_data['username'],
-                "email": user_data['email'],
-                "password_hash": user_data['password_hash'] # Store hashed password
-            }
-            user_model = UserModel(**model_attributes)
-            user_model.save()
-            return user_model.attribute_values, None
-        except PutError as e:
             print(f"Error adding user: {e}")
             return None, "Failed to add user"
+        self._cache_new_user(user_model)
+        return user_model.attribute_values, None
+
+    def add_users(self, users_data, max_workers=4):
+        # Bulk signup for seeding: chunks of USERS_PER_TRANSACTION users, each
+        # chunk (users and reservations) in one transaction, chunks in parallel.
+        # A cancelled chunk is retried user by user, so only the users whose
+        # username is taken fail. Returns one {"id", "error"} result per input
+        # item, in input order.
+        results = [None] * len(users_data)
+
+        def write_chunk(offset, chunk):
+            user_models = {}
+            for index, user_data in enumerate(chunk, start=offset):
+                if self._legacy_username_holder(user_data['username']) is not None:
+                    results[index] = {"id": None, "error": "Username already exists"}
+                else:
+                    user_models[index] = _new_user_model(user_data)
+            try:
+                with _transaction() as transaction:
+                    for user_model in user_models.values():
+                        _save_new_user(transaction, user_model)
+            except TransactWriteError:
+                for index, user_model in user_models.items():
+                    user, error = self.add_user(users_data[index])
+                    results[index] = {"id": user['id'] if user else None, "error": error}
+                return
+            for index, user_model in user_models.items():
+                self._cache_new_user(user_model)
+                results[index] = {"id": user_model.id, "error": None}
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='batch-add-users') as executor:
+            futures = [
+                executor.submit(write_chunk, offset, users_data[offset:offset + USERS_PER_TRANSACTION])
+                for offset in range(0, len(users_data), USERS_PER_TRANSACTION)
+            ]
+            for future in futures:
+                future.result()
+        return results
+
+    def _cache_new_user(self, user_model):
+        self.cache.set(_id_key(user_model.id), public_user(user_model.attribute_values))
+        self.cache.set(_username_key(user_model.username), user_model.id)
 
     def update_user(self, user_id, user_data):
+        # A rename moves the reservation in the same transaction as the user
+        # write. Returns (user, error) like add_user; error is "User not found"
+        # or "Username already exists" for the caller to report.
+        self.cache.delete(_id_key(user_id))
         try:
-            user_model = UserModel.get(user_id)
-            for key, value in user_data.items():
-                setattr(user_model, key, value)
-            user_model.save()
-            return user_model.attribute_values
+            user_model = UserModel.get(user_id, consistent_read=True)
         except DoesNotExist:
-            return None
-        except (GetError, PutError) as e:
+            return None, "User not found"
+        except GetError as e:
             print(f"Error updating user: {e}")
-            return None
+            return None, "Failed to update user"
+        old_username = user_model.username
+        for key in USER_UPDATABLE_FIELDS:
+            if key in user_data:
+                setattr(user_model, key, user_data[key])
+        if user_model.username != old_username and self._legacy_username_holder(user_model.username) not in (None, user_id):
+            return None, "Username already exists"
+        try:
+            if user_model.username == old_username:
+                # Conditional, so a user deleted in the meantime is not recreated
+                user_model.save(condition=UserModel.id.exists())
+            else:
+                user_model.updated_at = datetime.now()
+                with _transaction() as transaction:
+                    transaction.save(
+                        UsernameReservationModel(_reservation_id(user_model.username), user_id=user_id),
+                        condition=UsernameReservationModel.id.does_not_exist()
+                    )
+                    transaction.delete(
+                        UsernameReservationModel(_reservation_id(old_username)),
+                        condition=_release_condition(user_id)
+                    )
+                    transaction.save(user_model, condition=UserModel.username == old_username)
+        except TransactWriteError as e:
+            if _condition_failed(e, 0):
+                return None, "Username already exists"
+            if _condition_failed(e, 2):
+                # Deleted or renamed since it was read
+                return None, "User not found"
+            print(f"Error updating user: {e}")
+            return None, "Failed to update user"
+        except PutError as e:
+            if e.cause_response_code == CONDITIONAL_CHECK_FAILED:
+                return None, "User not found"
+            print(f"Error updating user: {e}")
+            return None, "Failed to update user"
+        finally:
+            self.cache.delete(_id_key(user_id), _username_key(old_username), _username_key(user_model.username))
+        return user_model.attribute_values, None
+
+    def update_password_hash(self, user_id, old_hash, new_hash):
+        # Replaces the hash only while it is still `old_hash`, so an upgrade that
+        # raced with a password change never restores the old password. Returns
+        # whether the hash was replaced.
+        try:
+            UserModel(user_id).update(
+                actions=[UserModel.password_hash.set(new_hash)],
+                condition=UserModel.password_hash == old_hash
+            )
+        except UpdateError as e:
+            if e.cause_response_code != CONDITIONAL_CHECK_FAILED:
+                print(f"Error updating password hash: {e}")
+            return False
+        finally:
+            self.cache.delete(_id_key(user_id))
+        return True
 
     def delete_user(self, user_id):
+        # Deletes the user and releases its username in one transaction; returns
+        # whether the user was deleted.
+        self.cache.delete(_id_key(user_id))
         try:
-            user_model = UserModel.get(user_id)
-            user_model.delete()
-            return True
+            user_model = UserModel.get(user_id, consistent_read=True)
         except DoesNotExist:
             return False
-        except DeleteError as e:
+        except GetError as e:
             print(f"Error deleting user: {e}")
-            return False
\ No newline at end of file
+            return False
+        try:
+            with _transaction() as transaction:
+                transaction.delete(UserModel(user_id), condition=UserModel.username == user_model.username)
+                transaction.delete(
+                    UsernameReservationModel(_reservation_id(user_model.username)),
+                    condition=_release_condition(user_id)
+                )
+        except TransactWriteError as e:
+            if not _condition_failed(e, 0):
+                print(f"Error deleting user: {e}")
+            return False
+        self.cache.delete(_id_key(user_id), _username_key(user_model.username))
+        return True
+
+    def reserve_usernames(self, total_segments, page_size=None):
+        # Backfills reservations for users created before they existed. Safe to
+        # rerun; returns (reserved, conflicts) where conflicts lists the users
+        # whose username is already reserved by someone else.
+        reserved = 0
+        conflicts = []
+        for user in self.iter_all_users(total_segments, page_size):
+            try:
+                UsernameReservationModel(_reservation_id(user['username']), user_id=user['id']).save(
+                    condition=UsernameReservationModel.id.does_not_exist()
+                    | (UsernameReservationModel.user_id == user['id'])
+                )
+                reserved += 1
+            except PutError as e:
+                if e.cause_response_code != CONDITIONAL_CHECK_FAILED:
+                    raise
+                conflicts.append(user)
+        return reserved, conflicts
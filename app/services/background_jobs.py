@@ -0,0 +1,57 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+class BackgroundJobRegistry:
+    # Runs long operations on a small thread pool. The worker running a job
+    # writes its status to `statuses` (a cache from create_cache) on every
+    # change, so with CACHE_BACKEND=redis any worker can answer a poll.
+
+    def __init__(self, statuses, max_workers=2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='background-job')
+        self._statuses = statuses
+        self._lock = threading.Lock()
+
+    def submit(self, owner_id, job_type, fn):
+        # `fn` is called with a `report(**progress)` callback and its return value
+        # (a dict) is merged into the final job status.
+        job_id = str(uuid.uuid4())
+        job = {
+            "id": job_id,
+            "owner_id": owner_id,
+            "type": job_type,
+            "state": "pending",
+            "progress": {},
+            "error": None,
+            "created_at": datetime.now().isoformat(),
+            "finished_at": None
+        }
+
+        def update(**changes):
+            # Under the lock so the status writes reach the cache in order
+            with self._lock:
+                job["progress"].update(changes.pop("progress", {}))
+                job.update(changes)
+                self._statuses.set(job_id, job)
+
+        update()
+
+        def report(**progress):
+            update(progress=progress)
+
+        def run():
+            update(state="running")
+            try:
+                result = fn(report) or {}
+                update(progress=result, state="completed", finished_at=datetime.now().isoformat())
+            except Exception as e:
+                print(f"Background job {job_id} failed: {e}")
+                update(state="failed", error=str(e), finished_at=datetime.now().isoformat())
+
+        self._executor.submit(run)
+        return job_id
+
+    def get(self, job_id):
+        return self._statuses.get(job_id)
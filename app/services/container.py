@@ -0,0 +1,52 @@
+from flask import current_app
+from app.repositories.cache import create_cache
+from app.repositories.storage import create_todo_repository, create_user_repository
+from app.services.background_jobs import BackgroundJobRegistry
+from app.services.password_hasher import create_password_hasher
+from app.services.todo_service import TodoService
+from app.services.token_blocklist import create_token_blocklist
+from app.services.user_service import UserService
+
+class ServiceContainer:
+    # The services of one application and the stateful objects behind them
+    # (repositories, caches, hasher pool, token blocklist, job registry), built
+    # from the application's config by create_app. Nothing is created when a
+    # module is imported, so each app gets the backends its own config selects.
+
+    def __init__(self, config):
+        self.todo_list_cache = create_cache(
+            config,
+            namespace='todo-lists',
+            max_entries=config.TODO_LIST_CACHE_MAX_ENTRIES,
+            ttl_seconds=config.TODO_LIST_CACHE_TTL_SECONDS
+        )
+        self.password_hasher = create_password_hasher(config)
+        self.token_blocklist = create_token_blocklist(config)
+        # Job status is rewritten while the job runs, so it bypasses the near-cache
+        self.background_jobs = BackgroundJobRegistry(
+            create_cache(
+                config,
+                namespace='background-jobs',
+                max_entries=config.BACKGROUND_JOB_MAX_TRACKED,
+                ttl_seconds=config.BACKGROUND_JOB_STATUS_TTL_SECONDS,
+                near_cache=False
+            ),
+            max_workers=config.BACKGROUND_JOB_WORKERS
+        )
+        self.user_repo = create_user_repository(config)
+        self.todo_repo = create_todo_repository(config)
+        self.todo_service = TodoService(self.todo_repo, self.todo_list_cache, config.TODO_LIST_CACHE_SETTLE_SECONDS)
+        self.user_service = UserService(
+            self.user_repo,
+            self.todo_repo,
+            self.todo_service,
+            self.password_hasher,
+            self.token_blocklist,
+            self.background_jobs,
+            cascade_delete_workers=config.CASCADE_DELETE_WORKERS,
+            cascade_delete_page_size=config.CASCADE_DELETE_PAGE_SIZE
+        )
+
+def current_services():
+    # The ServiceContainer of the application handling the current request or CLI command
+    return current_app.extensions['services']
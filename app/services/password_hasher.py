@@ -0,0 +1,151 @@
+import math
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+
+class PasswordHasherBusyError(Exception):
+    # Raised when the hashing pool is saturated; controllers map it to 503.
+    pass
+
+
+def _hash_password(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify_password(password_hash, password):
+    return check_password_hash(password_hash, password)
+
+
+def canonical_method(method):
+    # Expands a Werkzeug method string to the form it records in the stored hash,
+    # e.g. 'scrypt' -> 'scrypt:32768:8:1', 'pbkdf2' -> 'pbkdf2:sha256:<default>'.
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        n, r, p = map(int, args) if args else (2 ** 15, 8, 1)
+        return f"scrypt:{n}:{r}:{p}"
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    raise ValueError(f"Unsupported password hash method: {method}")
+
+
+def benchmark_method(method, rounds=5):
+    # Average seconds one hash takes with `method` on this machine.
+    started = time.perf_counter()
+    for _ in range(rounds):
+        generate_password_hash('benchmark-password', method=method)
+    return (time.perf_counter() - started) / rounds
+
+
+def recommend_method(method, seconds_per_hash, target_seconds):
+    # KDF time scales linearly with the scrypt N / pbkdf2 iteration count, so scale
+    # the measured cost towards the target (scrypt N must stay a power of two).
+    name, *args = canonical_method(method).split(':')
+    scale = target_seconds / seconds_per_hash
+    if name == 'scrypt':
+        n, r, p = map(int, args)
+        exponent = max(14, round(math.log2(n * scale)))
+        return f"scrypt:{2 ** exponent}:{r}:{p}"
+    hash_name, iterations = args[0], int(args[1])
+    return f"pbkdf2:{hash_name}:{max(100000, int(iterations * scale))}"
+
+
+class InlinePasswordHasher:
+    # Hashes on the calling thread. Used for tests and single-user tools.
+
+    def __init__(self, method):
+        self.method = method
+        self.target_method = canonical_method(method)
+
+    def needs_rehash(self, password_hash):
+        # Stored hashes look like '<method>$<salt>$<hash>'.
+        stored_method = password_hash.split('$', 1)[0]
+        return stored_method != self.target_method
+
+    def hash(self, password):
+        return _hash_password(password, self.method)
+
+    def verify(self, password_hash, password):
+        return _verify_password(password_hash, password)
+
+
+class ProcessPoolPasswordHasher(InlinePasswordHasher):
+    # Runs the KDF in a bounded process pool so it neither holds the GIL of the
+    # web worker nor queues without limit: once max_pending calls are in flight,
+    # new calls fail fast with PasswordHasherBusyError.
+
+    def __init__(self, method, max_workers, max_pending, timeout):
+        super().__init__(method)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def hash(self, password):
+        return self._run(_hash_password, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(_verify_password, password_hash, password)
+
+    def _get_executor(self):
+        # Created lazily so importing the service never spawns processes.
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def _reset_executor(self, broken):
+        # A worker process died (e.g. killed by the OOM killer), which breaks
+        # the pool for good: drop it so the next call starts a fresh one.
+        with self._executor_lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False)
+
+    def _run(self, fn, *args):
+        try:
+            return self._run_once(fn, *args)
+        except BrokenProcessPool:
+            return self._run_once(fn, *args)
+
+    def _run_once(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusyError("Password hashing capacity exceeded")
+        executor = self._get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except Exception as e:
+            self._slots.release()
+            if isinstance(e, BrokenProcessPool):
+                self._reset_executor(executor)
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise PasswordHasherBusyError("Password hashing timed out")
+        except BrokenProcessPool:
+            self._reset_executor(executor)
+            raise
+
+
+def create_password_hasher(config):
+    if config.PASSWORD_HASH_BACKEND == 'inline':
+        return InlinePasswordHasher(config.PASSWORD_HASH_METHOD)
+    if config.PASSWORD_HASH_BACKEND == 'process':
+        return ProcessPoolPasswordHasher(
+            config.PASSWORD_HASH_METHOD,
+            max_workers=config.PASSWORD_HASH_WORKERS,
+            max_pending=config.PASSWORD_HASH_MAX_PENDING,
+            timeout=config.PASSWORD_HASH_TIMEOUT
+        )
+    raise ValueError(f"Unknown PASSWORD_HASH_BACKEND: {config.PASSWORD_HASH_BACKEND}")
@@ -0,0 +1,58 @@
+from werkzeug.security import generate_password_hash
+
+# Synthetic users share one hash computed with a deliberately cheap method, so
+# seeding costs one KDF call in total instead of one per user. Logging in as a
+# seeded user works and upgrades its hash like any outdated one.
+SEED_PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1'
+SEED_TODO_STATUSES = ('pending', 'completed')
+
+class SeedService:
+    # Fills the configured storage backend with synthetic users and todos for
+    # local development and load tests. Never runs on its own: use the
+    # `seed-data` CLI command or call seed() from a test fixture.
+
+    def __init__(self, user_repo, todo_repo):
+        self.user_repo = user_repo
+        self.todo_repo = todo_repo
+
+    def seed(self, users, todos_per_user, password, prefix='testuser', hash_method=SEED_PASSWORD_HASH_METHOD,
+             batch_size=1000, max_workers=4, progress=None):
+        # Users are named <prefix><n>; usernames that already exist are skipped,
+        # so running the command again only tops the data set up. Users and todos
+        # are written through add_users/add_todos in batches of `batch_size`, so
+        # memory stays flat however many rows are generated. Returns
+        # (users_created, todos_created).
+        password_hash = generate_password_hash(password, method=hash_method)
+        users_created = 0
+        todos_created = 0
+        pending_todos = []
+
+        def flush():
+            nonlocal todos_created
+            results = self.todo_repo.add_todos(pending_todos, max_workers=max_workers)
+            todos_created += sum(1 for result in results if result['error'] is None)
+            pending_todos.clear()
+            if progress:
+                progress(users=users_created, todos=todos_created)
+
+        for offset in range(0, users, batch_size):
+            usernames = [f"{prefix}{number}" for number in range(offset + 1, min(offset + batch_size, users) + 1)]
+            results = self.user_repo.add_users([
+                {"username": username, "email": f"{username}@example.com", "password_hash": password_hash}
+                for username in usernames
+            ], max_workers=max_workers)
+            for username, result in zip(usernames, results):
+                if result['error']:
+                    continue
+                users_created += 1
+                for index in range(todos_per_user):
+                    pending_todos.append({
+                        "user_id": result['id'],
+                        "description": f"Todo {index + 1} of {username}",
+                        "status": SEED_TODO_STATUSES[index % len(SEED_TODO_STATUSES)]
+                    })
+                    if len(pending_todos) >= batch_size:
+                        flush()
+        if pending_todos:
+            flush()
+        return users_created, todos_created
@@ -1,10 +1,47 @@
-from app.repositories.todo_repository import TodoRepository
+from app.repositories.storage import TODO_UPDATABLE_FIELDS
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import time
 import uuid
 from datetime import datetime
 
+def _version_key(user_id):
+    return f"todos:version:{user_id}"
+
+def _new_version(now):
+    # '<milliseconds>-<random>': the time tells whether the write has settled
+    return f"{int(now * 1000)}-{uuid.uuid4().hex}"
+
+def _version_time(version):
+    created_ms, separator, _ = version.partition('-')
+    return int(created_ms) / 1000 if separator and created_ms.isdigit() else 0
+
+def _page_key(user_id, version, limit, cursor):
+    return f"todos:page:{user_id}:{version}:{limit}:{cursor or ''}"
+
+def _new_todo_data(user_id, item):
+    return {
+        "user_id": user_id,
+        "description": item['description'],
+        "status": item.get('status') or 'pending'
+    }
+
 class TodoService:
-    def __init__(self):
-        self.todo_repo = TodoRepository()
+    # todo_list_cache holds per-user todo list versions and pre-serialized list
+    # pages. A version is a random token replaced on every write, so an evicted
+    # or expired version can never collide with an ETag a client still holds.
+    # Pages are listed from the eventually consistent user_id_index, so for
+    # settle_seconds after a write the version is withheld and nothing is cached.
+
+    def __init__(self, todo_repo, todo_list_cache, settle_seconds=2, clock=time.time):
+        self.todo_repo = todo_repo
+        self.todo_list_cache = todo_list_cache
+        self.settle_seconds = settle_seconds
+        self._clock = clock
+
+    def invalidate_user_todos(self, user_id):
+        # Delete first so shared cache backends publish the invalidation to other processes.
+        self.todo_list_cache.delete(_version_key(user_id))
+        self.todo_list_cache.set(_version_key(user_id), _new_version(self._clock()))
 
     def create_todo(self, user_id, description, status='pending'):
         new_todo_id = str(uuid.uuid4())
@@ -16,30 +53,127 @@ class TodoService:
             "created_at": datetime.now().isoformat(),
             "updated_at": datetime.now().isoformat()
         }
-        return self.todo_repo.add_todo(todo_data)
+        todo = self.todo_repo.add_todo(todo_data)
+        if todo:
+            self.invalidate_user_todos(user_id)
+        return todo
+
+    def create_todos(self, user_id, items, max_workers=4):
+        todos_data = [_new_todo_data(user_id, item) for item in items]
+        results = self.todo_repo.add_todos(todos_data, max_workers=max_workers)
+        self.invalidate_user_todos(user_id)
+        return results
+
+    def import_todos(self, user_id, rows, batch_size=1000, max_in_flight=2, max_workers=4):
+        # Imports (line, item, error) tuples, typically parsed lazily from an
+        # upload: rows with an error are reported, the rest are written through
+        # add_todos in batches of `batch_size`. Up to `max_in_flight` batches are
+        # written while the next ones are parsed; parsing waits for a free slot,
+        # so memory stays bounded however long the input is. Yields an event for
+        # every failed row, a progress event after every written batch and a
+        # final summary, all carrying the running counts.
+        counts = {"rows": 0, "created": 0, "failed": 0}
+        batch_lines = []
+        batch_items = []
+        in_flight = set()
+        executor = ThreadPoolExecutor(max_workers=max_in_flight)
+
+        def write_batch(lines, todos_data):
+            return lines, self.todo_repo.add_todos(todos_data, max_workers=max_workers)
+
+        def wait_for_batches(limit):
+            nonlocal in_flight
+            while len(in_flight) > limit:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                yield from finished(done)
+
+        def submit(lines, todos_data):
+            yield from wait_for_batches(max_in_flight - 1)
+            in_flight.add(executor.submit(write_batch, lines, todos_data))
+
+        def finished(futures):
+            for future in futures:
+                lines, results = future.result()
+                for line, result in zip(lines, results):
+                    if result['error']:
+                        counts['failed'] += 1
+                        yield {"event": "error", "line": line, "error": result['error']}
+                    else:
+                        counts['created'] += 1
+                self.invalidate_user_todos(user_id)
+                yield {"event": "progress", **counts}
+
+        with executor:
+            for line, item, error in rows:
+                counts['rows'] += 1
+                if error:
+                    counts['failed'] += 1
+                    yield {"event": "error", "line": line, "error": error}
+                    continue
+                batch_lines.append(line)
+                batch_items.append(_new_todo_data(user_id, item))
+                if len(batch_items) >= batch_size:
+                    yield from submit(batch_lines, batch_items)
+                    batch_lines = []
+                    batch_items = []
+            if batch_items:
+                yield from submit(batch_lines, batch_items)
+            yield from wait_for_batches(0)
+        yield {"event": "done", **counts}
 
     def get_user_todos(self, user_id):
         return self.todo_repo.get_todos_by_user_id(user_id)
 
+    def get_user_todos_page(self, user_id, limit, cursor=None):
+        return self.todo_repo.get_todos_page_by_user_id(user_id, limit, cursor)
+
+    def iter_user_todos(self, user_id, page_size=None):
+        # Lazily pages through all of the user's todos, oldest first (exports).
+        return self.todo_repo.iter_todos_by_user_id(user_id, page_size)
+
+    def get_todos_version(self, user_id):
+        # The user's todo list version, or None while the last write may not be
+        # visible in the index yet (a version that was evicted counts as new).
+        version = self.todo_list_cache.get(_version_key(user_id))
+        if version is None:
+            version = _new_version(self._clock())
+            self.todo_list_cache.set(_version_key(user_id), version)
+        if self._clock() - _version_time(version) < self.settle_seconds:
+            return None
+        return version
+
+    def get_serialized_todos_page(self, user_id, limit, cursor, version, serialize):
+        # Returns serialize(todos, next_cursor) for the page, reusing the cached
+        # result while the user's todo list version is unchanged. Without a
+        # version (a recent write) the page is read and serialized every time.
+        if version is None:
+            return serialize(*self.get_user_todos_page(user_id, limit, cursor))
+        key = _page_key(user_id, version, limit, cursor)
+        body = self.todo_list_cache.get(key)
+        if body is None:
+            todos, next_cursor = self.get_user_todos_page(user_id, limit, cursor)
+            body = serialize(todos, next_cursor)
+            self.todo_list_cache.set(key, body)
+        return body
+
     def get_todo_by_id_and_user(self, todo_id, user_id):
         todo = self.todo_repo.get_todo_by_id(todo_id)
         if todo and todo['user_id'] == user_id:
             return todo
         return None
 
+    def get_todos_by_ids(self, todo_ids, user_id):
+        return self.todo_repo.get_todos_by_ids(todo_ids, user_id)
+
     def update_todo(self, todo_id, user_id, update_data):
-        todo = self.todo_repo.get_todo_by_id(todo_id)
-        if not todo or todo['user_id'] != user_id:
-            return None
-        
-        todo['description'] = update_data.get('description', todo['description'])
-        todo['status'] = update_data.get('status', todo['status'])
-        todo['updated_at'] = datetime.now().isoformat()
-        return self.todo_repo.update_todo(todo_id, todo)
+        changes = {key: update_data[key] for key in TODO_UPDATABLE_FIELDS if key in update_data}
+        todo = self.todo_repo.update_todo(todo_id, user_id, changes)
+        if todo:
+            self.invalidate_user_todos(user_id)
+        return todo
 
     def delete_todo(self, todo_id, user_id):
-        todo = self.todo_repo.get_todo_by_id(todo_id)
-        if not todo or todo['user_id'] != user_id:
-            return False
-        
-        return self.todo_repo.delete_todo(todo_id)
+        deleted = self.todo_repo.delete_todo(todo_id, user_id)
+        if deleted:
+            self.invalidate_user_todos(user_id)
+        return deleted
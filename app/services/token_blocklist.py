@@ -0,0 +1,109 @@
+import threading
+import time
+
+
+def _jti_key(jti):
+    return f"jti:{jti}"
+
+
+def _user_key(user_id):
+    return f"user:{user_id}"
+
+
+class TokenBlocklist:
+    # Revoked JWTs, checked by Flask-JWT-Extended's blocklist hook on every
+    # protected request. Single tokens are revoked by jti (logout); all tokens of
+    # a user issued up to a point in time by user id (user deleted). Access tokens
+    # carry the jti of the refresh token of their login as refresh_jti, so a
+    # logout with either token ends the whole login. Entries are only kept until
+    # the revoked tokens would have expired anyway.
+
+    def __init__(self, max_token_lifetime_seconds):
+        self.max_token_lifetime_seconds = max_token_lifetime_seconds
+
+    def revoke_token(self, jwt_payload):
+        now = time.time()
+        self._store(_jti_key(jwt_payload['jti']), now, jwt_payload['exp'])
+        if jwt_payload.get('refresh_jti'):
+            # The refresh token's exp is not in the access token; it expires
+            # within max_token_lifetime_seconds
+            self._store(_jti_key(jwt_payload['refresh_jti']), now, now + self.max_token_lifetime_seconds)
+
+    def revoke_user(self, user_id):
+        # Tokens are at most max_token_lifetime_seconds old when they expire
+        now = time.time()
+        self._store(_user_key(user_id), now, now + self.max_token_lifetime_seconds)
+
+    def is_revoked(self, jwt_payload):
+        keys = [_jti_key(jwt_payload['jti']), _user_key(jwt_payload['sub'])]
+        if jwt_payload.get('refresh_jti'):
+            keys.append(_jti_key(jwt_payload['refresh_jti']))
+        token_revoked_at, user_revoked_at, *login_revoked_at = self._lookup(*keys)
+        if token_revoked_at is not None or any(revoked_at is not None for revoked_at in login_revoked_at):
+            return True
+        return user_revoked_at is not None and jwt_payload['iat'] <= user_revoked_at
+
+
+class MemoryTokenBlocklist(TokenBlocklist):
+    # Per-process dict of key -> (revoked_at, expires_at). Expired entries are
+    # dropped in one pass whenever the dict has doubled since the last pass.
+
+    def __init__(self, max_token_lifetime_seconds, clock=time.time):
+        super().__init__(max_token_lifetime_seconds)
+        self._clock = clock
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._purge_at = 1024
+
+    def _store(self, key, revoked_at, expires_at):
+        with self._lock:
+            self._entries[key] = (revoked_at, expires_at)
+            if len(self._entries) >= self._purge_at:
+                now = self._clock()
+                self._entries = {key: entry for key, entry in self._entries.items() if entry[1] > now}
+                self._purge_at = max(1024, 2 * len(self._entries))
+
+    def _lookup(self, *keys):
+        now = self._clock()
+        results = []
+        for key in keys:
+            entry = self._entries.get(key)
+            results.append(entry[0] if entry and entry[1] > now else None)
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {"backend": "memory", "entries": len(self._entries)}
+
+
+class RedisTokenBlocklist(TokenBlocklist):
+    # Shared by every worker and node: one key per entry, expiring in Redis at
+    # the entry's expiry, and one MGET per check.
+
+    def __init__(self, client, max_token_lifetime_seconds, namespace='token-blocklist'):
+        super().__init__(max_token_lifetime_seconds)
+        self.client = client
+        self.namespace = namespace
+
+    def _store(self, key, revoked_at, expires_at):
+        self.client.set(f"{self.namespace}:{key}", repr(revoked_at), exat=int(expires_at) + 1)
+
+    def _lookup(self, *keys):
+        values = self.client.mget([f"{self.namespace}:{key}" for key in keys])
+        return [float(value) if value is not None else None for value in values]
+
+    def stats(self):
+        return {"backend": "redis"}
+
+
+def create_token_blocklist(config):
+    # Builds the blocklist selected by JWT_BLOCKLIST_BACKEND in config.py.
+    max_token_lifetime_seconds = max(
+        config.JWT_ACCESS_TOKEN_EXPIRES, config.JWT_REFRESH_TOKEN_EXPIRES
+    ).total_seconds()
+    if config.JWT_BLOCKLIST_BACKEND == 'memory':
+        return MemoryTokenBlocklist(max_token_lifetime_seconds)
+    if config.JWT_BLOCKLIST_BACKEND == 'redis':
+        import redis
+        return RedisTokenBlocklist(redis.Redis.from_url(config.CACHE_REDIS_URL), max_token_lifetime_seconds)
+    raise ValueError(f"Unknown JWT_BLOCKLIST_BACKEND: {config.JWT_BLOCKLIST_BACKEND}")
@@ -1,20 +1,39 @@
-from app.repositories.user_repository import UserRepository
-from app.repositories.todo_repository import TodoRepository
-from werkzeug.security import generate_password_hash, check_password_hash
+import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# Password upgrades waiting or running at once; logins beyond it skip the
+# upgrade, which the next login schedules again.
+PASSWORD_REHASH_MAX_PENDING = 100
+
+class UserDeletionError(Exception):
+    # Some of the user's todos could not be deleted. The user is kept, so
+    # deleting it again retries the remaining todos.
+    pass
+
 class UserService:
-    def __init__(self):
-        self.user_repo = UserRepository()
-        self.todo_repo = TodoRepository()
+    def __init__(self, user_repo, todo_repo, todo_service, password_hasher, token_blocklist, background_jobs,
+                 cascade_delete_workers=4, cascade_delete_page_size=1000):
+        self.user_repo = user_repo
+        self.todo_repo = todo_repo
+        self.todo_service = todo_service
+        self.password_hasher = password_hasher
+        self.token_blocklist = token_blocklist
+        # One registry per app, so later requests can read a job's status.
+        self.background_jobs = background_jobs
+        self.cascade_delete_workers = cascade_delete_workers
+        self.cascade_delete_page_size = cascade_delete_page_size
+        # Password upgrades are internal, so they stay out of the job registry
+        # whose status the users API serves; at most one per user at a time.
+        self._rehash_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='password-rehash')
+        self._rehashing = set()
+        self._rehashing_lock = threading.Lock()
 
     def signup_user(self, username, password, email=None):
-        if self.user_repo.get_user_by_username(username):
-            return None, "Username already exists"
-
+        # UserRepository.add_user rejects duplicate usernames, so no lookup here.
         new_user_id = str(uuid.uuid4())
-        hashed_password = generate_password_hash(password)
+        hashed_password = self.password_hasher.hash(password)
         
         user_data = {
             "id": new_user_id,
@@ -31,34 +50,97 @@ class UserService:
 
     def authenticate_user(self, username, password):
         user = self.user_repo.get_user_by_username(username)
-        if user and check_password_hash(user['password_hash'], password):
+        if user and self.password_hasher.verify(user['password_hash'], password):
+            if self.password_hasher.needs_rehash(user['password_hash']):
+                self._schedule_password_rehash(user['id'], user['password_hash'], password)
             return user
         return None
 
+    def _schedule_password_rehash(self, user_id, old_hash, password):
+        # The stored hash uses an outdated algorithm or cost: upgrade it off the
+        # request path now that we know the plaintext is correct. The write only
+        # replaces the hash that was verified, so it cannot undo a password
+        # change that happened in the meantime.
+        with self._rehashing_lock:
+            if user_id in self._rehashing or len(self._rehashing) >= PASSWORD_REHASH_MAX_PENDING:
+                return
+            self._rehashing.add(user_id)
+
+        def rehash():
+            try:
+                self.user_repo.update_password_hash(user_id, old_hash, self.password_hasher.hash(password))
+            except Exception as e:
+                print(f"Password rehash of user {user_id} failed: {e}")
+            finally:
+                with self._rehashing_lock:
+                    self._rehashing.discard(user_id)
+        self._rehash_executor.submit(rehash)
+
     def get_user_profile(self, user_id):
         return self.user_repo.get_user_by_id(user_id)
 
     def update_user_profile(self, user_id, update_data):
-        user = self.user_repo.get_user_by_id(user_id)
-        if not user:
-            return None
-        
-        user['username'] = update_data.get('username', user['username'])
-        user['email'] = update_data.get('email', user['email'])
-        user['updated_at'] = datetime.now().isoformat()
-        self.user_repo.update_user(user_id, user)
-        return user
+        # Returns (user, error); the repository reports a missing user and a
+        # taken username, and only what it saved is returned.
+        changes = {key: update_data[key] for key in ('username', 'email') if key in update_data}
+        return self.user_repo.update_user(user_id, changes)
 
     def delete_user(self, user_id):
-        if not self.user_repo.get_user_by_id(user_id):
+        # Todos go first: if the cascade fails the user is still there and the
+        # request can be retried, instead of leaving todos nobody owns. For a
+        # missing user the cascade is an empty query and delete_user is False.
+        self._delete_user_todos(user_id)
+        if not self.user_repo.delete_user(user_id):
             return False
-        
-        # Delete associated todos
-        user_todos = self.todo_repo.get_todos_by_user_id(user_id)
-        for todo in user_todos:
-            self.todo_repo.delete_todo(todo['id'])
+        self.token_blocklist.revoke_user(user_id)
+        return True
+
+    def delete_user_in_background(self, user_id):
+        # A background job deletes the user's todos and then the user. Their
+        # sessions end only once the user is gone, so the token that started
+        # the job can poll it until then. Returns the job id, or None when the
+        # user does not exist.
+        if not self.user_repo.get_user_by_id(user_id):
+            return None
+
+        def delete(report):
+            result = self._delete_user_todos(user_id, report)
+            if self.user_repo.delete_user(user_id):
+                self.token_blocklist.revoke_user(user_id)
+            return result
+        return self.background_jobs.submit(user_id, 'user_cascade_delete', delete)
+
+    def revoke_token(self, jwt_payload):
+        self.token_blocklist.revoke_token(jwt_payload)
+
+    def is_token_revoked(self, jwt_payload):
+        return self.token_blocklist.is_revoked(jwt_payload)
 
-        return self.user_repo.delete_user(user_id)
+    def get_deletion_job(self, job_id):
+        return self.background_jobs.get(job_id)
+
+    def _delete_user_todos(self, user_id, progress=None):
+        deleted, failed_ids = self.todo_repo.delete_todos_by_user_id(
+            user_id,
+            max_workers=self.cascade_delete_workers,
+            page_size=self.cascade_delete_page_size,
+            progress=progress
+        )
+        self.todo_service.invalidate_user_todos(user_id)
+        if failed_ids:
+            raise UserDeletionError(f"Failed to delete {len(failed_ids)} todos of user {user_id}; the user was kept")
+        return {"deleted": deleted, "failed": len(failed_ids)}
 
     def get_all_users(self):
         return self.user_repo.get_all_users()
+
+    def get_user_cache_stats(self):
+        # None when the storage backend has no user cache
+        return self.user_repo.cache_stats()
+
+    def get_users_page(self, limit, cursor=None):
+        return self.user_repo.get_users_page(limit, cursor)
+
+    def iter_all_users(self, total_segments, page_size=None):
+        return self.user_repo.iter_all_users(total_segments, page_size)
+
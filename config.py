@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 from dotenv import load_dotenv
 
 basedir = os.path.abspath(os.path.dirname(__file__))
@@ -8,9 +9,29 @@ class Config:
     """Base configuration."""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-will-never-guess'
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY')
+    # Verified tokens remembered per worker (LRU, each until its exp), so a token
+    # sent again skips decoding and signature verification; 0 disables the cache
+    JWT_VERIFICATION_CACHE_MAX_ENTRIES = int(os.environ.get('JWT_VERIFICATION_CACHE_MAX_ENTRIES', 10000))
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=int(os.environ.get('JWT_ACCESS_TOKEN_EXPIRES_MINUTES', 15)))
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=int(os.environ.get('JWT_REFRESH_TOKEN_EXPIRES_DAYS', 30)))
+    # Revoked tokens (logout) and users (deleted): 'memory' (per process) or
+    # 'redis' (CACHE_REDIS_URL, shared by all workers and nodes; the default in production)
+    JWT_BLOCKLIST_BACKEND = os.environ.get('JWT_BLOCKLIST_BACKEND', 'memory')
     FLASK_ENV = os.environ.get('FLASK_ENV') or 'production'
     DEBUG = False
     TESTING = False
+    # Let Flask-JWT-Extended's handlers turn auth errors into 401/422 instead of
+    # Flask-RESTX converting them to 500 when DEBUG is off.
+    PROPAGATE_EXCEPTIONS = True
+
+    # Storage backend of the repositories: 'dynamodb', 'memory' (in-process, no AWS
+    # needed) or 'sqlite' (a local WAL-mode database file at SQLITE_PATH)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'dynamodb')
+    SQLITE_PATH = os.environ.get('SQLITE_PATH', os.path.join(basedir, 'data', 'app.db'))
+    # Synthetic users (and todos each) the memory backend is seeded with at startup;
+    # 0 starts empty. Other backends are seeded with the `seed-data` CLI command.
+    MEMORY_SEED_USERS = int(os.environ.get('MEMORY_SEED_USERS', 0))
+    MEMORY_SEED_TODOS_PER_USER = int(os.environ.get('MEMORY_SEED_TODOS_PER_USER', 3))
 
     # AWS DynamoDB Configuration
     AWS_ACCESS_KEY_ID = os.environ.get('AWS_ACCESS_KEY_ID')
@@ -19,6 +40,105 @@ class Config:
     DYNAMODB_USERS_TABLE_NAME = os.environ.get('DYNAMODB_USERS_TABLE_NAME')
     DYNAMODB_TODOS_TABLE_NAME = os.environ.get('DYNAMODB_TODOS_TABLE_NAME')
     DYNAMODB_DDL_ENABLED = os.environ.get('DYNAMODB_DDL', 'True').lower() == 'true'
+    # Endpoint override, e.g. http://localhost:8000 for DynamoDB Local or moto's server mode
+    DYNAMODB_ENDPOINT_URL = os.environ.get('DYNAMODB_ENDPOINT_URL')
+
+    # DynamoDB client connections. The pool should cover GUNICORN_THREADS plus the
+    # background, batch and cascade-delete workers, or requests open fresh connections.
+    DYNAMODB_MAX_POOL_CONNECTIONS = int(os.environ.get('DYNAMODB_MAX_POOL_CONNECTIONS', 50))
+    DYNAMODB_MAX_RETRY_ATTEMPTS = int(os.environ.get('DYNAMODB_MAX_RETRY_ATTEMPTS', 3))
+    DYNAMODB_CONNECT_TIMEOUT_SECONDS = float(os.environ.get('DYNAMODB_CONNECT_TIMEOUT_SECONDS', 2))
+    DYNAMODB_READ_TIMEOUT_SECONDS = float(os.environ.get('DYNAMODB_READ_TIMEOUT_SECONDS', 5))
+    DYNAMODB_TCP_KEEPALIVE = os.environ.get('DYNAMODB_TCP_KEEPALIVE', 'True').lower() == 'true'
+    # Connections per table each Gunicorn worker opens at startup; 0 disables the warm-up
+    DYNAMODB_WARM_UP_CONNECTIONS = int(os.environ.get('DYNAMODB_WARM_UP_CONNECTIONS', 4))
+
+    # Table capacity, applied by the `provision-tables` command. PAY_PER_REQUEST
+    # (on-demand) never throttles on provisioned limits; PROVISIONED uses the
+    # per-table and per-index units below as the starting (and minimum) capacity.
+    DYNAMODB_BILLING_MODE = os.environ.get('DYNAMODB_BILLING_MODE', 'PAY_PER_REQUEST')
+    DYNAMODB_USERS_READ_CAPACITY_UNITS = int(os.environ.get('DYNAMODB_USERS_READ_CAPACITY_UNITS', 5))
+    DYNAMODB_USERS_WRITE_CAPACITY_UNITS = int(os.environ.get('DYNAMODB_USERS_WRITE_CAPACITY_UNITS', 5))
+    DYNAMODB_USERNAME_INDEX_READ_CAPACITY_UNITS = int(os.environ.get('DYNAMODB_USERNAME_INDEX_READ_CAPACITY_UNITS', 5))
+    DYNAMODB_USERNAME_INDEX_WRITE_CAPACITY_UNITS = int(os.environ.get('DYNAMODB_USERNAME_INDEX_WRITE_CAPACITY_UNITS', 5))
+    DYNAMODB_TODOS_READ_CAPACITY_UNITS = int(os.environ.get('DYNAMODB_TODOS_READ_CAPACITY_UNITS', 10))
+    DYNAMODB_TODOS_WRITE_CAPACITY_UNITS = int(os.environ.get('DYNAMODB_TODOS_WRITE_CAPACITY_UNITS', 10))
+    DYNAMODB_TODO_USER_INDEX_READ_CAPACITY_UNITS = int(os.environ.get('DYNAMODB_TODO_USER_INDEX_READ_CAPACITY_UNITS', 10))
+    DYNAMODB_TODO_USER_INDEX_WRITE_CAPACITY_UNITS = int(os.environ.get('DYNAMODB_TODO_USER_INDEX_WRITE_CAPACITY_UNITS', 10))
+    # Target-tracking auto scaling for PROVISIONED tables and indexes: capacity
+    # moves between the units above and DYNAMODB_AUTOSCALING_MAX_CAPACITY_UNITS
+    DYNAMODB_AUTOSCALING_ENABLED = os.environ.get('DYNAMODB_AUTOSCALING_ENABLED', 'False').lower() == 'true'
+    DYNAMODB_AUTOSCALING_MAX_CAPACITY_UNITS = int(os.environ.get('DYNAMODB_AUTOSCALING_MAX_CAPACITY_UNITS', 1000))
+    DYNAMODB_AUTOSCALING_TARGET_UTILIZATION = float(os.environ.get('DYNAMODB_AUTOSCALING_TARGET_UTILIZATION', 70))
+
+    # Production WSGI server (gunicorn.conf.py)
+    GUNICORN_BIND = os.environ.get('GUNICORN_BIND', '0.0.0.0:5001')
+    GUNICORN_WORKERS = int(os.environ.get('GUNICORN_WORKERS', (os.cpu_count() or 1) * 2 + 1))
+    GUNICORN_THREADS = int(os.environ.get('GUNICORN_THREADS', 8))
+    GUNICORN_KEEPALIVE = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+    GUNICORN_TIMEOUT = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+    GUNICORN_GRACEFUL_TIMEOUT = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+    GUNICORN_MAX_REQUESTS = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+    GUNICORN_MAX_REQUESTS_JITTER = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 1000))
+
+    # Pagination
+    PAGINATION_DEFAULT_LIMIT = int(os.environ.get('PAGINATION_DEFAULT_LIMIT', 50))
+    PAGINATION_MAX_LIMIT = int(os.environ.get('PAGINATION_MAX_LIMIT', 200))
+
+    # Admin user export (parallel scan)
+    USER_EXPORT_SCAN_SEGMENTS = int(os.environ.get('USER_EXPORT_SCAN_SEGMENTS', 4))
+    USER_EXPORT_PAGE_SIZE = int(os.environ.get('USER_EXPORT_PAGE_SIZE', 500))
+
+    # Cascade delete of a user's todos (BatchWriteItem worker pool)
+    CASCADE_DELETE_WORKERS = int(os.environ.get('CASCADE_DELETE_WORKERS', 4))
+    CASCADE_DELETE_PAGE_SIZE = int(os.environ.get('CASCADE_DELETE_PAGE_SIZE', 1000))
+    BACKGROUND_JOB_WORKERS = int(os.environ.get('BACKGROUND_JOB_WORKERS', 2))
+    # Job status is kept in the CACHE_BACKEND, so any worker can serve a poll
+    BACKGROUND_JOB_MAX_TRACKED = int(os.environ.get('BACKGROUND_JOB_MAX_TRACKED', 1000))
+    BACKGROUND_JOB_STATUS_TTL_SECONDS = float(os.environ.get('BACKGROUND_JOB_STATUS_TTL_SECONDS', 86400))
+
+    # Bulk todo creation (POST /todos/batch)
+    TODO_BATCH_MAX_ITEMS = int(os.environ.get('TODO_BATCH_MAX_ITEMS', 10000))
+    TODO_BATCH_WRITE_WORKERS = int(os.environ.get('TODO_BATCH_WRITE_WORKERS', 4))
+    TODO_BATCH_GET_MAX_IDS = int(os.environ.get('TODO_BATCH_GET_MAX_IDS', 1000))
+
+    # Streaming todo export (GET /todos/export)
+    TODO_EXPORT_PAGE_SIZE = int(os.environ.get('TODO_EXPORT_PAGE_SIZE', 1000))
+
+    # Streaming todo import (POST /todos/import)
+    TODO_IMPORT_BATCH_SIZE = int(os.environ.get('TODO_IMPORT_BATCH_SIZE', 1000))
+    TODO_IMPORT_MAX_IN_FLIGHT = int(os.environ.get('TODO_IMPORT_MAX_IN_FLIGHT', 2))
+
+    # Password hashing: 'process' runs the KDF in a bounded process pool, 'inline' on the request thread
+    PASSWORD_HASH_BACKEND = os.environ.get('PASSWORD_HASH_BACKEND', 'process')
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    # Every Gunicorn worker has its own pool, so by default the CPUs are split between them
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 1) // GUNICORN_WORKERS)))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 64))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5))
+
+    # Cache backend shared by the user and todo list caches and the background job
+    # status: 'memory' (per process) or 'redis' (the default in production)
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    # Per-process near-cache in front of Redis; 0 disables it
+    CACHE_LOCAL_TTL_SECONDS = float(os.environ.get('CACHE_LOCAL_TTL_SECONDS', 5))
+
+    # Only while migrating data from before username reservations: set to True
+    # until `flask reserve-usernames` has backfilled a reservation for every
+    # existing user, so logins and username checks also query username_index.
+    USERNAME_INDEX_FALLBACK = os.environ.get('USERNAME_INDEX_FALLBACK', 'False').lower() == 'true'
+
+    # LRU/TTL cache for user lookups by id and username
+    USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES', 10000))
+    USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', 60))
+
+    # Per-user cache of serialized GET /todos pages, validated with ETags
+    TODO_LIST_CACHE_MAX_ENTRIES = int(os.environ.get('TODO_LIST_CACHE_MAX_ENTRIES', 10000))
+    TODO_LIST_CACHE_TTL_SECONDS = float(os.environ.get('TODO_LIST_CACHE_TTL_SECONDS', 300))
+    # Seconds after a write during which list pages get no ETag and are not cached,
+    # because user_id_index may not show the write yet
+    TODO_LIST_CACHE_SETTLE_SECONDS = float(os.environ.get('TODO_LIST_CACHE_SETTLE_SECONDS', 2))
 
 class DevelopmentConfig(Config):
     """Development configuration."""
@@ -27,10 +147,21 @@ class DevelopmentConfig(Config):
 class TestingConfig(Config):
     """Testing configuration."""
     TESTING = True
+    PASSWORD_HASH_BACKEND = 'inline'
 
 class ProductionConfig(Config):
     """Production configuration."""
-    pass
+    # Gunicorn runs several workers, which must share cached versions and entries
+    # and see every revoked token
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'redis')
+    JWT_BLOCKLIST_BACKEND = os.environ.get('JWT_BLOCKLIST_BACKEND', 'redis')
+
+def per_process_backends(app_config):
+    # Settings whose data lives in the memory of each process. Gunicorn workers
+    # are separate processes, so with more than one worker each would serve its
+    # own users and todos, cache entries, background job status or revoked tokens.
+    settings = ('STORAGE_BACKEND', 'CACHE_BACKEND', 'JWT_BLOCKLIST_BACKEND')
+    return [f"{name}=memory" for name in settings if getattr(app_config, name) == 'memory']
 
 config = {
     'development': DevelopmentConfig,
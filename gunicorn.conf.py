@@ -0,0 +1,39 @@
+import os
+
+# Imported under another name: `config` is itself a Gunicorn setting.
+from config import config as app_configs, per_process_backends
+
+# Gunicorn settings are read from the same configuration class as the app.
+current_config = app_configs[os.getenv('FLASK_ENV', 'production')]
+
+bind = current_config.GUNICORN_BIND
+workers = current_config.GUNICORN_WORKERS
+worker_class = 'gthread'
+threads = current_config.GUNICORN_THREADS
+keepalive = current_config.GUNICORN_KEEPALIVE
+timeout = current_config.GUNICORN_TIMEOUT
+graceful_timeout = current_config.GUNICORN_GRACEFUL_TIMEOUT
+max_requests = current_config.GUNICORN_MAX_REQUESTS
+max_requests_jitter = current_config.GUNICORN_MAX_REQUESTS_JITTER
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    # Fail before forking workers that would each hold their own copy of the state.
+    per_process = per_process_backends(current_config)
+    if server.cfg.workers > 1 and per_process:
+        raise RuntimeError(
+            f"{', '.join(per_process)} keeps data in each worker process, so {server.cfg.workers} workers "
+            "would disagree: use the shared backends (dynamodb/sqlite, redis) or GUNICORN_WORKERS=1"
+        )
+
+
+def post_worker_init(worker):
+    # Open the DynamoDB connection pools before the worker accepts requests.
+    if current_config.STORAGE_BACKEND != 'dynamodb':
+        return
+    from app.repositories.connection_pool import warm_up_connections
+    from app.repositories.dynamodb_models import UserModel, TodoModel
+    failed = warm_up_connections([UserModel, TodoModel], current_config.DYNAMODB_WARM_UP_CONNECTIONS)
+    worker.log.info("DynamoDB connection warm-up finished (%d failed calls)", failed)
@@ -2,15 +2,21 @@ import pytest
 from unittest.mock import patch, MagicMock
 from flask import Flask, json
 from flask_restx import Api
+from flask_jwt_extended import JWTManager, create_access_token, create_refresh_token
 from app.controllers.auth_controller import auth_ns
+from app.services.token_blocklist import MemoryTokenBlocklist
 
 # Create a test Flask app and API
 @pytest.fixture
 def app():
     app = Flask(__name__)
     app.config['TESTING'] = True
+    app.config['JWT_SECRET_KEY'] = 'test-secret-key-that-is-long-enough'
     api = Api(app)
     api.add_namespace(auth_ns)
+    jwt = JWTManager(app)
+    app.token_blocklist = MemoryTokenBlocklist(max_token_lifetime_seconds=3600)
+    jwt.token_in_blocklist_loader(lambda jwt_header, jwt_payload: app.token_blocklist.is_revoked(jwt_payload))
     yield app
 
 @pytest.fixture
@@ -18,9 +24,11 @@ def client(app):
     return app.test_client()
 
 @pytest.fixture
-def mock_user_service():
-    with patch('app.controllers.auth_controller.user_service') as mock_service:
-        yield mock_service
+def mock_user_service(app):
+    # The controllers resolve their service from the app's ServiceContainer
+    mock_service = MagicMock()
+    app.extensions['services'] = MagicMock(user_service=mock_service)
+    yield mock_service
 
 @pytest.fixture
 def mock_create_access_token():
@@ -28,6 +36,15 @@ def mock_create_access_token():
         mock_token.return_value = "mock_access_token"
         yield mock_token
 
+@pytest.fixture
+def mock_create_refresh_token():
+    with patch('app.controllers.auth_controller.create_refresh_token') as mock_token:
+        mock_token.return_value = "mock_refresh_token"
+        yield mock_token
+
+def _auth_header(token):
+    return {'Authorization': f'Bearer {token}'}
+
 def test_signup_user_success(client, mock_user_service):
     """Test successful user signup via the API."""
     mock_user_service.signup_user.return_value = ({'id': '123', 'username': 'testuser'}, None)
@@ -57,20 +74,24 @@ def test_signup_user_username_exists(client, mock_user_service):
     assert 'Username already exists' in response.json['message']
     mock_user_service.signup_user.assert_called_once_with('existinguser', 'password123')
 
-def test_login_user_success(client, mock_user_service, mock_create_access_token):
+def test_login_user_success(client, mock_user_service, mock_create_access_token, mock_create_refresh_token):
     """Test successful user login via the API."""
     mock_user_service.authenticate_user.return_value = {'id': '123', 'username': 'testuser'}
 
-    response = client.post(
-        '/auth/login',
-        data=json.dumps({'username': 'testuser', 'password': 'password123'}),
-        content_type='application/json'
-    )
+    with patch('app.controllers.auth_controller.get_jti', return_value='refresh-jti') as mock_get_jti:
+        response = client.post(
+            '/auth/login',
+            data=json.dumps({'username': 'testuser', 'password': 'password123'}),
+            content_type='application/json'
+        )
 
     assert response.status_code == 200
     assert response.json['access_token'] == 'mock_access_token'
+    assert response.json['refresh_token'] == 'mock_refresh_token'
     mock_user_service.authenticate_user.assert_called_once_with('testuser', 'password123')
-    mock_create_access_token.assert_called_once_with(identity='123')
+    mock_create_access_token.assert_called_once_with(identity='123', additional_claims={'refresh_jti': 'refresh-jti'})
+    mock_create_refresh_token.assert_called_once_with(identity='123')
+    mock_get_jti.assert_called_once_with('mock_refresh_token')
 
 def test_login_user_invalid_credentials(client, mock_user_service):
     """Test user login with invalid credentials."""
@@ -85,3 +106,76 @@ def test_login_user_invalid_credentials(client, mock_user_service):
     assert response.status_code == 401
     assert 'Invalid username or password' in response.json['message']
     mock_user_service.authenticate_user.assert_called_once_with('wronguser', 'wrongpass')
+
+
+def test_login_hasher_busy(client, mock_user_service):
+    """Test that a saturated password hashing pool returns 503."""
+    from app.services.password_hasher import PasswordHasherBusyError
+    mock_user_service.authenticate_user.side_effect = PasswordHasherBusyError("Password hashing capacity exceeded")
+
+    response = client.post(
+        '/auth/login',
+        data=json.dumps({'username': 'testuser', 'password': 'password123'}),
+        content_type='application/json'
+    )
+
+    assert response.status_code == 503
+    assert 'Password hashing capacity exceeded' in response.json['message']
+
+def test_refresh_issues_access_token_without_password_check(app, client, mock_user_service):
+    """Test that a refresh token is exchanged for a new access token."""
+    with app.app_context():
+        refresh_token = create_refresh_token(identity='123')
+        access_token = create_access_token(identity='123')
+
+    response = client.post('/auth/refresh', headers=_auth_header(refresh_token))
+
+    assert response.status_code == 200
+    assert response.json['access_token']
+    mock_user_service.authenticate_user.assert_not_called()
+    assert client.post('/auth/refresh', headers=_auth_header(access_token)).status_code == 422
+
+def test_logout_revokes_the_presented_token(app, client, mock_user_service):
+    """Test that a logged-out refresh token can no longer be used."""
+    mock_user_service.revoke_token.side_effect = app.token_blocklist.revoke_token
+    with app.app_context():
+        refresh_token = create_refresh_token(identity='123')
+
+    assert client.post('/auth/logout', headers=_auth_header(refresh_token)).status_code == 204
+    response = client.post('/auth/refresh', headers=_auth_header(refresh_token))
+
+    assert response.status_code == 401
+    assert mock_user_service.revoke_token.call_args.args[0]['type'] == 'refresh'
+
+def test_logout_with_access_token_revokes_its_refresh_token(app, client, mock_user_service):
+    """Test that logging out with the access token also ends the refresh token of that login."""
+    mock_user_service.authenticate_user.return_value = {'id': '123', 'username': 'testuser'}
+    mock_user_service.revoke_token.side_effect = app.token_blocklist.revoke_token
+    tokens = client.post(
+        '/auth/login',
+        data=json.dumps({'username': 'testuser', 'password': 'password123'}),
+        content_type='application/json'
+    ).json
+
+    assert client.post('/auth/logout', headers=_auth_header(tokens['access_token'])).status_code == 204
+
+    assert client.post('/auth/refresh', headers=_auth_header(tokens['refresh_token'])).status_code == 401
+
+def test_logout_with_refresh_token_revokes_refreshed_access_tokens(app, client, mock_user_service):
+    """Test that access tokens issued from a revoked refresh token stop working."""
+    mock_user_service.revoke_token.side_effect = app.token_blocklist.revoke_token
+    with app.app_context():
+        refresh_token = create_refresh_token(identity='123')
+    access_token = client.post('/auth/refresh', headers=_auth_header(refresh_token)).json['access_token']
+
+    assert client.post('/auth/logout', headers=_auth_header(refresh_token)).status_code == 204
+
+    assert client.post('/auth/logout', headers=_auth_header(access_token)).status_code == 401
+
+def test_refresh_rejected_after_user_deleted(app, client):
+    """Test that deleting a user revokes every token issued to them."""
+    with app.app_context():
+        refresh_token = create_refresh_token(identity='123')
+    app.token_blocklist.revoke_user('123')
+
+    assert client.post('/auth/refresh', headers=_auth_header(refresh_token)).status_code == 401
@@ -2,7 +2,7 @@ import pytest
 from unittest.mock import patch, MagicMock
 from flask import Flask, json
 from flask_restx import Api
-from flask_jwt_extended import JWTManager
+from flask_jwt_extended import JWTManager, create_access_token
 from app.controllers.todo_controller import todos_ns
 
 # Create a test Flask app and API
@@ -24,9 +24,16 @@ def client(app):
     return app.test_client()
 
 @pytest.fixture
-def mock_todo_service():
-    with patch('app.controllers.todo_controller.todo_service') as mock_service:
-        yield mock_service
+def mock_todo_service(app):
+    # The controllers resolve their service from the app's ServiceContainer
+    mock_service = MagicMock()
+    app.extensions['services'] = MagicMock(todo_service=mock_service)
+    # Serve list pages straight from get_user_todos_page, like an empty cache would
+    mock_service.get_todos_version.return_value = 'v1'
+    mock_service.get_serialized_todos_page.side_effect = (
+        lambda user_id, limit, cursor, version, serialize: serialize(*mock_service.get_user_todos_page(user_id, limit, cursor))
+    )
+    yield mock_service
 
 @pytest.fixture
 def mock_jwt_required():
@@ -43,10 +50,10 @@ def mock_get_jwt_identity():
 @pytest.mark.xfail(reason="Known issue with Flask-RESTX validation/marshaling or JWT setup")
 def test_get_all_todos_success(client, mock_todo_service, mock_jwt_required, mock_get_jwt_identity):
     """Test getting all todos for the authenticated user."""
-    mock_todo_service.get_user_todos.return_value = [
+    mock_todo_service.get_user_todos_page.return_value = ([
         {'id': 'todo1', 'user_id': 'test_user_id', 'description': 'Task 1', 'status': 'pending', 'created_at': '2023-01-01T00:00:00', 'updated_at': '2023-01-01T00:00:00'},
         {'id': 'todo2', 'user_id': 'test_user_id', 'description': 'Task 2', 'status': 'completed', 'created_at': '2023-01-01T00:00:00', 'updated_at': '2023-01-01T00:00:00'}
-    ]
+    ], None)
     mock_get_jwt_identity.return_value = "test_user_id"
 
     response = client.get(
@@ -55,9 +62,147 @@ def test_get_all_todos_success(client, mock_todo_service, mock_jwt_required, moc
     )
 
     assert response.status_code == 200
-    assert len(response.json) == 2
-    assert response.json[0]['description'] == 'Task 1'
-    mock_todo_service.get_user_todos.assert_called_once_with('test_user_id')
+    assert len(response.json['items']) == 2
+    assert response.json['items'][0]['description'] == 'Task 1'
+    mock_todo_service.get_user_todos_page.assert_called_once_with('test_user_id', 50, None)
+
+@pytest.fixture
+def auth_headers(app):
+    with app.app_context():
+        token = create_access_token(identity="test_user_id")
+    return {'Authorization': f'Bearer {token}'}
+
+def test_get_todos_page_with_limit_and_cursor(client, mock_todo_service, auth_headers):
+    """Test that limit/cursor are forwarded and next_cursor is returned."""
+    mock_todo_service.get_user_todos_page.return_value = ([
+        {'id': 'todo1', 'user_id': 'test_user_id', 'description': 'Task 1', 'status': 'pending', 'created_at': '2023-01-01T00:00:00', 'updated_at': '2023-01-01T00:00:00'}
+    ], 'next-page-token')
+
+    response = client.get('/todos/?limit=1&cursor=abc', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert len(response.json['items']) == 1
+    assert response.json['next_cursor'] == 'next-page-token'
+    mock_todo_service.get_user_todos_page.assert_called_once_with('test_user_id', 1, 'abc')
+
+def test_get_todos_page_limit_is_clamped(client, app, mock_todo_service, auth_headers):
+    """Test that an oversized limit is clamped to PAGINATION_MAX_LIMIT."""
+    app.config['PAGINATION_MAX_LIMIT'] = 10
+    mock_todo_service.get_user_todos_page.return_value = ([], None)
+
+    response = client.get('/todos/?limit=100000', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json['next_cursor'] is None
+    mock_todo_service.get_user_todos_page.assert_called_once_with('test_user_id', 10, None)
+
+def test_get_todos_page_invalid_cursor(client, mock_todo_service, auth_headers):
+    """Test that a malformed cursor is rejected with 400."""
+    from app.repositories.pagination import InvalidCursorError
+    mock_todo_service.get_user_todos_page.side_effect = InvalidCursorError("Malformed cursor")
+
+    response = client.get('/todos/?cursor=garbage', headers=auth_headers)
+
+    assert response.status_code == 400
+    assert 'Malformed cursor' in response.json['message']
+
+def test_create_todos_batch(client, mock_todo_service, auth_headers):
+    """Test bulk creation returns per-item ids and errors."""
+    mock_todo_service.create_todos.return_value = [
+        {'id': 'todo1', 'error': None},
+        {'id': None, 'error': 'Todo was not written after retries'}
+    ]
+    items = [{'description': 'Task 1'}, {'description': 'Task 2', 'status': 'completed'}]
+
+    response = client.post('/todos/batch', data=json.dumps(items), content_type='application/json', headers=auth_headers)
+
+    assert response.status_code == 201
+    assert response.json['created'] == 1
+    assert response.json['failed'] == 1
+    assert response.json['results'][1] == {'index': 1, 'id': None, 'error': 'Todo was not written after retries'}
+    mock_todo_service.create_todos.assert_called_once_with('test_user_id', items, max_workers=4)
+
+def test_create_todos_batch_validation(client, app, mock_todo_service, auth_headers):
+    """Test that invalid items, empty and oversized batches are rejected."""
+    response = client.post('/todos/batch', data=json.dumps([{'status': 'pending'}]), content_type='application/json', headers=auth_headers)
+    assert response.status_code == 400
+
+    response = client.post('/todos/batch', data=json.dumps([]), content_type='application/json', headers=auth_headers)
+    assert response.status_code == 400
+
+    app.config['TODO_BATCH_MAX_ITEMS'] = 1
+    items = [{'description': 'Task 1'}, {'description': 'Task 2'}]
+    response = client.post('/todos/batch', data=json.dumps(items), content_type='application/json', headers=auth_headers)
+    assert response.status_code == 400
+    mock_todo_service.create_todos.assert_not_called()
+
+def test_batch_get_todos(client, mock_todo_service, auth_headers):
+    """Test fetching many todos by id reports missing ids."""
+    mock_todo_service.get_todos_by_ids.return_value = [
+        {'id': 'todo2', 'user_id': 'test_user_id', 'description': 'Task 2', 'status': 'pending', 'created_at': '2023-01-01T00:00:00', 'updated_at': '2023-01-01T00:00:00'}
+    ]
+
+    response = client.post('/todos/batch-get', data=json.dumps({'ids': ['todo1', 'todo2']}), content_type='application/json', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert [todo['id'] for todo in response.json['items']] == ['todo2']
+    assert response.json['missing'] == ['todo1']
+    mock_todo_service.get_todos_by_ids.assert_called_once_with(['todo1', 'todo2'], 'test_user_id')
+
+def test_batch_get_todos_too_many_ids(client, app, mock_todo_service, auth_headers):
+    """Test that requesting more than TODO_BATCH_GET_MAX_IDS ids is rejected."""
+    app.config['TODO_BATCH_GET_MAX_IDS'] = 1
+
+    response = client.post('/todos/batch-get', data=json.dumps({'ids': ['todo1', 'todo2']}), content_type='application/json', headers=auth_headers)
+
+    assert response.status_code == 400
+    mock_todo_service.get_todos_by_ids.assert_not_called()
+
+def test_get_todos_etag_not_modified(client, mock_todo_service, auth_headers):
+    """Test that a matching If-None-Match returns 304 without reading todos."""
+    mock_todo_service.get_user_todos_page.return_value = ([], None)
+    first = client.get('/todos/', headers=auth_headers)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    mock_todo_service.get_user_todos_page.reset_mock()
+
+    response = client.get('/todos/', headers={**auth_headers, 'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    mock_todo_service.get_user_todos_page.assert_not_called()
+    mock_todo_service.get_serialized_todos_page.assert_called_once()
+
+def test_get_todos_wildcard_if_none_match_is_not_a_match(client, mock_todo_service, auth_headers):
+    """Test that If-None-Match: * does not answer 304 to a client that never saw the list."""
+    mock_todo_service.get_user_todos_page.return_value = ([], None)
+
+    response = client.get('/todos/', headers={**auth_headers, 'If-None-Match': '*'})
+
+    assert response.status_code == 200
+    assert response.json == {'items': [], 'next_cursor': None}
+    assert response.headers['ETag']
+
+def test_get_todos_etag_changes_with_version(client, mock_todo_service, auth_headers):
+    """Test that a new todo list version invalidates the client's ETag."""
+    mock_todo_service.get_user_todos_page.return_value = ([], None)
+    etag = client.get('/todos/', headers=auth_headers).headers['ETag']
+
+    mock_todo_service.get_todos_version.return_value = 'v2'
+    response = client.get('/todos/', headers={**auth_headers, 'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+def test_get_todos_has_no_etag_right_after_a_write(client, mock_todo_service, auth_headers):
+    """Test that a page listed before the index settles is not given an ETag."""
+    mock_todo_service.get_user_todos_page.return_value = ([], None)
+    mock_todo_service.get_todos_version.return_value = None
+
+    response = client.get('/todos/', headers={**auth_headers, 'If-None-Match': '*'})
+
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
 
 @pytest.mark.xfail(reason="Known issue with Flask-RESTX validation/marshaling or JWT setup")
 def test_create_todo_success(client, mock_todo_service, mock_jwt_required, mock_get_jwt_identity):
@@ -249,4 +394,184 @@ def test_delete_todo_forbidden(client, mock_todo_service, mock_jwt_required, moc
 
     assert response.status_code == 404 # Controller returns 404 for both not found and forbidden
     assert 'Todo not found or you don\'t have permission.' in response.json['message']
-    mock_todo_service.delete_todo.assert_called_once_with(todo_id, 'another_user_id')
\ No newline at end of file
+    mock_todo_service.delete_todo.assert_called_once_with(todo_id, 'another_user_id')
+def _export_todos():
+    from datetime import datetime
+    return [
+        {'id': 'todo1', 'user_id': 'test_user_id', 'description': 'Task 1', 'status': 'pending',
+         'created_at': datetime(2023, 1, 1), 'updated_at': datetime(2023, 1, 1)},
+        {'id': 'todo2', 'user_id': 'test_user_id', 'description': 'Comma, "quoted"\nand newline', 'status': 'completed',
+         'created_at': '2023-01-02T00:00:00', 'updated_at': '2023-01-02T00:00:00'}
+    ]
+
+def test_export_todos_ndjson(client, mock_todo_service, auth_headers):
+    """Test that the export streams one JSON object per todo."""
+    mock_todo_service.iter_user_todos.return_value = iter(_export_todos())
+
+    response = client.get('/todos/export', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.is_streamed
+    assert 'attachment' in response.headers['Content-Disposition']
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['id'] for line in lines] == ['todo1', 'todo2']
+    assert lines[0]['created_at'] == '2023-01-01T00:00:00'
+    assert lines[1]['description'] == 'Comma, "quoted"\nand newline'
+    mock_todo_service.iter_user_todos.assert_called_once_with('test_user_id', 1000)
+
+def test_export_todos_csv(client, mock_todo_service, auth_headers):
+    """Test that the CSV export has a header row and quotes awkward values."""
+    import csv
+    import io
+    mock_todo_service.iter_user_todos.return_value = iter(_export_todos())
+
+    response = client.get('/todos/export?format=csv', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0] == ['id', 'user_id', 'description', 'status', 'created_at', 'updated_at']
+    assert rows[1] == ['todo1', 'test_user_id', 'Task 1', 'pending', '2023-01-01T00:00:00', '2023-01-01T00:00:00']
+    assert rows[2][2] == 'Comma, "quoted"\nand newline'
+    assert len(rows) == 3
+
+def test_export_todos_csv_escapes_formulas(client, mock_todo_service, auth_headers):
+    """Test that CSV cells a spreadsheet would evaluate are prefixed with a quote."""
+    import csv
+    import io
+    todos = _export_todos()
+    descriptions = ['=HYPERLINK("http://x")', '+1', '-1', '@SUM(A1)', '\tTab', '\rCR', "It's fine", "'=1+1"]
+    mock_todo_service.iter_user_todos.return_value = iter([dict(todos[0], description=d) for d in descriptions])
+
+    response = client.get('/todos/export?format=csv', headers=auth_headers)
+
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert [row[2] for row in rows[1:]] == [
+        '\'=HYPERLINK("http://x")', "'+1", "'-1", "'@SUM(A1)", "'\tTab", "'\rCR", "It's fine", "''=1+1"
+    ]
+
+def test_export_todos_ndjson_is_not_escaped(client, mock_todo_service, auth_headers):
+    """Test that only the CSV export escapes formula-like values."""
+    mock_todo_service.iter_user_todos.return_value = iter([dict(_export_todos()[0], description='=1+1')])
+
+    response = client.get('/todos/export', headers=auth_headers)
+
+    assert json.loads(response.get_data(as_text=True))['description'] == '=1+1'
+
+def test_export_todos_is_lazy_and_chunked(client, mock_todo_service, auth_headers):
+    """Test that rows are pulled while the body is read and sent in large chunks."""
+    pulled = []
+
+    def todos():
+        for index in range(5000):
+            pulled.append(index)
+            yield {'id': f'todo{index}', 'user_id': 'test_user_id', 'description': 'x' * 50, 'status': 'pending'}
+
+    mock_todo_service.iter_user_todos.return_value = todos()
+
+    response = client.get('/todos/export', headers=auth_headers, buffered=False)
+    assert len(pulled) < 5000
+    chunks = list(response.response)
+    assert len(pulled) == 5000
+    assert 1 < len(chunks) < 100
+    assert sum(chunk.count(b'\n') for chunk in chunks) == 5000
+
+def test_export_todos_rejects_unknown_format(client, mock_todo_service, auth_headers):
+    """Test that an unsupported format is a 400 and nothing is read."""
+    response = client.get('/todos/export?format=xml', headers=auth_headers)
+
+    assert response.status_code == 400
+    mock_todo_service.iter_user_todos.assert_not_called()
+
+@pytest.fixture
+def imported_rows(mock_todo_service):
+    """Rows the controller parsed from the upload, as handed to import_todos."""
+    rows = []
+
+    def import_todos(user_id, parsed_rows, **kwargs):
+        for row in parsed_rows:
+            rows.append(row)
+            if row[2]:
+                yield {'event': 'error', 'line': row[0], 'error': row[2]}
+        yield {'event': 'done', 'rows': len(rows)}
+
+    mock_todo_service.import_todos.side_effect = import_todos
+    return rows
+
+def test_import_todos_ndjson(client, mock_todo_service, imported_rows, auth_headers):
+    """Test that NDJSON lines are validated like POST /todos/ and events are streamed back."""
+    body = '\n'.join([
+        '{"description": "Task 1"}',
+        '',
+        '{"description": "Task 2", "status": "completed", "id": "ignored"}',
+        '{"status": "pending"}',
+        '{"description": 5}',
+        'not json'
+    ])
+
+    response = client.post('/todos/import', data=body, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [event['line'] for event in events if event['event'] == 'error'] == [4, 5, 6]
+    assert events[-1] == {'event': 'done', 'rows': 5}
+    assert imported_rows[0] == (1, {'description': 'Task 1'}, None)
+    assert imported_rows[1][1]['status'] == 'completed'
+    assert imported_rows[2] == (4, None, "'description' is a required property")
+    assert imported_rows[4][2].startswith('Invalid JSON')
+    kwargs = mock_todo_service.import_todos.call_args.kwargs
+    assert kwargs == {'batch_size': 1000, 'max_in_flight': 2, 'max_workers': 4}
+
+def test_import_todos_csv_accepts_an_export(client, mock_todo_service, imported_rows, auth_headers):
+    """Test that CSV rows keep only the input fields and empty cells count as missing."""
+    body = (
+        'id,user_id,description,status,created_at,updated_at\r\n'
+        'a,someone,"Comma, ""quoted""\nmultiline",completed,2023-01-01T00:00:00,2023-01-01T00:00:00\r\n'
+        'b,someone,Task 2,,2023-01-01T00:00:00,2023-01-01T00:00:00\r\n'
+        'c,someone,,pending,2023-01-01T00:00:00,2023-01-01T00:00:00\r\n'
+    )
+
+    response = client.post('/todos/import', data=body, content_type='text/csv', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert imported_rows == [
+        (3, {'description': 'Comma, "quoted"\nmultiline', 'status': 'completed'}, None),
+        (4, {'description': 'Task 2'}, None),
+        (5, None, "'description' is a required property")
+    ]
+
+def test_import_todos_csv_unescapes_exported_formulas(client, mock_todo_service, imported_rows, auth_headers):
+    """Test that descriptions escaped by the CSV export import unchanged."""
+    body = "description\r\n'=1+1\r\n'-note\r\nIt's\r\n"
+
+    response = client.post('/todos/import', data=body, content_type='text/csv', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert [item['description'] for _, item, _ in imported_rows] == ['=1+1', '-note', "It's"]
+
+def test_csv_export_round_trips_through_import(client, mock_todo_service, imported_rows, auth_headers):
+    """Test that exported descriptions, including ones that start with a quote, import unchanged."""
+    descriptions = ["'=1+1", "=1+1", "'plain", "''", "It's", "-note"]
+    mock_todo_service.iter_user_todos.return_value = iter([dict(_export_todos()[0], description=d) for d in descriptions])
+    exported = client.get('/todos/export?format=csv', headers=auth_headers).get_data()
+
+    response = client.post('/todos/import', data=exported, content_type='text/csv', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert [item['description'] for _, item, _ in imported_rows] == descriptions
+
+def test_import_todos_csv_requires_description_column(client, mock_todo_service, imported_rows, auth_headers):
+    """Test that a CSV without a description column is rejected once, not per row."""
+    response = client.post('/todos/import?format=csv', data='title\nTask 1\nTask 2\n', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert imported_rows == [(1, None, "CSV header must include a description column")]
+
+def test_import_todos_rejects_unknown_format(client, mock_todo_service, auth_headers):
+    """Test that an unsupported format is a 400 and nothing is imported."""
+    response = client.post('/todos/import?format=xml', data='', headers=auth_headers)
+
+    assert response.status_code == 400
+    mock_todo_service.import_todos.assert_not_called()
@@ -2,8 +2,9 @@ import pytest
 from unittest.mock import patch, MagicMock
 from flask import Flask, json
 from flask_restx import Api
-from flask_jwt_extended import JWTManager
+from flask_jwt_extended import JWTManager, create_access_token
 from app.controllers.user_controller import users_ns
+from app.services.user_service import UserDeletionError
 
 # Create a test Flask app and API
 @pytest.fixture
@@ -24,9 +25,11 @@ def client(app):
     return app.test_client()
 
 @pytest.fixture
-def mock_user_service():
-    with patch('app.controllers.user_controller.user_service') as mock_service:
-        yield mock_service
+def mock_user_service(app):
+    # The controllers resolve their service from the app's ServiceContainer
+    mock_service = MagicMock()
+    app.extensions['services'] = MagicMock(user_service=mock_service)
+    yield mock_service
 
 @pytest.fixture
 def mock_jwt_required():
@@ -94,13 +97,13 @@ def test_get_user_profile_not_found(client, mock_user_service, mock_jwt_required
 def test_update_user_profile_success(client, mock_user_service, mock_jwt_required, mock_get_jwt_identity):
     """Test updating user profile for the current user."""
     update_data = {'username': 'updateduser', 'email': 'updated@example.com'}
-    mock_user_service.update_user_profile.return_value = {
+    mock_user_service.update_user_profile.return_value = ({
         'id': 'test_user_id',
         'username': update_data.get('username', 'original_username'),
         'email': update_data.get('email', 'original@example.com'),
         'created_at': '2023-01-01T00:00:00',
         'updated_at': '2023-01-01T00:00:00'
-    }
+    }, None)
     mock_get_jwt_identity.return_value = "test_user_id"
 
     response = client.put(
@@ -133,7 +136,7 @@ def test_update_user_profile_forbidden(client, mock_user_service, mock_jwt_requi
 @pytest.mark.xfail(reason="Known issue with Flask-RESTX validation/marshaling")
 def test_update_user_profile_not_found(client, mock_user_service, mock_jwt_required, mock_get_jwt_identity):
     """Test updating user profile when user is not found."""
-    mock_user_service.update_user_profile.return_value = None
+    mock_user_service.update_user_profile.return_value = (None, "User not found")
     mock_get_jwt_identity.return_value = "test_user_id"
 
     response = client.put(
@@ -147,6 +150,20 @@ def test_update_user_profile_not_found(client, mock_user_service, mock_jwt_requi
     assert 'User not found' in response.json['message']
     mock_user_service.update_user_profile.assert_called_once_with('test_user_id', {'username': 'updateduser', 'email': 'dummy@example.com'})
 
+def test_update_user_profile_username_taken(client, mock_user_service, auth_headers):
+    """Test that renaming to a taken username is a 409 instead of a 200 with unsaved data."""
+    mock_user_service.update_user_profile.return_value = (None, "Username already exists")
+
+    response = client.put(
+        '/users/test_user_id',
+        data=json.dumps({'username': 'taken', 'email': 'dummy@example.com'}),
+        content_type='application/json',
+        headers=auth_headers
+    )
+
+    assert response.status_code == 409
+    assert 'Username already exists' in response.json['message']
+
 @pytest.mark.xfail(reason="Known issue with Flask-RESTX validation/marshaling")
 def test_delete_user_success(client, mock_user_service, mock_jwt_required, mock_get_jwt_identity):
     """Test deleting user profile for the current user."""
@@ -191,15 +208,73 @@ def test_delete_user_not_found(client, mock_user_service, mock_jwt_required, moc
     mock_user_service.delete_user.assert_called_once_with('test_user_id')
 
 def test_get_all_users(client, mock_user_service):
-    """Test getting all users (no authentication required)."""
-    mock_user_service.get_all_users.return_value = [
+    """Test getting a page of users (no authentication required)."""
+    mock_user_service.get_users_page.return_value = ([
         {'id': '1', 'username': 'user1'},
         {'id': '2', 'username': 'user2'}
-    ]
+    ], 'next-page-token')
 
-    response = client.get('/users/')
+    response = client.get('/users/?limit=2')
 
     assert response.status_code == 200
-    assert len(response.json) == 2
-    assert response.json[0]['username'] == 'user1'
-    mock_user_service.get_all_users.assert_called_once()
\ No newline at end of file
+    assert len(response.json['items']) == 2
+    assert response.json['items'][0]['username'] == 'user1'
+    assert response.json['next_cursor'] == 'next-page-token'
+    mock_user_service.get_users_page.assert_called_once_with(2, None)
+
+def test_get_all_users_invalid_cursor(client, mock_user_service):
+    """Test that a malformed cursor is rejected with 400."""
+    from app.repositories.pagination import InvalidCursorError
+    mock_user_service.get_users_page.side_effect = InvalidCursorError("Malformed cursor")
+
+    response = client.get('/users/?cursor=garbage')
+
+    assert response.status_code == 400
+
+@pytest.fixture
+def auth_headers(app):
+    with app.app_context():
+        token = create_access_token(identity="test_user_id")
+    return {'Authorization': f'Bearer {token}'}
+
+def test_delete_user_in_background(client, mock_user_service, auth_headers):
+    """Test that ?background=true returns 202 with a job id."""
+    mock_user_service.delete_user_in_background.return_value = 'job123'
+
+    response = client.delete('/users/test_user_id?background=true', headers=auth_headers)
+
+    assert response.status_code == 202
+    assert response.json['job_id'] == 'job123'
+    mock_user_service.delete_user_in_background.assert_called_once_with('test_user_id')
+    mock_user_service.delete_user.assert_not_called()
+
+def test_delete_user_cascade_failure_returns_503(client, mock_user_service, auth_headers):
+    """Test that a partially failed cascade asks the client to retry."""
+    mock_user_service.delete_user.side_effect = UserDeletionError("Failed to delete 2 todos of user test_user_id; the user was kept")
+
+    response = client.delete('/users/test_user_id', headers=auth_headers)
+
+    assert response.status_code == 503
+    assert 'the user was kept' in response.json['message']
+
+def test_get_deletion_job(client, mock_user_service, auth_headers):
+    """Test polling a background deletion job."""
+    mock_user_service.get_deletion_job.return_value = {
+        'id': 'job123', 'owner_id': 'test_user_id', 'state': 'running',
+        'progress': {'deleted': 100, 'failed': 0}, 'error': None,
+        'created_at': '2023-01-01T00:00:00', 'finished_at': None
+    }
+
+    response = client.get('/users/test_user_id/deletion-jobs/job123', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json['state'] == 'running'
+    assert response.json['progress']['deleted'] == 100
+
+def test_get_deletion_job_of_other_user(client, mock_user_service, auth_headers):
+    """Test that jobs owned by another user are reported as not found."""
+    mock_user_service.get_deletion_job.return_value = {'id': 'job123', 'owner_id': 'another_user_id'}
+
+    response = client.get('/users/test_user_id/deletion-jobs/job123', headers=auth_headers)
+
+    assert response.status_code == 404
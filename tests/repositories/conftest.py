@@ -0,0 +1,24 @@
+import socket
+import urllib.request
+import pytest
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture(scope='module')
+def moto_endpoint_url():
+    """A moto server in server mode for the tests of one module."""
+    from moto.server import ThreadedMotoServer
+    port = _free_port()
+    server = ThreadedMotoServer(ip_address='127.0.0.1', port=port, verbose=False)
+    server.start()
+    yield f'http://127.0.0.1:{port}'
+    server.stop()
+
+@pytest.fixture
+def clean_moto_endpoint_url(moto_endpoint_url):
+    """The module's moto server with every resource from earlier tests removed."""
+    urllib.request.urlopen(urllib.request.Request(f'{moto_endpoint_url}/moto-api/reset', method='POST')).close()
+    return moto_endpoint_url
@@ -0,0 +1,50 @@
+import pytest
+from unittest.mock import MagicMock
+from app.repositories.batch_writer import batch_write, chunked
+from app.repositories.dynamodb_models import TodoModel
+
+@pytest.fixture
+def mock_connection(mocker):
+    connection = MagicMock()
+    mocker.patch.object(TodoModel, '_get_connection', return_value=connection)
+    mocker.patch('app.repositories.batch_writer.time.sleep')
+    return connection
+
+def test_chunked():
+    """Test splitting an iterable into fixed-size chunks."""
+    assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(chunked([], 25)) == []
+
+def test_batch_write_retries_unprocessed_items(mock_connection):
+    """Test that UnprocessedItems are resent until DynamoDB accepts them."""
+    table_name = TodoModel.Meta.table_name
+    mock_connection.batch_write_item.side_effect = [
+        {'UnprocessedItems': {table_name: [{'DeleteRequest': {'Key': {'id': {'S': '2'}}}}]}},
+        {'UnprocessedItems': {}}
+    ]
+
+    failed = batch_write(TodoModel, delete_models=[TodoModel('1'), TodoModel('2')])
+
+    assert failed == []
+    assert mock_connection.batch_write_item.call_count == 2
+    retry_kwargs = mock_connection.batch_write_item.call_args.kwargs
+    assert retry_kwargs['delete_items'] == [{'id': {'S': '2'}}]
+    assert retry_kwargs['put_items'] == []
+
+def test_batch_write_gives_up_after_max_attempts(mock_connection):
+    """Test that items still unprocessed after max_attempts are reported as failed."""
+    table_name = TodoModel.Meta.table_name
+    mock_connection.batch_write_item.return_value = {
+        'UnprocessedItems': {table_name: [{'PutRequest': {'Item': {'id': {'S': '1'}}}}]}
+    }
+
+    failed = batch_write(TodoModel, put_models=[TodoModel('1', user_id='u', description='d', status='pending')], max_attempts=3)
+
+    assert failed == ['1']
+    assert mock_connection.batch_write_item.call_count == 3
+
+def test_batch_write_rejects_oversized_batches(mock_connection):
+    """Test that more than 25 requests in one call is rejected."""
+    with pytest.raises(ValueError):
+        batch_write(TodoModel, delete_models=[TodoModel(str(i)) for i in range(26)])
+    mock_connection.batch_write_item.assert_not_called()
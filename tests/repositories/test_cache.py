@@ -0,0 +1,133 @@
+import time
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from app.repositories.cache import TTLCache, RedisCache, create_cache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_ttl_expiry():
+    """Test that entries expire after ttl_seconds."""
+    clock = FakeClock()
+    cache = TTLCache(max_entries=10, ttl_seconds=5, clock=clock)
+    cache.set("a", {"value": 1})
+
+    clock.now = 4.9
+    assert cache.get("a") == {"value": 1}
+    clock.now = 5.0
+    assert cache.get("a") is None
+    assert cache.stats() == {"entries": 0, "hits": 1, "misses": 1}
+
+def test_lru_eviction():
+    """Test that the least recently used entry is evicted first."""
+    cache = TTLCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+def test_delete_and_clear():
+    """Test explicit invalidation."""
+    cache = TTLCache()
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.delete("a", "missing")
+
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    cache.clear()
+    assert cache.stats() == {"entries": 0, "hits": 0, "misses": 0}
+
+fakeredis = pytest.importorskip('fakeredis')
+
+@pytest.fixture
+def redis_server():
+    return fakeredis.FakeServer()
+
+def make_redis_cache(server, local_ttl=60):
+    client = fakeredis.FakeRedis(server=server)
+    local_cache = TTLCache(max_entries=100, ttl_seconds=local_ttl) if local_ttl else None
+    return RedisCache(client, 'test', ttl_seconds=60, local_cache=local_cache)
+
+def test_redis_cache_shared_between_processes(redis_server):
+    """Test that an entry written by one worker is a hit in another."""
+    worker_a = make_redis_cache(redis_server, local_ttl=0)
+    worker_b = make_redis_cache(redis_server, local_ttl=0)
+    user = {"id": "1", "created_at": datetime(2023, 1, 1, 12, 30)}
+
+    worker_a.set("user:id:1", user)
+
+    assert worker_b.get("user:id:1") == user
+    assert worker_b.stats()["hits"] == 1
+    worker_a.delete("user:id:1")
+    assert worker_b.get("user:id:1") is None
+
+def test_redis_cache_publishes_invalidations(redis_server):
+    """Test that deletes evict the key from other workers' near-caches."""
+    worker_a = make_redis_cache(redis_server)
+    worker_b = make_redis_cache(redis_server)
+    worker_a.set("user:id:1", {"id": "1", "username": "old"})
+    assert worker_b.get("user:id:1") == {"id": "1", "username": "old"}
+
+    worker_a.delete("user:id:1")
+
+    for _ in range(100):
+        if worker_b.local_cache.stats()["entries"] == 0:
+            break
+        time.sleep(0.02)
+    assert worker_b.get("user:id:1") is None
+
+def test_redis_cache_clear_only_touches_namespace(redis_server):
+    """Test that clear() removes only this cache's keys."""
+    cache = make_redis_cache(redis_server, local_ttl=0)
+    cache.set("a", 1)
+    cache.client.set("other:key", "keep")
+
+    cache.clear()
+
+    assert cache.get("a") is None
+    assert cache.client.get("other:key") == b"keep"
+
+def test_redis_cache_errors_are_misses(redis_server):
+    """Test that an unreachable Redis is treated as a miss instead of failing the request."""
+    cache = make_redis_cache(redis_server)
+    redis_server.connected = False
+
+    cache.set("a", 1)
+    cache.delete("a")
+
+    assert cache.get("a") is None
+    assert cache.local_cache.stats()["entries"] == 0
+
+def test_redis_cache_subscribes_on_first_write(redis_server):
+    """Test that a write subscribes before it fills the near-cache."""
+    cache = make_redis_cache(redis_server)
+
+    cache.set("a", 1)
+
+    assert cache._subscriber is not None
+    assert cache.local_cache.get("a") == 1
+
+def test_create_cache():
+    """Test selecting the cache backend from configuration."""
+    config = SimpleNamespace(CACHE_BACKEND='memory', CACHE_REDIS_URL='redis://localhost:6379/0', CACHE_LOCAL_TTL_SECONDS=5)
+    assert isinstance(create_cache(config, 'users', 10, 60), TTLCache)
+
+    config.CACHE_BACKEND = 'redis'
+    cache = create_cache(config, 'users', 10, 60)
+    assert isinstance(cache, RedisCache)
+    assert cache.local_cache.ttl_seconds == 5
+    assert create_cache(config, 'jobs', 10, 60, near_cache=False).local_cache is None
+
+    config.CACHE_BACKEND = 'bogus'
+    with pytest.raises(ValueError):
+        create_cache(config, 'users', 10, 60)
@@ -0,0 +1,57 @@
+import logging
+from unittest.mock import MagicMock
+from app.repositories.connection_pool import ConnectionPoolStats, warm_up_connections
+
+def _model_with_pools(*pools):
+    model_cls = MagicMock()
+    http_session = model_cls._connection.connection._client._endpoint.http_session
+    http_session._manager.pools = {f"pool-{i}": pool for i, pool in enumerate(pools)}
+    http_session._proxy_managers = {}
+    return model_cls
+
+def _pool(requests, connections):
+    return MagicMock(num_requests=requests, num_connections=connections)
+
+def test_pool_stats_count_requests_and_pool_misses():
+    """The counters of every urllib3 pool of the installed models are summed."""
+    stats = ConnectionPoolStats()
+    assert stats.stats() == {'requests': 0, 'new_connections': 0, 'pool_miss_ratio': 0.0}
+
+    unopened = MagicMock()
+    unopened._connection = None
+    stats.install([_model_with_pools(_pool(3, 1), _pool(5, 1)), unopened])
+
+    assert stats.stats() == {'requests': 8, 'new_connections': 2, 'pool_miss_ratio': 0.25}
+
+def test_pool_stats_leave_logging_alone():
+    """Installing the stats no longer changes the urllib3 logger."""
+    logger = logging.getLogger('urllib3.connectionpool')
+    level, handlers = logger.level, list(logger.handlers)
+
+    ConnectionPoolStats().install([])
+
+    assert (logger.level, logger.handlers) == (level, handlers)
+
+def test_warm_up_connections_describes_each_table_concurrently():
+    """The warm-up issues one DescribeTable per connection and counts failures."""
+    users = MagicMock()
+    todos = MagicMock()
+    todos.describe_table.side_effect = Exception("AccessDenied")
+
+    failed = warm_up_connections([users, todos], 3)
+
+    assert users.describe_table.call_count == 3
+    assert todos.describe_table.call_count == 3
+    assert failed == 3
+    assert warm_up_connections([users], 0) == 0
+
+def test_pool_stats_reset_excludes_earlier_connections():
+    """Connections opened before reset() (the warm-up) are not counted as misses."""
+    stats = ConnectionPoolStats()
+    pool = _pool(4, 4)
+    stats.install([_model_with_pools(pool)])
+
+    stats.reset()
+    pool.num_requests, pool.num_connections = 14, 5
+
+    assert stats.stats() == {'requests': 10, 'new_connections': 1, 'pool_miss_ratio': 0.1}
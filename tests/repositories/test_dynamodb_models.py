@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+from app.repositories import dynamodb_models
+from app.repositories.dynamodb_models import TodoModel, UserModel, configure_models
+from config import TestingConfig
+
+def test_import_has_no_side_effects():
+    """Importing the models needs no credentials and prints nothing."""
+    result = subprocess.run(
+        [sys.executable, '-c', 'import app.repositories.dynamodb_models'],
+        capture_output=True, text=True,
+        env={'PATH': '', 'FLASK_ENV': 'testing'}
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == ''
+
+def test_configure_models_applies_config_and_resets_connection(mocker):
+    """configure_models sets table names and client settings and drops cached connections."""
+    mocker.patch.object(dynamodb_models, '_configured', False)
+    mocker.patch.object(UserModel, '_connection', object())
+    mocker.patch.object(TodoModel, '_connection', object())
+    for model_cls in (UserModel, TodoModel):
+        for name in ('table_name', 'host', 'max_pool_connections'):
+            mocker.patch.object(model_cls.Meta, name, getattr(model_cls.Meta, name, None), create=True)
+    mocker.patch.object(TestingConfig, 'DYNAMODB_ENDPOINT_URL', 'http://localhost:8000')
+    mocker.patch.object(TestingConfig, 'DYNAMODB_MAX_POOL_CONNECTIONS', 7)
+
+    configure_models(TestingConfig)
+
+    assert dynamodb_models._configured
+    assert UserModel.Meta.table_name == TestingConfig.DYNAMODB_USERS_TABLE_NAME
+    assert TodoModel.Meta.table_name == TestingConfig.DYNAMODB_TODOS_TABLE_NAME
+    for model_cls in (UserModel, TodoModel):
+        assert model_cls.Meta.host == 'http://localhost:8000'
+        assert model_cls.Meta.max_pool_connections == 7
+        assert model_cls._connection is None
+
+def test_tcp_keepalive_is_set_on_the_botocore_client_config(mocker):
+    """DYNAMODB_TCP_KEEPALIVE reaches the client's botocore Config without touching os.environ."""
+    mocker.patch.object(dynamodb_models, '_configured', False)
+    mocker.patch.object(UserModel, '_connection', None)
+    for name in ('table_name', 'region', 'aws_access_key_id', 'aws_secret_access_key', 'tcp_keepalive'):
+        mocker.patch.object(UserModel.Meta, name, getattr(UserModel.Meta, name, None), create=True)
+    mocker.patch.object(TestingConfig, 'DYNAMODB_USERS_TABLE_NAME', 'users')
+    mocker.patch.object(TestingConfig, 'AWS_REGION', 'us-east-1')
+    mocker.patch.object(TestingConfig, 'AWS_ACCESS_KEY_ID', 'testing')
+    mocker.patch.object(TestingConfig, 'AWS_SECRET_ACCESS_KEY', 'testing')
+    mocker.patch.dict('os.environ')
+
+    for enabled in (True, False):
+        mocker.patch.object(TestingConfig, 'DYNAMODB_TCP_KEEPALIVE', enabled)
+        configure_models(TestingConfig)
+        client = UserModel._get_connection().connection.client
+
+        assert client.meta.config.tcp_keepalive is enabled
+        assert client.meta.config.max_pool_connections == TestingConfig.DYNAMODB_MAX_POOL_CONNECTIONS
+    assert 'BOTOCORE_TCP_KEEPALIVE' not in os.environ
@@ -0,0 +1,86 @@
+import threading
+import pytest
+from app.repositories.in_memory_db import InMemoryDB
+from app.repositories.in_memory_todo_repository import InMemoryTodoRepository
+from app.repositories.pagination import InvalidCursorError
+
+@pytest.fixture
+def todo_repository():
+    """Fixture to provide an InMemoryTodoRepository on an empty database."""
+    return InMemoryTodoRepository(InMemoryDB())
+
+def _todo(user_id, description, status='pending'):
+    return {"user_id": user_id, "description": description, "status": status}
+
+def test_add_and_get_todo(todo_repository):
+    """Test that todos are found by id and only returned to their owner."""
+    todo = todo_repository.add_todo(_todo("owner", "Write tests"))
+
+    assert todo_repository.get_todo_by_id(todo['id'])['description'] == "Write tests"
+    assert todo_repository.get_todo_by_id_and_user(todo['id'], "owner")['id'] == todo['id']
+    assert todo_repository.get_todo_by_id_and_user(todo['id'], "intruder") is None
+    assert todo_repository.get_todo_by_id("missing") is None
+
+def test_get_todos_page_by_user_id_follows_created_at(todo_repository):
+    """Test keyset pagination over the per-user created_at index."""
+    results = todo_repository.add_todos([_todo("pager", f"Task {index}") for index in range(5)])
+    todo_repository.add_todo(_todo("other", "Not mine"))
+    ids = [result["id"] for result in results]
+
+    first_page, cursor = todo_repository.get_todos_page_by_user_id("pager", 3)
+    second_page, last_cursor = todo_repository.get_todos_page_by_user_id("pager", 3, cursor)
+
+    assert [todo['id'] for todo in first_page + second_page] == [todo['id'] for todo in todo_repository.get_todos_by_user_id("pager")]
+    assert sorted(todo['id'] for todo in first_page + second_page) == sorted(ids)
+    assert last_cursor is None
+    with pytest.raises(InvalidCursorError):
+        todo_repository.get_todos_page_by_user_id("other", 3, cursor)
+
+def test_iter_todos_by_user_id_pages_through_every_todo(todo_repository):
+    """Test that iteration crosses page boundaries in created_at order."""
+    todo_repository.add_todos([_todo("exporter", f"Task {index}") for index in range(7)])
+    todo_repository.add_todo(_todo("other", "Not mine"))
+
+    todos = list(todo_repository.iter_todos_by_user_id("exporter", page_size=3))
+    assert todos == todo_repository.get_todos_by_user_id("exporter")
+    assert len(todos) == 7
+    assert list(todo_repository.iter_todos_by_user_id("nobody")) == []
+
+def test_update_and_delete_are_owner_only(todo_repository):
+    """Test that update and delete leave other users' todos alone."""
+    todo = todo_repository.add_todo(_todo("editor", "Draft"))
+
+    assert todo_repository.update_todo(todo['id'], "intruder", {"status": "done"}) is None
+    assert todo_repository.update_todo(todo['id'], "editor", {"status": "done", "user_id": "x"})['status'] == "done"
+    assert todo_repository.get_todo_by_id(todo['id'])['user_id'] == "editor"
+    assert todo_repository.delete_todo(todo['id'], "intruder") is False
+    assert todo_repository.delete_todo(todo['id'], "editor") is True
+    assert todo_repository.get_todos_by_user_id("editor") == []
+
+def test_get_todos_by_ids_and_cascade_delete(todo_repository):
+    """Test batch reads in request order and the per-user cascade delete."""
+    ids = [result["id"] for result in todo_repository.add_todos([_todo("bulk", f"Task {index}") for index in range(4)])]
+    reports = []
+
+    assert [todo['id'] for todo in todo_repository.get_todos_by_ids(ids[::-1] + ["missing"], "bulk")] == ids[::-1]
+    assert todo_repository.delete_todos_by_user_id("bulk", progress=lambda **progress: reports.append(progress)) == (4, [])
+    assert reports == [{"deleted": 4, "failed": 0}]
+    assert todo_repository.get_todos_by_ids(ids, "bulk") == []
+
+def test_concurrent_writes_keep_the_index_consistent(todo_repository):
+    """Test that parallel inserts and deletes never corrupt the per-user index."""
+    def worker(number):
+        for index in range(50):
+            todo = todo_repository.add_todo(_todo("shared", f"{number}-{index}"))
+            if index % 2:
+                todo_repository.delete_todo(todo['id'], "shared")
+
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    todos = todo_repository.get_todos_by_user_id("shared")
+    assert len(todos) == 8 * 25
+    assert [todo['created_at'] for todo in todos] == sorted(todo['created_at'] for todo in todos)
@@ -0,0 +1,73 @@
+import pytest
+from app.repositories.in_memory_db import InMemoryDB
+from app.repositories.in_memory_user_repository import InMemoryUserRepository
+
+@pytest.fixture
+def user_repository():
+    """Fixture to provide an InMemoryUserRepository on an empty database."""
+    return InMemoryUserRepository(InMemoryDB())
+
+def _user(username):
+    return {"username": username, "email": f"{username}@example.com", "password_hash": "hash"}
+
+def test_add_user_enforces_unique_usernames(user_repository):
+    """Test that the username index rejects duplicates."""
+    user, error = user_repository.add_user(_user("alice"))
+
+    assert error is None
+    assert user_repository.get_user_by_id(user['id'])['username'] == "alice"
+    assert user_repository.get_user_by_username("alice")['id'] == user['id']
+    assert user_repository.add_user(_user("alice")) == (None, "Username already exists")
+
+def test_update_user_moves_the_username_index(user_repository):
+    """Test that renames update the username index and cannot steal a name."""
+    bob, _ = user_repository.add_user(_user("bob"))
+    user_repository.add_user(_user("carol"))
+
+    assert user_repository.update_user(bob['id'], {"username": "robert"})[0]['username'] == "robert"
+    assert user_repository.get_user_by_username("bob") is None
+    assert user_repository.get_user_by_username("robert")['id'] == bob['id']
+    assert user_repository.update_user(bob['id'], {"username": "carol"}) == (None, "Username already exists")
+    assert user_repository.update_user("missing", {"username": "ghost"}) == (None, "User not found")
+
+def test_update_user_only_writes_updatable_fields(user_repository):
+    """Test that keys outside USER_UPDATABLE_FIELDS are ignored, as in the other backends."""
+    user, _ = user_repository.add_user(_user("frank"))
+
+    updated, error = user_repository.update_user(user['id'], {"email": "new@example.com", "is_admin": True, "id": "other"})
+
+    assert error is None
+    assert updated['email'] == "new@example.com"
+    assert updated['id'] == user['id']
+    assert "is_admin" not in user_repository.get_user_by_id(user['id'])
+
+def test_update_password_hash_is_conditional(user_repository):
+    """Test that the hash is only replaced while it is still the expected one."""
+    user, _ = user_repository.add_user(_user("erin"))
+
+    assert user_repository.update_password_hash(user['id'], "hash", "new-hash") is True
+    assert user_repository.update_password_hash(user['id'], "hash", "newer-hash") is False
+    assert user_repository.get_user_by_id(user['id'])['password_hash'] == "new-hash"
+    assert user_repository.update_password_hash("missing", "hash", "new-hash") is False
+
+def test_delete_user(user_repository):
+    """Test that deleting a user frees the username."""
+    user, _ = user_repository.add_user(_user("dave"))
+
+    assert user_repository.delete_user(user['id']) is True
+    assert user_repository.delete_user(user['id']) is False
+    assert user_repository.get_user_by_username("dave") is None
+    assert user_repository.add_user(_user("dave"))[1] is None
+
+def test_get_users_page_and_iter_all_users(user_repository):
+    """Test keyset pagination of public user attributes."""
+    for name in ("erin", "frank", "grace"):
+        user_repository.add_user(_user(name))
+
+    first_page, cursor = user_repository.get_users_page(2)
+    second_page, last_cursor = user_repository.get_users_page(2, cursor)
+
+    assert len(first_page) == 2 and len(second_page) == 1
+    assert last_cursor is None
+    assert all('password_hash' not in user for user in first_page + second_page)
+    assert {user['username'] for user in user_repository.iter_all_users(4, page_size=1)} == {"erin", "frank", "grace"}
@@ -0,0 +1,91 @@
+import botocore.session
+import pytest
+from app.repositories import dynamodb_models
+from app.repositories.dynamodb_models import TodoModel, TodoUserIdIndex, UserModel, UsernameIndex
+from app.repositories.provisioning import provision_tables
+from config import TestingConfig
+
+@pytest.fixture
+def provisioning_config(clean_moto_endpoint_url):
+    """Runs provisioning against moto's server mode, restoring the model settings afterwards."""
+    endpoint_url = clean_moto_endpoint_url
+
+    class ProvisioningConfig(TestingConfig):
+        AWS_ACCESS_KEY_ID = 'testing'
+        AWS_SECRET_ACCESS_KEY = 'testing'
+        AWS_REGION = 'us-east-1'
+        DYNAMODB_USERS_TABLE_NAME = 'provisioned-users'
+        DYNAMODB_TODOS_TABLE_NAME = 'provisioned-todos'
+        DYNAMODB_ENDPOINT_URL = endpoint_url
+        DYNAMODB_BILLING_MODE = 'PROVISIONED'
+        DYNAMODB_AUTOSCALING_ENABLED = False
+
+    autoscaling = botocore.session.get_session().create_client(
+        'application-autoscaling', region_name='us-east-1', endpoint_url=endpoint_url,
+        aws_access_key_id='testing', aws_secret_access_key='testing'
+    )
+    with pytest.MonkeyPatch.context() as patcher:
+        patcher.setattr(dynamodb_models, '_configured', dynamodb_models._configured)
+        for meta in (UserModel.Meta, TodoModel.Meta, UsernameIndex.Meta, TodoUserIdIndex.Meta):
+            for name in ('table_name', 'region', 'host', 'aws_access_key_id', 'aws_secret_access_key',
+                         'billing_mode', 'read_capacity_units', 'write_capacity_units'):
+                patcher.setattr(meta, name, getattr(meta, name, None), raising=False)
+        for model_cls in (UserModel, TodoModel):
+            patcher.setattr(model_cls, '_connection', None)
+        yield ProvisioningConfig, autoscaling
+
+def _describe(model_cls):
+    return model_cls._get_connection().connection.client.describe_table(TableName=model_cls.Meta.table_name)['Table']
+
+def test_provision_tables_creates_provisioned_tables_once(provisioning_config):
+    """Tables get the configured per-table and per-index capacity; a second run changes nothing."""
+    current_config, _ = provisioning_config
+    current_config.DYNAMODB_TODO_USER_INDEX_READ_CAPACITY_UNITS = 25
+
+    provision_tables(current_config, log=lambda message: None)
+    messages = []
+    provision_tables(current_config, log=messages.append)
+
+    todos = _describe(TodoModel)
+    assert todos['ProvisionedThroughput']['ReadCapacityUnits'] == current_config.DYNAMODB_TODOS_READ_CAPACITY_UNITS
+    assert todos['GlobalSecondaryIndexes'][0]['ProvisionedThroughput']['ReadCapacityUnits'] == 25
+    assert messages == ["Table provisioned-users is up to date.", "Table provisioned-todos is up to date."]
+
+def test_provision_tables_updates_capacity_and_billing_mode(provisioning_config):
+    """Changed settings are applied to existing tables with UpdateTable."""
+    current_config, _ = provisioning_config
+    provision_tables(current_config, log=lambda message: None)
+
+    current_config.DYNAMODB_USERS_WRITE_CAPACITY_UNITS = 40
+    provision_tables(current_config, log=lambda message: None)
+    assert _describe(UserModel)['ProvisionedThroughput']['WriteCapacityUnits'] == 40
+
+    current_config.DYNAMODB_BILLING_MODE = 'PAY_PER_REQUEST'
+    provision_tables(current_config, log=lambda message: None)
+    assert _describe(UserModel)['BillingModeSummary']['BillingMode'] == 'PAY_PER_REQUEST'
+
+def test_provision_tables_registers_auto_scaling(provisioning_config):
+    """Auto scaling covers read and write capacity of every table and index."""
+    current_config, autoscaling = provisioning_config
+    current_config.DYNAMODB_AUTOSCALING_ENABLED = True
+    current_config.DYNAMODB_AUTOSCALING_MAX_CAPACITY_UNITS = 200
+
+    provision_tables(current_config, autoscaling=autoscaling, log=lambda message: None)
+    provision_tables(current_config, autoscaling=autoscaling, log=lambda message: None)
+
+    targets = autoscaling.describe_scalable_targets(ServiceNamespace='dynamodb')['ScalableTargets']
+    policies = autoscaling.describe_scaling_policies(ServiceNamespace='dynamodb')['ScalingPolicies']
+    assert len(targets) == 8
+    assert len(policies) == 8
+    assert {target['MaxCapacity'] for target in targets} == {200}
+    assert {'table/provisioned-todos/index/user_id_index', 'table/provisioned-users'} <= {
+        target['ResourceId'] for target in targets
+    }
+
+def test_provision_tables_rejects_unknown_billing_mode(provisioning_config):
+    """A misspelt billing mode fails before any table is touched."""
+    current_config, _ = provisioning_config
+    current_config.DYNAMODB_BILLING_MODE = 'CHEAP'
+
+    with pytest.raises(ValueError):
+        provision_tables(current_config, log=lambda message: None)
@@ -0,0 +1,95 @@
+import threading
+import pytest
+from app.repositories.sqlite_db import SQLiteDB
+from app.repositories.sqlite_todo_repository import SQLiteTodoRepository
+from app.repositories.pagination import InvalidCursorError
+
+@pytest.fixture
+def todo_repository(tmp_path):
+    """Fixture to provide a SQLiteTodoRepository on a fresh database file."""
+    db = SQLiteDB(str(tmp_path / 'todos.db'))
+    yield SQLiteTodoRepository(db)
+    db.close()
+
+def _todo(user_id, description, status='pending'):
+    return {"user_id": user_id, "description": description, "status": status}
+
+def test_database_uses_wal_mode(todo_repository):
+    """Test that connections are opened in WAL mode."""
+    assert todo_repository.db.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+def test_add_and_get_todo(todo_repository):
+    """Test that todos round-trip and are only returned to their owner."""
+    todo = todo_repository.add_todo(_todo("owner", "Write tests"))
+
+    stored = todo_repository.get_todo_by_id(todo['id'])
+    assert stored == todo
+    assert todo_repository.get_todo_by_id_and_user(todo['id'], "intruder") is None
+    assert todo_repository.get_todo_by_id("missing") is None
+
+def test_keyset_pagination(todo_repository):
+    """Test that pages follow (created_at, id) and end with a None cursor."""
+    ids = [result["id"] for result in todo_repository.add_todos([_todo("pager", f"Task {index}") for index in range(5)])]
+
+    first_page, cursor = todo_repository.get_todos_page_by_user_id("pager", 3)
+    second_page, last_cursor = todo_repository.get_todos_page_by_user_id("pager", 3, cursor)
+
+    assert len(first_page) == 3 and len(second_page) == 2
+    assert first_page + second_page == todo_repository.get_todos_by_user_id("pager")
+    assert sorted(todo['id'] for todo in first_page + second_page) == sorted(ids)
+    assert last_cursor is None
+    assert todo_repository.get_todos_page_by_user_id("pager", 5) == (todo_repository.get_todos_by_user_id("pager"), None)
+    with pytest.raises(InvalidCursorError):
+        todo_repository.get_todos_page_by_user_id("other", 3, cursor)
+
+def test_iter_todos_by_user_id_pages_through_every_todo(todo_repository):
+    """Test that iteration crosses page boundaries in (created_at, id) order."""
+    todo_repository.add_todos([_todo("exporter", f"Task {index}") for index in range(7)])
+    todo_repository.add_todo(_todo("other", "Not mine"))
+
+    for page_size in (3, 7, 100):
+        assert list(todo_repository.iter_todos_by_user_id("exporter", page_size)) == todo_repository.get_todos_by_user_id("exporter")
+    assert list(todo_repository.iter_todos_by_user_id("nobody")) == []
+
+def test_update_and_delete_are_owner_only(todo_repository):
+    """Test that update and delete are conditioned on ownership."""
+    todo = todo_repository.add_todo(_todo("editor", "Draft"))
+
+    assert todo_repository.update_todo(todo['id'], "intruder", {"status": "done"}) is None
+    updated = todo_repository.update_todo(todo['id'], "editor", {"status": "done"})
+    assert updated['status'] == "done"
+    assert updated['description'] == "Draft"
+    assert todo_repository.delete_todo(todo['id'], "intruder") is False
+    assert todo_repository.delete_todo(todo['id'], "editor") is True
+
+def test_get_todos_by_ids_and_cascade_delete(todo_repository):
+    """Test batch reads in request order and the per-user cascade delete."""
+    ids = [result["id"] for result in todo_repository.add_todos([_todo("bulk", f"Task {index}") for index in range(4)])]
+    todo_repository.add_todo(_todo("staying", "Keep me"))
+
+    assert [todo['id'] for todo in todo_repository.get_todos_by_ids(ids[::-1] + ["missing"], "bulk")] == ids[::-1]
+    assert todo_repository.get_todos_by_ids(ids, "intruder") == []
+    assert todo_repository.delete_todos_by_user_id("bulk") == (4, [])
+    assert len(todo_repository.get_todos_by_user_id("staying")) == 1
+
+def test_concurrent_writers_use_their_own_connections(todo_repository):
+    """Test that writes from many threads all land."""
+    errors = []
+
+    def worker(number):
+        try:
+            for index in range(25):
+                todo_repository.add_todo(_todo("shared", f"{number}-{index}"))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            todo_repository.db.close()
+
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(todo_repository.get_todos_by_user_id("shared")) == 200
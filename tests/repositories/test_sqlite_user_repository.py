@@ -0,0 +1,64 @@
+import pytest
+from app.repositories.sqlite_db import SQLiteDB
+from app.repositories.sqlite_user_repository import SQLiteUserRepository
+
+@pytest.fixture
+def user_repository(tmp_path):
+    """Fixture to provide a SQLiteUserRepository on a fresh database file."""
+    db = SQLiteDB(str(tmp_path / 'users.db'))
+    yield SQLiteUserRepository(db)
+    db.close()
+
+def _user(username):
+    return {"username": username, "email": f"{username}@example.com", "password_hash": "hash"}
+
+def test_add_user_enforces_unique_usernames(user_repository):
+    """Test that the unique username index rejects duplicates."""
+    user, error = user_repository.add_user(_user("alice"))
+
+    assert error is None
+    assert user_repository.get_user_by_id(user['id']) == user
+    assert user_repository.get_user_by_username("alice")['id'] == user['id']
+    assert user_repository.add_user(_user("alice")) == (None, "Username already exists")
+
+def test_add_users_skips_taken_usernames(user_repository):
+    """Test that a batch is inserted in one transaction and reports taken usernames per user."""
+    user_repository.add_user(_user("alice"))
+
+    results = user_repository.add_users([_user("bob"), _user("alice"), _user("carol")])
+
+    assert [result['error'] for result in results] == [None, "Username already exists", None]
+    assert user_repository.get_user_by_username("carol")['id'] == results[2]['id']
+
+def test_update_and_delete_user(user_repository):
+    """Test renames, rename conflicts and deletes."""
+    bob, _ = user_repository.add_user(_user("bob"))
+    user_repository.add_user(_user("carol"))
+
+    assert user_repository.update_user(bob['id'], {"username": "robert", "created_at": "ignored"})[0]['username'] == "robert"
+    assert user_repository.get_user_by_username("bob") is None
+    assert user_repository.update_user(bob['id'], {"username": "carol"}) == (None, "Username already exists")
+    assert user_repository.update_user("missing", {"email": "x@example.com"}) == (None, "User not found")
+    assert user_repository.delete_user(bob['id']) is True
+    assert user_repository.delete_user(bob['id']) is False
+
+def test_update_password_hash_is_conditional(user_repository):
+    """Test that the hash is only replaced while it is still the expected one."""
+    user, _ = user_repository.add_user(_user("erin"))
+
+    assert user_repository.update_password_hash(user['id'], "hash", "new-hash") is True
+    assert user_repository.update_password_hash(user['id'], "hash", "newer-hash") is False
+    assert user_repository.get_user_by_id(user['id'])['password_hash'] == "new-hash"
+
+def test_get_users_page_and_iter_all_users(user_repository):
+    """Test keyset pagination of public user attributes."""
+    for name in ("erin", "frank", "grace"):
+        user_repository.add_user(_user(name))
+
+    first_page, cursor = user_repository.get_users_page(2)
+    second_page, last_cursor = user_repository.get_users_page(2, cursor)
+
+    assert len(first_page) == 2 and len(second_page) == 1
+    assert last_cursor is None
+    assert all('password_hash' not in user for user in first_page + second_page)
+    assert {user['username'] for user in user_repository.iter_all_users(4, page_size=1)} == {"erin", "frank", "grace"}
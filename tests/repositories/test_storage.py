@@ -0,0 +1,52 @@
+import pytest
+from unittest.mock import MagicMock
+from app.repositories.storage import create_todo_repository, create_user_repository
+from app.repositories.in_memory_todo_repository import InMemoryTodoRepository
+from app.repositories.in_memory_user_repository import InMemoryUserRepository
+
+def _config(**overrides):
+    config = MagicMock()
+    config.STORAGE_BACKEND = 'dynamodb'
+    config.CACHE_BACKEND = 'memory'
+    config.USER_CACHE_MAX_ENTRIES = 100
+    config.USER_CACHE_TTL_SECONDS = 60
+    for key, value in overrides.items():
+        setattr(config, key, value)
+    return config
+
+def test_memory_backend_uses_in_memory_repositories():
+    """STORAGE_BACKEND='memory' selects the in-memory repositories."""
+    config = _config(STORAGE_BACKEND='memory')
+
+    assert isinstance(create_todo_repository(config), InMemoryTodoRepository)
+    assert isinstance(create_user_repository(config), InMemoryUserRepository)
+
+def test_dynamodb_backend_uses_pynamodb_repositories():
+    """The default backend keeps the PynamoDB repositories."""
+    from app.repositories.todo_repository import TodoRepository
+    from app.repositories.user_repository import UserRepository
+
+    assert isinstance(create_todo_repository(_config()), TodoRepository)
+    user_repository = create_user_repository(_config())
+    assert isinstance(user_repository, UserRepository)
+    assert user_repository.cache.max_entries == 100
+
+def test_unknown_backend_is_rejected():
+    """An unknown STORAGE_BACKEND fails loudly."""
+    with pytest.raises(ValueError):
+        create_todo_repository(_config(STORAGE_BACKEND='floppy'))
+    with pytest.raises(ValueError):
+        create_user_repository(_config(STORAGE_BACKEND='floppy'))
+
+def test_sqlite_backend_shares_one_database_per_file(tmp_path):
+    """STORAGE_BACKEND='sqlite' selects the SQLite repositories on SQLITE_PATH."""
+    from app.repositories.sqlite_todo_repository import SQLiteTodoRepository
+    from app.repositories.sqlite_user_repository import SQLiteUserRepository
+    config = _config(STORAGE_BACKEND='sqlite', SQLITE_PATH=str(tmp_path / 'app.db'))
+
+    todo_repository = create_todo_repository(config)
+    user_repository = create_user_repository(config)
+
+    assert isinstance(todo_repository, SQLiteTodoRepository)
+    assert isinstance(user_repository, SQLiteUserRepository)
+    assert todo_repository.db is user_repository.db
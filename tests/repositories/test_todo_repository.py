@@ -1,7 +1,9 @@
 import pytest
 from unittest.mock import MagicMock
 from app.repositories.todo_repository import TodoRepository
-from pynamodb.exceptions import DoesNotExist
+from app.repositories.pagination import InvalidCursorError, encode_cursor
+from pynamodb.exceptions import DoesNotExist, PutError, QueryError, UpdateError, DeleteError
+from botocore.exceptions import ClientError
 
 @pytest.fixture
 def todo_repository():
@@ -18,6 +20,58 @@ def test_get_todos_by_user_id(todo_repository, mocker):
     assert len(todos) == 1
     assert todos[0]['description'] == 'Task 1'
 
+def test_get_todos_page_by_user_id(todo_repository, mocker):
+    """Test retrieving one bounded page of todos with a next cursor."""
+    mock_todo_model = MagicMock()
+    mock_todo_model.attribute_values = {"id": "1", "user_id": "user1", "description": "Task 1"}
+    last_key = {"id": {"S": "1"}, "user_id": {"S": "user1"}, "created_at": {"S": "2023-01-01T00:00:00.000000+0000"}}
+    mock_results = MagicMock()
+    mock_results.__iter__.return_value = iter([mock_todo_model])
+    mock_results.last_evaluated_key = last_key
+    mock_query = mocker.patch('app.repositories.dynamodb_models.TodoModel.user_id_index.query', return_value=mock_results)
+
+    todos, next_cursor = todo_repository.get_todos_page_by_user_id("user1", 1)
+    assert todos == [mock_todo_model.attribute_values]
+    assert next_cursor == encode_cursor(last_key)
+    mock_query.assert_called_once_with("user1", limit=1, page_size=1, last_evaluated_key=None)
+
+    # The cursor resumes the query from the previous page's last key
+    mock_results.__iter__.return_value = iter([])
+    mock_results.last_evaluated_key = None
+    todos, next_cursor = todo_repository.get_todos_page_by_user_id("user1", 1, encode_cursor(last_key))
+    assert todos == []
+    assert next_cursor is None
+    mock_query.assert_called_with("user1", limit=1, page_size=1, last_evaluated_key=last_key)
+
+def test_iter_todos_by_user_id(todo_repository, mocker):
+    """Test that todos are streamed from a lazily paged index query."""
+    mock_todo_model = MagicMock()
+    mock_todo_model.attribute_values = {"id": "1", "user_id": "user1", "description": "Task 1"}
+    mock_query = mocker.patch('app.repositories.dynamodb_models.TodoModel.user_id_index.query', return_value=iter([mock_todo_model]))
+
+    todos = todo_repository.iter_todos_by_user_id("user1", page_size=500)
+    mock_query.assert_not_called()
+    assert list(todos) == [mock_todo_model.attribute_values]
+    mock_query.assert_called_once_with("user1", page_size=500)
+
+def test_iter_todos_by_user_id_propagates_query_errors(todo_repository, mocker):
+    """Test that a failed page read is raised rather than ending the stream."""
+    mocker.patch('app.repositories.dynamodb_models.TodoModel.user_id_index.query', side_effect=QueryError("boom"))
+
+    with pytest.raises(QueryError):
+        list(todo_repository.iter_todos_by_user_id("user1"))
+
+def test_get_todos_page_rejects_foreign_or_malformed_cursor(todo_repository, mocker):
+    """Test that cursors for another user or garbage cursors are rejected."""
+    mock_query = mocker.patch('app.repositories.dynamodb_models.TodoModel.user_id_index.query')
+    other_key = {"id": {"S": "1"}, "user_id": {"S": "user2"}, "created_at": {"S": "2023-01-01T00:00:00.000000+0000"}}
+
+    with pytest.raises(InvalidCursorError):
+        todo_repository.get_todos_page_by_user_id("user1", 10, encode_cursor(other_key))
+    with pytest.raises(InvalidCursorError):
+        todo_repository.get_todos_page_by_user_id("user1", 10, "not-a-cursor")
+    mock_query.assert_not_called()
+
 def test_get_todo_by_id_and_user(todo_repository, mocker):
     """Test retrieving a specific todo by id and user_id."""
     mock_todo_model = MagicMock()
@@ -40,6 +94,23 @@ def test_get_todo_by_id_and_user(todo_repository, mocker):
     todo = todo_repository.get_todo_by_id_and_user("nonexistent", "user1")
     assert todo is None
 
+def test_get_todos_by_ids(todo_repository, mocker):
+    """Test batch getting todos filtered to the caller and in request order."""
+    def make_todo(todo_id, user_id):
+        todo_model = MagicMock()
+        todo_model.id = todo_id
+        todo_model.user_id = user_id
+        todo_model.attribute_values = {"id": todo_id, "user_id": user_id}
+        return todo_model
+    mock_batch_get = mocker.patch('app.repositories.dynamodb_models.TodoModel.batch_get', return_value=[
+        make_todo("3", "user1"), make_todo("1", "user1"), make_todo("2", "user2")
+    ])
+
+    todos = todo_repository.get_todos_by_ids(["1", "2", "3", "1", "4"], "user1")
+
+    assert [todo['id'] for todo in todos] == ["1", "3"]
+    mock_batch_get.assert_called_once_with(["1", "2", "3", "4"])
+
 def test_add_todo(todo_repository, mocker):
     """Test adding a new todo."""
     mock_save = mocker.patch('app.repositories.dynamodb_models.TodoModel.save')
@@ -51,39 +122,93 @@ def test_add_todo(todo_repository, mocker):
     assert added_todo['description'] == "New Todo"
     mock_save.assert_called_once()
 
+def test_add_todos(todo_repository, mocker):
+    """Test bulk adding todos in 25-item chunks with per-item results."""
+    todos_data = [{"user_id": "user1", "description": f"Task {i}", "status": "pending"} for i in range(30)]
+    def fake_batch_write(model_cls, put_models):
+        # The second chunk has one unprocessed item; the first chunk succeeds.
+        return [put_models[0].id] if len(put_models) == 5 else []
+    mock_batch_write = mocker.patch('app.repositories.todo_repository.batch_write', side_effect=fake_batch_write)
+
+    results = todo_repository.add_todos(todos_data, max_workers=2)
+
+    assert len(results) == 30
+    assert all(result['id'] and result['error'] is None for result in results[:25])
+    assert results[25] == {"id": None, "error": "Todo was not written after retries"}
+    assert all(result['error'] is None for result in results[26:])
+    assert sorted(len(call.kwargs['put_models']) for call in mock_batch_write.call_args_list) == [5, 25]
+
+def test_add_todos_chunk_failure(todo_repository, mocker):
+    """Test that a failed BatchWriteItem call marks its whole chunk as failed."""
+    mocker.patch('app.repositories.todo_repository.batch_write', side_effect=PutError("boom"))
+
+    results = todo_repository.add_todos([{"user_id": "user1", "description": "Task", "status": "pending"}])
+
+    assert results == [{"id": None, "error": "Failed to create todo item"}]
+
+def conditional_check_failed(error_cls, operation):
+    cause = ClientError({'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'The conditional request failed'}}, operation)
+    return error_cls("Failed", cause)
+
 def test_update_todo(todo_repository, mocker):
-    """Test updating an existing todo."""
-    mock_todo_model = MagicMock()
-    mock_todo_model.user_id = "user1"
-    mock_get = mocker.patch('app.repositories.dynamodb_models.TodoModel.get', return_value=mock_todo_model)
-    mock_save = mocker.patch.object(mock_todo_model, 'save')
+    """Test updating an existing todo with a single conditional UpdateItem."""
+    mock_get = mocker.patch('app.repositories.dynamodb_models.TodoModel.get')
+    mock_update = mocker.patch('app.repositories.dynamodb_models.TodoModel.update')
 
-    update_data = {"description": "New Desc", "status": "completed"}
+    update_data = {"description": "New Desc", "status": "completed", "user_id": "someone-else"}
     updated_todo = todo_repository.update_todo("1", "user1", update_data)
 
     assert updated_todo is not None
-    mock_get.assert_called_with("1")
-    mock_save.assert_called_once()
-    assert mock_todo_model.description == "New Desc"
+    assert updated_todo['id'] == "1"
+    mock_get.assert_not_called()
+    mock_update.assert_called_once()
+    _, kwargs = mock_update.call_args
+    # updated_at + description + status; user_id is not an updatable field
+    assert len(kwargs['actions']) == 3
+    assert kwargs['condition'] is not None
 
-    # Test updating a todo that doesn't belong to the user
-    mock_todo_model.user_id = "user2"
-    updated_todo = todo_repository.update_todo("1", "user1", update_data)
+def test_update_todo_condition_failed(todo_repository, mocker):
+    """Test updating a todo that is missing or owned by another user."""
+    mocker.patch('app.repositories.dynamodb_models.TodoModel.update',
+                 side_effect=conditional_check_failed(UpdateError, 'UpdateItem'))
+
+    updated_todo = todo_repository.update_todo("1", "user1", {"description": "New Desc"})
     assert updated_todo is None
 
 def test_delete_todo(todo_repository, mocker):
-    """Test deleting a todo."""
-    mock_todo_model = MagicMock()
-    mock_todo_model.user_id = "user1"
-    mocker.patch('app.repositories.dynamodb_models.TodoModel.get', return_value=mock_todo_model)
-    mock_delete = mocker.patch.object(mock_todo_model, 'delete')
+    """Test deleting a todo with a single conditional DeleteItem."""
+    mock_get = mocker.patch('app.repositories.dynamodb_models.TodoModel.get')
+    mock_delete = mocker.patch('app.repositories.dynamodb_models.TodoModel.delete')
 
     # Correct user
     result = todo_repository.delete_todo("1", "user1")
     assert result is True
+    mock_get.assert_not_called()
     mock_delete.assert_called_once()
+    assert mock_delete.call_args.kwargs['condition'] is not None
 
-    # Incorrect user
-    mock_todo_model.user_id = "user2"
-    result = todo_repository.delete_todo("1", "user1")
-    assert result is False
\ No newline at end of file
+    # Missing todo or incorrect user
+    mock_delete.side_effect = conditional_check_failed(DeleteError, 'DeleteItem')
+    result = todo_repository.delete_todo("1", "user2")
+    assert result is False
+
+
+def test_delete_todos_by_user_id(todo_repository, mocker):
+    """Test cascade deleting a user's todos in 25-key BatchWriteItem chunks."""
+    todo_models = []
+    for i in range(60):
+        todo_model = MagicMock()
+        todo_model.id = str(i)
+        todo_models.append(todo_model)
+    mock_query = mocker.patch('app.repositories.dynamodb_models.TodoModel.user_id_index.query', return_value=todo_models)
+    mock_batch_write = mocker.patch('app.repositories.todo_repository.batch_write', side_effect=[[], ['30'], []])
+    progress = MagicMock()
+
+    deleted, failed_ids = todo_repository.delete_todos_by_user_id("user1", max_workers=1, progress=progress)
+
+    assert deleted == 59
+    assert failed_ids == ['30']
+    assert mock_query.call_args.kwargs['attributes_to_get'] == ['id']
+    chunk_sizes = [len(call.kwargs['delete_models']) for call in mock_batch_write.call_args_list]
+    assert chunk_sizes == [25, 25, 10]
+    progress.assert_called_with(deleted=59, failed=1)
@@ -1,12 +1,14 @@
 import pytest
 from unittest.mock import MagicMock, patch
 from app.repositories.user_repository import UserRepository
-from app.repositories.dynamodb_models import UserModel
-from pynamodb.exceptions import DoesNotExist, PutError, DeleteError, ScanError, QueryError
+from app.repositories.pagination import encode_cursor
+from pynamodb.exceptions import CancellationReason, DoesNotExist, PutError, ScanError, TransactWriteError, UpdateError, VerboseClientError
+from botocore.exceptions import ClientError
 
 @pytest.fixture
-def user_repository():
-    """Fixture to provide a UserRepository instance."""
+def user_repository(mocker):
+    """Fixture to provide a UserRepository instance with an empty cache and no legacy users."""
+    mocker.patch('app.repositories.dynamodb_models.UserModel.username_index.query', return_value=[])
     return UserRepository()
 
 def test_get_all_users(user_repository, mocker):
@@ -19,6 +21,45 @@ def test_get_all_users(user_repository, mocker):
     assert len(users) == 1
     assert users[0]['username'] == 'user1'
 
+def test_get_users_page(user_repository, mocker):
+    """Test scanning one bounded page of users with a projection and next cursor."""
+    mock_user_model = MagicMock()
+    mock_user_model.attribute_values = {"id": "1", "username": "user1"}
+    mock_results = MagicMock()
+    mock_results.__iter__.return_value = iter([mock_user_model])
+    mock_results.last_evaluated_key = {"id": {"S": "1"}}
+    mock_scan = mocker.patch('app.repositories.dynamodb_models.UserModel.scan', return_value=mock_results)
+
+    users, next_cursor = user_repository.get_users_page(1, encode_cursor({"id": {"S": "0"}}))
+
+    assert users == [{"id": "1", "username": "user1"}]
+    assert next_cursor == encode_cursor({"id": {"S": "1"}})
+    _, kwargs = mock_scan.call_args
+    assert kwargs['limit'] == 1
+    assert kwargs['last_evaluated_key'] == {"id": {"S": "0"}}
+    assert 'password_hash' not in kwargs['attributes_to_get']
+
+def test_iter_all_users_parallel_segments(user_repository, mocker):
+    """Test that the export path scans every segment and streams all users."""
+    def scan_segment(segment, total_segments, **kwargs):
+        user_model = MagicMock()
+        user_model.attribute_values = {"id": str(segment), "username": f"user{segment}"}
+        return [user_model]
+    mock_scan = mocker.patch('app.repositories.dynamodb_models.UserModel.scan', side_effect=scan_segment)
+
+    users = list(user_repository.iter_all_users(total_segments=3))
+
+    assert sorted(user['id'] for user in users) == ['0', '1', '2']
+    assert mock_scan.call_count == 3
+    assert {call.kwargs['segment'] for call in mock_scan.call_args_list} == {0, 1, 2}
+
+def test_iter_all_users_propagates_scan_errors(user_repository, mocker):
+    """Test that a failing segment surfaces its error to the consumer."""
+    mocker.patch('app.repositories.dynamodb_models.UserModel.scan', side_effect=ScanError("boom"))
+
+    with pytest.raises(ScanError):
+        list(user_repository.iter_all_users(total_segments=2))
+
 def test_get_user_by_id(user_repository, mocker):
     """Test retrieving a user by ID."""
     mock_user_model = MagicMock()
@@ -33,67 +74,255 @@ def test_get_user_by_id(user_repository, mocker):
     user = user_repository.get_user_by_id("nonexistent")
     assert user is None
 
+def _reservation(user_id):
+    reservation = MagicMock()
+    reservation.user_id = user_id
+    return reservation
+
+def _user_model(user_id, username):
+    user_model = MagicMock()
+    user_model.id = user_id
+    user_model.username = username
+    user_model.attribute_values = {"id": user_id, "username": username}
+    return user_model
+
+def _cancelled(*codes):
+    cause = VerboseClientError(
+        {'Error': {'Code': 'TransactionCanceledException', 'Message': 'Transaction cancelled'}},
+        'TransactWriteItems',
+        cancellation_reasons=[CancellationReason(code=code) if code else None for code in codes]
+    )
+    return TransactWriteError("Failed", cause)
+
+@pytest.fixture
+def mock_transact_write(mocker):
+    """Patches TransactWrite and the connection it is given."""
+    mocker.patch('app.repositories.dynamodb_models.UserModel._get_connection')
+    return mocker.patch('app.repositories.user_repository.TransactWrite')
+
+@pytest.fixture
+def mock_transaction(mock_transact_write):
+    """The transaction the repository writes to."""
+    return mock_transact_write.return_value.__enter__.return_value
+
 def test_get_user_by_username(user_repository, mocker):
-    """Test retrieving a user by username."""
-    mock_user_model = MagicMock()
-    mock_user_model.attribute_values = {"id": "1", "username": "testuser"}
-    mocker.patch('app.repositories.dynamodb_models.UserModel.username_index.query', return_value=[mock_user_model])
+    """Test resolving a username with consistent GetItems on the reservation and the user."""
+    mock_get_reservation = mocker.patch(
+        'app.repositories.dynamodb_models.UsernameReservationModel.get', return_value=_reservation("1")
+    )
+    mock_get = mocker.patch('app.repositories.dynamodb_models.UserModel.get', return_value=_user_model("1", "testuser"))
 
     user = user_repository.get_user_by_username("testuser")
-    assert user is not None
     assert user['username'] == 'testuser'
+    mock_get_reservation.assert_called_once_with("USERNAME#testuser", consistent_read=True)
+    mock_get.assert_called_once_with("1", consistent_read=True)
 
-    mocker.patch('app.repositories.dynamodb_models.UserModel.username_index.query', return_value=[])
-    user = user_repository.get_user_by_username("nonexistent")
-    assert user is None
+    mocker.patch('app.repositories.dynamodb_models.UsernameReservationModel.get', side_effect=DoesNotExist)
+    assert user_repository.get_user_by_username("nonexistent") is None
 
-def test_add_user(user_repository, mocker):
-    """Test adding a new user."""
-    mocker.patch.object(user_repository, 'get_user_by_username', return_value=None)
-    mock_save = mocker.patch('app.repositories.dynamodb_models.UserModel.save')
-    
+def test_get_user_by_id_is_cached(user_repository, mocker):
+    """Test that repeated id lookups are served from the cache."""
+    mock_get = mocker.patch('app.repositories.dynamodb_models.UserModel.get', return_value=_user_model("1", "testuser"))
+
+    first = user_repository.get_user_by_id("1")
+    first['username'] = 'mutated by caller'
+    second = user_repository.get_user_by_id("1")
+
+    assert second['username'] == 'testuser'
+    mock_get.assert_called_once_with("1", consistent_read=False)
+    assert user_repository.cache_stats()['hits'] == 1
+
+def test_get_user_by_username_is_cached(user_repository, mocker):
+    """Test that logins reuse the cached username mapping but always read the user item."""
+    mock_get_reservation = mocker.patch(
+        'app.repositories.dynamodb_models.UsernameReservationModel.get', return_value=_reservation("1")
+    )
+    mock_get = mocker.patch('app.repositories.dynamodb_models.UserModel.get', return_value=_user_model("1", "testuser"))
+
+    assert user_repository.get_user_by_username("testuser")['id'] == "1"
+    assert user_repository.get_user_by_username("testuser")['id'] == "1"
+    mock_get_reservation.assert_called_once()
+    assert mock_get.call_count == 2
+
+def test_cache_holds_no_password_hash(user_repository, mocker):
+    """Test that the user cache only ever holds the public attributes."""
+    user_model = _user_model("1", "testuser")
+    user_model.attribute_values["password_hash"] = "hash"
+    mocker.patch('app.repositories.dynamodb_models.UsernameReservationModel.get', return_value=_reservation("1"))
+    mocker.patch('app.repositories.dynamodb_models.UserModel.get', return_value=user_model)
+
+    assert user_repository.get_user_by_username("testuser")['password_hash'] == "hash"
+    assert 'password_hash' not in user_repository.get_user_by_id("1")
+    assert 'password_hash' not in user_repository.cache.get("user:id:1")
+
+def test_cache_invalidated_on_delete(user_repository, mocker, mock_transaction):
+    """Test that a deleted user is no longer returned by cached lookups."""
+    mocker.patch('app.repositories.dynamodb_models.UsernameReservationModel.get', return_value=_reservation("1"))
+    mocker.patch('app.repositories.dynamodb_models.UserModel.get', return_value=_user_model("1", "testuser"))
+    user_repository.get_user_by_username("testuser")
+
+    assert user_repository.delete_user("1") is True
+
+    mocker.patch('app.repositories.dynamodb_models.UserModel.get', side_effect=DoesNotExist)
+    mocker.patch('app.repositories.dynamodb_models.UsernameReservationModel.get', side_effect=DoesNotExist)
+    assert user_repository.get_user_by_id("1") is None
+    assert user_repository.get_user_by_username("testuser") is None
+
+def test_cache_invalidated_on_update(user_repository, mocker, mock_transaction):
+    """Test that renaming a user invalidates the old username mapping."""
+    mocker.patch('app.repositories.dynamodb_models.UsernameReservationModel.get', return_value=_reservation("1"))
+    mocker.patch('app.repositories.dynamodb_models.UserModel.get', return_value=_user_model("1", "oldname"))
+    user_repository.get_user_by_username("oldname")
+
+    user_repository.update_user("1", {"username": "newname"})
+
+    mock_get_reservation = mocker.patch(
+        'app.repositories.dynamodb_models.UsernameReservationModel.get', side_effect=DoesNotExist
+    )
+    assert user_repository.get_user_by_username("oldname") is None
+    mock_get_reservation.assert_called_once()
+
+def test_add_user(user_repository, mock_transaction):
+    """Test that the reservation and the user are written in one conditional transaction."""
     user_data = {"username": "newuser", "email": "new@example.com", "password_hash": "hashed_password"}
     user, error = user_repository.add_user(user_data)
-    
+
     assert error is None
-    assert user is not None
     assert user['username'] == 'newuser'
-    mock_save.assert_called_once()
+    reservation, user_model = [call.args[0] for call in mock_transaction.save.call_args_list]
+    assert reservation.id == "USERNAME#newuser"
+    assert reservation.user_id == user['id']
+    assert user_model.id == user['id']
+    assert all(call.kwargs['condition'] is not None for call in mock_transaction.save.call_args_list)
+
+def test_add_user_already_exists(user_repository, mock_transact_write):
+    """Test that a failed reservation condition is reported as a duplicate username."""
+    mock_transact_write.return_value.__exit__.side_effect = _cancelled('ConditionalCheckFailed', None)
 
-def test_add_user_already_exists(user_repository, mocker):
-    """Test adding a user that already exists."""
-    mocker.patch.object(user_repository, 'get_user_by_username', return_value={"id": "1", "username": "existinguser"})
-    
     user_data = {"username": "existinguser", "email": "new@example.com", "password_hash": "hashed_password"}
-    user, error = user_repository.add_user(user_data)
-    
-    assert user is None
-    assert error == "Username already exists"
+    assert user_repository.add_user(user_data) == (None, "Username already exists")
 
-def test_update_user(user_repository, mocker):
-    """Test updating an existing user."""
-    mock_user_model = MagicMock()
-    mock_get = mocker.patch('app.repositories.dynamodb_models.UserModel.get', return_value=mock_user_model)
-    mock_save = mocker.patch.object(mock_user_model, 'save')
+    mock_transact_write.return_value.__exit__.side_effect = _cancelled(None, 'ThrottlingError')
+    assert user_repository.add_user(user_data) == (None, "Failed to add user")
 
-    update_data = {"username": "newname"}
-    updated_user = user_repository.update_user("1", update_data)
-    
+def test_add_users_writes_chunks_in_one_transaction_each(user_repository, mock_transact_write, mock_transaction):
+    """Test that a batch of users is written in one transaction per chunk."""
+    users_data = [{"username": f"user{i}", "email": f"user{i}@example.com", "password_hash": "hash"} for i in range(60)]
+
+    results = user_repository.add_users(users_data, max_workers=1)
+
+    assert mock_transact_write.call_count == 2
+    assert mock_transaction.save.call_count == 120
+    assert all(result['id'] and result['error'] is None for result in results)
+
+def test_add_users_retries_a_cancelled_chunk_user_by_user(user_repository, mocker):
+    """Test that only the users whose username is taken fail when a chunk is cancelled."""
+    mocker.patch('app.repositories.dynamodb_models.UserModel._get_connection')
+    transact_write = mocker.patch('app.repositories.user_repository.TransactWrite')
+    transact_write.return_value.__exit__.side_effect = [_cancelled(None, None, 'ConditionalCheckFailed'), None, _cancelled('ConditionalCheckFailed', None)]
+    users_data = [{"username": name, "email": f"{name}@example.com", "password_hash": "hash"} for name in ("new", "taken")]
+
+    results = user_repository.add_users(users_data)
+
+    assert results[0]['error'] is None
+    assert results[1] == {"id": None, "error": "Username already exists"}
+
+def test_update_user(user_repository, mocker, mock_transaction):
+    """Test that a rename moves the reservation in the same transaction as the user write."""
+    mock_user_model = _user_model("1", "oldname")
+    mocker.patch('app.repositories.dynamodb_models.UserModel.get', return_value=mock_user_model)
+
+    updated_user, error = user_repository.update_user("1", {"username": "newname", "id": "ignored"})
+
+    assert error is None
     assert updated_user is not None
-    mock_get.assert_called_with("1")
-    mock_save.assert_called_once()
     assert mock_user_model.username == "newname"
+    assert mock_user_model.id == "1"
+    assert mock_transaction.save.call_args_list[0].args[0].id == "USERNAME#newname"
+    assert mock_transaction.delete.call_args.args[0].id == "USERNAME#oldname"
+    assert mock_transaction.save.call_args_list[1].args[0] is mock_user_model
 
-def test_delete_user(user_repository, mocker):
-    """Test deleting a user."""
-    mock_user_model = MagicMock()
+def test_update_user_without_rename_is_a_plain_save(user_repository, mocker, mock_transaction):
+    """Test that an update keeping the username needs no transaction."""
+    mock_user_model = _user_model("1", "samename")
+    mocker.patch('app.repositories.dynamodb_models.UserModel.get', return_value=mock_user_model)
+
+    user_repository.update_user("1", {"username": "samename", "email": "new@example.com"})
+
+    mock_user_model.save.assert_called_once()
+    assert mock_user_model.save.call_args.kwargs['condition'] is not None
+    mock_transaction.save.assert_not_called()
+
+def test_update_user_reports_missing_users_and_taken_usernames(user_repository, mocker, mock_transact_write):
+    """Test that update_user returns an error instead of None, and never recreates a deleted user."""
+    mock_user_model = _user_model("1", "samename")
     mocker.patch('app.repositories.dynamodb_models.UserModel.get', return_value=mock_user_model)
-    mock_delete = mocker.patch.object(mock_user_model, 'delete')
+    cause = ClientError({'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'The conditional request failed'}}, 'PutItem')
+    mock_user_model.save.side_effect = PutError("Failed", cause)
 
-    result = user_repository.delete_user("1")
-    assert result is True
-    mock_delete.assert_called_once()
+    assert user_repository.update_user("1", {"email": "new@example.com"}) == (None, "User not found")
+
+    mock_transact_write.return_value.__exit__.side_effect = _cancelled('ConditionalCheckFailed', None, None)
+    assert user_repository.update_user("1", {"username": "taken"}) == (None, "Username already exists")
 
     mocker.patch('app.repositories.dynamodb_models.UserModel.get', side_effect=DoesNotExist)
-    result = user_repository.delete_user("nonexistent")
-    assert result is False
\ No newline at end of file
+    assert user_repository.update_user("2", {"email": "new@example.com"}) == (None, "User not found")
+
+def test_users_without_reservation_are_found_through_username_index(user_repository, mocker, mock_transact_write):
+    """Test that users created before reservations can log in and keep their username."""
+    mocker.patch('app.repositories.dynamodb_models.UsernameReservationModel.get', side_effect=DoesNotExist)
+    legacy_user = _user_model("1", "legacy")
+    legacy_user.attribute_values["password_hash"] = "hash"
+    mocker.patch('app.repositories.dynamodb_models.UserModel.get', return_value=legacy_user)
+    mock_query = mocker.patch('app.repositories.dynamodb_models.UserModel.username_index.query', return_value=[legacy_user])
+    assert user_repository.get_user_by_username("legacy") is None
+    mock_query.assert_not_called()
+
+    user_repository.username_index_fallback = True
+    assert user_repository.get_user_by_username("legacy")['password_hash'] == "hash"
+    assert user_repository.add_user({"username": "legacy", "email": "x@example.com", "password_hash": "hash"}) == (None, "Username already exists")
+    mock_transact_write.assert_not_called()
+
+    user_repository.username_index_fallback = False
+    assert user_repository.get_user_by_username("legacy") is None
+
+def test_update_password_hash_is_conditional(user_repository, mocker):
+    """Test that the hash is replaced by a conditional update and stale entries are dropped."""
+    mock_update = mocker.patch('app.repositories.dynamodb_models.UserModel.update')
+    user_repository.cache.set("user:id:1", {"id": "1"})
+
+    assert user_repository.update_password_hash("1", "old-hash", "new-hash") is True
+    assert mock_update.call_args.kwargs['condition'] is not None
+    assert user_repository.cache.get("user:id:1") is None
+
+    cause = ClientError({'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'The conditional request failed'}}, 'UpdateItem')
+    mock_update.side_effect = UpdateError("Failed", cause)
+    assert user_repository.update_password_hash("1", "old-hash", "new-hash") is False
+
+def test_delete_user(user_repository, mocker, mock_transaction):
+    """Test deleting a user and releasing its username in one transaction."""
+    mock_get = mocker.patch('app.repositories.dynamodb_models.UserModel.get', return_value=_user_model("1", "testuser"))
+
+    assert user_repository.delete_user("1") is True
+    mock_get.assert_called_once_with("1", consistent_read=True)
+    user_item, reservation = [call.args[0] for call in mock_transaction.delete.call_args_list]
+    assert user_item.id == "1"
+    assert reservation.id == "USERNAME#testuser"
+
+    mocker.patch('app.repositories.dynamodb_models.UserModel.get', side_effect=DoesNotExist)
+    assert user_repository.delete_user("nonexistent") is False
+
+def test_reserve_usernames_backfills_and_reports_conflicts(user_repository, mocker):
+    """Test that existing users get reservations and names held by someone else are reported."""
+    users = [{"id": "1", "username": "alice"}, {"id": "2", "username": "bob"}]
+    mocker.patch.object(user_repository, 'iter_all_users', return_value=iter(users))
+    cause = ClientError({'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'The conditional request failed'}}, 'PutItem')
+    mock_save = mocker.patch(
+        'app.repositories.dynamodb_models.UsernameReservationModel.save', side_effect=[None, PutError("Failed", cause)]
+    )
+
+    reserved, conflicts = user_repository.reserve_usernames(total_segments=2)
+
+    assert reserved == 1
+    assert conflicts == [users[1]]
+    assert mock_save.call_count == 2
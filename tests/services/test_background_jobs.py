@@ -0,0 +1,65 @@
+import threading
+import time
+import pytest
+from app.repositories.cache import TTLCache, RedisCache
+from app.services.background_jobs import BackgroundJobRegistry
+
+def _wait_for_state(registry, job_id, states=('completed', 'failed')):
+    for _ in range(100):
+        job = registry.get(job_id)
+        if job and job['state'] in states:
+            return job
+        time.sleep(0.01)
+    return job
+
+def test_job_reports_progress_and_result():
+    """Test that progress reports and the return value end up in the job status."""
+    registry = BackgroundJobRegistry(TTLCache())
+    job_id = registry.submit('user1', 'test', lambda report: report(done=1) or {'total': 2})
+
+    job = _wait_for_state(registry, job_id)
+
+    assert job['state'] == 'completed'
+    assert job['owner_id'] == 'user1'
+    assert job['progress'] == {'done': 1, 'total': 2}
+    assert job['finished_at'] is not None
+
+def test_failed_job_records_the_error():
+    """Test that an exception fails the job with its message."""
+    registry = BackgroundJobRegistry(TTLCache())
+
+    def fail(report):
+        raise RuntimeError('boom')
+    job = _wait_for_state(registry, registry.submit('user1', 'test', fail))
+
+    assert job['state'] == 'failed'
+    assert job['error'] == 'boom'
+
+def test_unknown_job_is_none():
+    """Test that a job id nobody submitted has no status."""
+    assert BackgroundJobRegistry(TTLCache()).get('missing') is None
+
+fakeredis = pytest.importorskip('fakeredis')
+
+def test_job_status_is_shared_between_processes():
+    """Test that a job started by one worker can be polled from another."""
+    server = fakeredis.FakeServer()
+    worker_a = BackgroundJobRegistry(RedisCache(fakeredis.FakeRedis(server=server), 'background-jobs', ttl_seconds=60))
+    worker_b = BackgroundJobRegistry(RedisCache(fakeredis.FakeRedis(server=server), 'background-jobs', ttl_seconds=60))
+    release = threading.Event()
+
+    def job(report):
+        report(deleted=5)
+        release.wait(5)
+        return {'deleted': 10}
+    job_id = worker_a.submit('user1', 'test', job)
+
+    for _ in range(100):
+        running = worker_b.get(job_id)
+        if running and running['progress']:
+            break
+        time.sleep(0.01)
+    assert running['state'] == 'running'
+    assert running['progress'] == {'deleted': 5}
+    release.set()
+    assert _wait_for_state(worker_b, job_id)['progress'] == {'deleted': 10}
@@ -0,0 +1,93 @@
+import pytest
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from app.services.password_hasher import (
+    InlinePasswordHasher, ProcessPoolPasswordHasher, PasswordHasherBusyError, create_password_hasher,
+    canonical_method, recommend_method
+)
+
+# A deliberately cheap KDF setting so the tests stay fast.
+FAST_METHOD = 'pbkdf2:sha256:1000'
+
+def test_inline_hasher_round_trip():
+    """Test hashing and verifying on the calling thread."""
+    hasher = InlinePasswordHasher(FAST_METHOD)
+    password_hash = hasher.hash("password123")
+
+    assert password_hash.startswith('pbkdf2:sha256:1000$')
+    assert hasher.verify(password_hash, "password123") is True
+    assert hasher.verify(password_hash, "wrong") is False
+
+def test_process_pool_hasher_round_trip():
+    """Test hashing and verifying in the process pool."""
+    hasher = ProcessPoolPasswordHasher(FAST_METHOD, max_workers=1, max_pending=2, timeout=30)
+    password_hash = hasher.hash("password123")
+
+    assert hasher.verify(password_hash, "password123") is True
+    assert hasher.verify(password_hash, "wrong") is False
+
+def test_process_pool_hasher_rejects_when_saturated():
+    """Test that calls beyond max_pending fail fast instead of queueing."""
+    hasher = ProcessPoolPasswordHasher(FAST_METHOD, max_workers=1, max_pending=1, timeout=30)
+    hasher._slots.acquire()
+
+    with pytest.raises(PasswordHasherBusyError):
+        hasher.hash("password123")
+    assert hasher._executor is None
+
+def test_process_pool_hasher_replaces_a_broken_pool(mocker):
+    """Test that a call hitting a broken pool is retried once on a fresh pool."""
+    broken = Future()
+    broken.set_exception(BrokenProcessPool("A child process terminated abruptly"))
+    hashed = Future()
+    hashed.set_result("pbkdf2:sha256:1000$salt$hash")
+    first_pool, second_pool = MagicMock(), MagicMock()
+    first_pool.submit.return_value = broken
+    second_pool.submit.return_value = hashed
+    mocker.patch('app.services.password_hasher.ProcessPoolExecutor', side_effect=[first_pool, second_pool])
+    hasher = ProcessPoolPasswordHasher(FAST_METHOD, max_workers=1, max_pending=1, timeout=30)
+
+    assert hasher.hash("password123") == "pbkdf2:sha256:1000$salt$hash"
+    first_pool.shutdown.assert_called_once_with(wait=False)
+    assert hasher._executor is second_pool
+    # Both attempts gave their pending slot back
+    assert hasher._slots.acquire(blocking=False)
+
+def test_create_password_hasher():
+    """Test selecting the backend from configuration."""
+    config = SimpleNamespace(
+        PASSWORD_HASH_BACKEND='inline', PASSWORD_HASH_METHOD=FAST_METHOD,
+        PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_MAX_PENDING=1, PASSWORD_HASH_TIMEOUT=1
+    )
+    assert type(create_password_hasher(config)) is InlinePasswordHasher
+
+    config.PASSWORD_HASH_BACKEND = 'process'
+    assert isinstance(create_password_hasher(config), ProcessPoolPasswordHasher)
+
+    config.PASSWORD_HASH_BACKEND = 'bogus'
+    with pytest.raises(ValueError):
+        create_password_hasher(config)
+
+def test_canonical_method():
+    """Test expanding abbreviated Werkzeug methods to their stored form."""
+    assert canonical_method('scrypt') == 'scrypt:32768:8:1'
+    assert canonical_method('pbkdf2:sha256:1000') == 'pbkdf2:sha256:1000'
+    assert canonical_method('pbkdf2').startswith('pbkdf2:sha256:')
+    with pytest.raises(ValueError):
+        canonical_method('md5')
+
+def test_needs_rehash():
+    """Test detecting hashes whose algorithm or cost differs from the target."""
+    hasher = InlinePasswordHasher('scrypt')
+
+    assert hasher.needs_rehash('scrypt:32768:8:1$salt$hash') is False
+    assert hasher.needs_rehash('scrypt:16384:8:1$salt$hash') is True
+    assert hasher.needs_rehash('pbkdf2:sha256:600000$salt$hash') is True
+
+def test_recommend_method():
+    """Test scaling the KDF cost towards a target time."""
+    assert recommend_method('scrypt:32768:8:1', 0.1, 0.2) == 'scrypt:65536:8:1'
+    assert recommend_method('scrypt:32768:8:1', 0.1, 0.01) == 'scrypt:16384:8:1'
+    assert recommend_method('pbkdf2:sha256:600000', 0.2, 0.1) == 'pbkdf2:sha256:300000'
@@ -0,0 +1,39 @@
+import pytest
+from werkzeug.security import check_password_hash
+from app.repositories.in_memory_db import InMemoryDB
+from app.repositories.in_memory_todo_repository import InMemoryTodoRepository
+from app.repositories.in_memory_user_repository import InMemoryUserRepository
+from app.services.seed_service import SeedService
+
+@pytest.fixture
+def seeded_db():
+    """Fixture to provide an InMemoryDB seeded with 3 users of 5 todos each."""
+    db = InMemoryDB()
+    SeedService(InMemoryUserRepository(db), InMemoryTodoRepository(db)).seed(3, 5, "secret", batch_size=4)
+    return db
+
+def test_seed_creates_users_with_a_shared_valid_hash(seeded_db):
+    """Test that every seeded user can log in with the seed password."""
+    users = InMemoryUserRepository(seeded_db).get_all_users()
+
+    assert sorted(user['username'] for user in users) == ["testuser1", "testuser2", "testuser3"]
+    assert len({user['password_hash'] for user in users}) == 1
+    assert check_password_hash(users[0]['password_hash'], "secret")
+
+def test_seed_writes_todos_in_batches(seeded_db):
+    """Test that todos are written through add_todos in batch_size chunks."""
+    user = InMemoryUserRepository(seeded_db).get_user_by_username("testuser2")
+    todos = InMemoryTodoRepository(seeded_db).get_todos_by_user_id(user['id'])
+
+    assert len(todos) == 5
+    assert {todo['status'] for todo in todos} == {"pending", "completed"}
+
+def test_seed_skips_existing_usernames(seeded_db, mocker):
+    """Test that running the seed again only adds the missing users."""
+    todo_repo = InMemoryTodoRepository(seeded_db)
+    progress = mocker.MagicMock()
+
+    result = SeedService(InMemoryUserRepository(seeded_db), todo_repo).seed(4, 2, "secret", progress=progress)
+
+    assert result == (1, 2)
+    progress.assert_called_once_with(users=1, todos=2)
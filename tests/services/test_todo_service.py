@@ -1,15 +1,14 @@
+import threading
+import time
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock
+from app.repositories.cache import TTLCache
 from app.services.todo_service import TodoService
 
 @pytest.fixture
 def todo_service():
-    """Fixture to provide a TodoService instance with mocked dependencies."""
-    with patch('app.services.todo_service.TodoRepository') as MockTodoRepository:
-        mock_todo_repo_instance = MockTodoRepository.return_value
-        service = TodoService()
-        service.todo_repo = mock_todo_repo_instance
-        yield service
+    """Fixture to provide a TodoService instance with a mocked repository and an empty cache."""
+    return TodoService(MagicMock(), TTLCache(), settle_seconds=0)
 
 def test_create_todo(todo_service):
     """Test creating a new todo item."""
@@ -28,6 +27,91 @@ def test_create_todo(todo_service):
     assert todo['status'] == "pending"
     todo_service.todo_repo.add_todo.assert_called_once()
 
+def test_create_todos(todo_service):
+    """Test bulk creating todos defaults the status to pending."""
+    todo_service.todo_repo.add_todos.return_value = [{"id": "a", "error": None}, {"id": "b", "error": None}]
+
+    results = todo_service.create_todos("user123", [{"description": "Task 1"}, {"description": "Task 2", "status": "completed"}])
+
+    assert len(results) == 2
+    todo_service.todo_repo.add_todos.assert_called_once_with([
+        {"user_id": "user123", "description": "Task 1", "status": "pending"},
+        {"user_id": "user123", "description": "Task 2", "status": "completed"}
+    ], max_workers=4)
+
+def test_import_todos_batches_rows_and_reports_errors(todo_service):
+    """Test that valid rows are written in batches and failures keep their line numbers."""
+    def add_todos(todos_data, max_workers):
+        return [
+            {"id": None, "error": "boom"} if todo['description'] == "fails" else {"id": "ok", "error": None}
+            for todo in todos_data
+        ]
+
+    todo_service.todo_repo.add_todos.side_effect = add_todos
+    version = todo_service.get_todos_version("user123")
+    rows = [
+        (1, {"description": "Task 1"}, None),
+        (2, None, "'description' is a required property"),
+        (3, {"description": "fails", "status": "completed"}, None),
+        (4, {"description": "Task 4", "status": "completed"}, None),
+        (5, {"description": "Task 5"}, None)
+    ]
+
+    events = list(todo_service.import_todos("user123", iter(rows), batch_size=2, max_in_flight=1, max_workers=3))
+
+    errors = [event for event in events if event['event'] == 'error']
+    assert errors == [
+        {"event": "error", "line": 2, "error": "'description' is a required property"},
+        {"event": "error", "line": 3, "error": "boom"}
+    ]
+    assert [event for event in events if event['event'] == 'progress'][-1]['created'] == 3
+    assert events[-1] == {"event": "done", "rows": 5, "created": 3, "failed": 2}
+    assert [len(call.args[0]) for call in todo_service.todo_repo.add_todos.call_args_list] == [2, 2]
+    assert todo_service.todo_repo.add_todos.call_args_list[0].args[0][0] == {
+        "user_id": "user123", "description": "Task 1", "status": "pending"
+    }
+    assert todo_service.todo_repo.add_todos.call_args_list[0].kwargs == {"max_workers": 3}
+    assert todo_service.get_todos_version("user123") != version
+
+def test_import_todos_bounds_batches_in_flight(todo_service):
+    """Test that parsing stops while max_in_flight batches are being written."""
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+    parsed = 0
+
+    def add_todos(todos_data, max_workers):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.01)
+        with lock:
+            active -= 1
+        return [{"id": "ok", "error": None} for _ in todos_data]
+
+    events = []
+
+    def written_rows():
+        progress = [event for event in events if event['event'] == 'progress']
+        return progress[-1]['created'] if progress else 0
+
+    def rows():
+        nonlocal parsed
+        for line in range(1, 101):
+            parsed += 1
+            # Never more than the batches in flight plus the one being filled
+            assert parsed - written_rows() <= 3 * 10
+            yield line, {"description": f"Task {line}"}, None
+
+    todo_service.todo_repo.add_todos.side_effect = add_todos
+    for event in todo_service.import_todos("user123", rows(), batch_size=10, max_in_flight=2):
+        events.append(event)
+
+    assert peak == 2
+    assert events[-1] == {"event": "done", "rows": 100, "created": 100, "failed": 0}
+    assert todo_service.todo_repo.add_todos.call_count == 10
+
 def test_get_user_todos(todo_service):
     """Test retrieving all todos for a specific user."""
     user_id = "user123"
@@ -42,6 +126,70 @@ def test_get_user_todos(todo_service):
     assert todos == mock_todos
     todo_service.todo_repo.get_todos_by_user_id.assert_called_once_with(user_id)
 
+def test_get_user_todos_page(todo_service):
+    """Test retrieving one page of todos for a specific user."""
+    user_id = "user123"
+    mock_page = ([{"id": "todo1", "user_id": user_id, "description": "Task 1"}], "cursor2")
+    todo_service.todo_repo.get_todos_page_by_user_id.return_value = mock_page
+
+    page = todo_service.get_user_todos_page(user_id, 1, "cursor1")
+
+    assert page == mock_page
+    todo_service.todo_repo.get_todos_page_by_user_id.assert_called_once_with(user_id, 1, "cursor1")
+
+def test_get_serialized_todos_page_is_cached(todo_service):
+    """Test that a page is read and serialized once per todo list version."""
+    todo_service.todo_repo.get_todos_page_by_user_id.return_value = ([{"id": "todo1"}], None)
+    serialize = MagicMock(return_value='{"items": []}')
+    version = todo_service.get_todos_version("user123")
+
+    first = todo_service.get_serialized_todos_page("user123", 50, None, version, serialize)
+    second = todo_service.get_serialized_todos_page("user123", 50, None, version, serialize)
+
+    assert first == second == '{"items": []}'
+    assert todo_service.get_todos_version("user123") == version
+    todo_service.todo_repo.get_todos_page_by_user_id.assert_called_once_with("user123", 50, None)
+    serialize.assert_called_once_with([{"id": "todo1"}], None)
+
+def test_writes_change_todos_version(todo_service):
+    """Test that successful create/update/delete invalidate the list version."""
+    version = todo_service.get_todos_version("user123")
+
+    todo_service.todo_repo.add_todo.return_value = {"id": "todo1"}
+    todo_service.create_todo("user123", "Task")
+    created_version = todo_service.get_todos_version("user123")
+    assert created_version != version
+
+    todo_service.todo_repo.update_todo.return_value = None
+    todo_service.update_todo("todo1", "user123", {"status": "completed"})
+    assert todo_service.get_todos_version("user123") == created_version
+
+    todo_service.todo_repo.delete_todo.return_value = True
+    todo_service.delete_todo("todo1", "user123")
+    assert todo_service.get_todos_version("user123") != created_version
+
+def test_pages_are_not_cached_until_a_write_settles():
+    """Test that right after a write there is no version and pages are read every time."""
+    now = [1000.0]
+    todo_service = TodoService(MagicMock(), TTLCache(), settle_seconds=2, clock=lambda: now[0])
+    todo_service.todo_repo.get_todos_page_by_user_id.return_value = ([{"id": "todo1"}], None)
+    todo_service.todo_repo.add_todo.return_value = {"id": "todo1"}
+    serialize = MagicMock(return_value='{"items": []}')
+    todo_service.create_todo("user123", "Task")
+
+    now[0] += 1
+    assert todo_service.get_todos_version("user123") is None
+    todo_service.get_serialized_todos_page("user123", 50, None, None, serialize)
+    todo_service.get_serialized_todos_page("user123", 50, None, None, serialize)
+    assert todo_service.todo_repo.get_todos_page_by_user_id.call_count == 2
+
+    now[0] += 1
+    version = todo_service.get_todos_version("user123")
+    assert version is not None
+    todo_service.get_serialized_todos_page("user123", 50, None, version, serialize)
+    todo_service.get_serialized_todos_page("user123", 50, None, version, serialize)
+    assert todo_service.todo_repo.get_todos_page_by_user_id.call_count == 3
+
 def test_get_todo_by_id_and_user_success(todo_service):
     """Test retrieving a specific todo by ID and user ID (success case)."""
     todo_id = "todo123"
@@ -85,7 +233,6 @@ def test_update_todo_success(todo_service):
     update_data = {"description": "Updated description", "status": "completed"}
     original_todo = {"id": todo_id, "user_id": user_id, "description": "Old description", "status": "pending"}
     
-    todo_service.todo_repo.get_todo_by_id.return_value = original_todo
     todo_service.todo_repo.update_todo.return_value = {**original_todo, **update_data}
 
     updated_todo = todo_service.update_todo(todo_id, user_id, update_data)
@@ -93,73 +240,48 @@ def test_update_todo_success(todo_service):
     assert updated_todo is not None
     assert updated_todo['description'] == update_data['description']
     assert updated_todo['status'] == update_data['status']
-    todo_service.todo_repo.get_todo_by_id.assert_called_once_with(todo_id)
-    todo_service.todo_repo.update_todo.assert_called_once()
+    todo_service.todo_repo.get_todo_by_id.assert_not_called()
+    todo_service.todo_repo.update_todo.assert_called_once_with(todo_id, user_id, update_data)
 
-def test_update_todo_not_found(todo_service):
-    """Test updating a todo item that does not exist."""
-    todo_id = "nonexistent_todo"
-    user_id = "user123"
-    update_data = {"description": "Updated description"}
-    todo_service.todo_repo.get_todo_by_id.return_value = None
+def test_update_todo_only_sends_provided_fields(todo_service):
+    """Test that only description/status provided by the caller are updated."""
+    todo_service.todo_repo.update_todo.return_value = {"id": "todo123"}
 
-    updated_todo = todo_service.update_todo(todo_id, user_id, update_data)
+    todo_service.update_todo("todo123", "user123", {"description": "Updated description", "user_id": "hijack"})
 
-    assert updated_todo is None
-    todo_service.todo_repo.get_todo_by_id.assert_called_once_with(todo_id)
-    todo_service.todo_repo.update_todo.assert_not_called()
+    todo_service.todo_repo.update_todo.assert_called_once_with("todo123", "user123", {"description": "Updated description"})
 
-def test_update_todo_wrong_user(todo_service):
-    """Test updating a todo item by a wrong user."""
-    todo_id = "todo123"
+def test_update_todo_not_found_or_wrong_user(todo_service):
+    """Test updating a todo item that does not exist or belongs to another user."""
+    todo_id = "nonexistent_todo"
     user_id = "user123"
-    wrong_user_id = "user456"
     update_data = {"description": "Updated description"}
-    original_todo = {"id": todo_id, "user_id": wrong_user_id, "description": "Old description", "status": "pending"}
-    todo_service.todo_repo.get_todo_by_id.return_value = original_todo
+    todo_service.todo_repo.update_todo.return_value = None
 
     updated_todo = todo_service.update_todo(todo_id, user_id, update_data)
 
     assert updated_todo is None
-    todo_service.todo_repo.get_todo_by_id.assert_called_once_with(todo_id)
-    todo_service.todo_repo.update_todo.assert_not_called()
+    todo_service.todo_repo.get_todo_by_id.assert_not_called()
 
 def test_delete_todo_success(todo_service):
     """Test deleting a todo item (success case)."""
     todo_id = "todo123"
     user_id = "user123"
-    mock_todo = {"id": todo_id, "user_id": user_id, "description": "Test Todo"}
-    todo_service.todo_repo.get_todo_by_id.return_value = mock_todo
     todo_service.todo_repo.delete_todo.return_value = True
 
     result = todo_service.delete_todo(todo_id, user_id)
 
     assert result is True
-    todo_service.todo_repo.get_todo_by_id.assert_called_once_with(todo_id)
-    todo_service.todo_repo.delete_todo.assert_called_once_with(todo_id)
+    todo_service.todo_repo.get_todo_by_id.assert_not_called()
+    todo_service.todo_repo.delete_todo.assert_called_once_with(todo_id, user_id)
 
-def test_delete_todo_not_found(todo_service):
-    """Test deleting a todo item that does not exist."""
+def test_delete_todo_not_found_or_wrong_user(todo_service):
+    """Test deleting a todo item that does not exist or belongs to another user."""
     todo_id = "nonexistent_todo"
     user_id = "user123"
-    todo_service.todo_repo.get_todo_by_id.return_value = None
+    todo_service.todo_repo.delete_todo.return_value = False
 
     result = todo_service.delete_todo(todo_id, user_id)
 
     assert result is False
-    todo_service.todo_repo.get_todo_by_id.assert_called_once_with(todo_id)
-    todo_service.todo_repo.delete_todo.assert_not_called()
-
-def test_delete_todo_wrong_user(todo_service):
-    """Test deleting a todo item by a wrong user."""
-    todo_id = "todo123"
-    user_id = "user123"
-    wrong_user_id = "user456"
-    mock_todo = {"id": todo_id, "user_id": wrong_user_id, "description": "Test Todo"}
-    todo_service.todo_repo.get_todo_by_id.return_value = mock_todo
-
-    result = todo_service.delete_todo(todo_id, user_id)
-
-    assert result is False
-    todo_service.todo_repo.get_todo_by_id.assert_called_once_with(todo_id)
-    todo_service.todo_repo.delete_todo.assert_not_called()
+    todo_service.todo_repo.delete_todo.assert_called_once_with(todo_id, user_id)
@@ -0,0 +1,63 @@
+import pytest
+from app.services.token_blocklist import MemoryTokenBlocklist, RedisTokenBlocklist
+
+def _payload(jti, sub='user1', iat=1000, exp=1900):
+    return {'jti': jti, 'sub': sub, 'iat': iat, 'exp': exp, 'type': 'access'}
+
+def test_memory_blocklist_revokes_tokens_until_they_expire():
+    """Test that a revoked jti is blocked until the token's own exp."""
+    now = [1000.0]
+    blocklist = MemoryTokenBlocklist(max_token_lifetime_seconds=3600, clock=lambda: now[0])
+    blocklist.revoke_token(_payload('a'))
+
+    assert blocklist.is_revoked(_payload('a'))
+    assert not blocklist.is_revoked(_payload('b'))
+    now[0] = 1900.0
+    assert not blocklist.is_revoked(_payload('a'))
+
+def test_memory_blocklist_revokes_tokens_issued_before_user_revocation(mocker):
+    """Test that revoking a user blocks the tokens issued to them so far."""
+    mocker.patch('app.services.token_blocklist.time.time', return_value=1500.0)
+    blocklist = MemoryTokenBlocklist(max_token_lifetime_seconds=3600, clock=lambda: 1500.0)
+    blocklist.revoke_user('user1')
+
+    assert blocklist.is_revoked(_payload('a', iat=1400))
+    assert not blocklist.is_revoked(_payload('b', iat=1600))
+    assert not blocklist.is_revoked(_payload('c', sub='user2'))
+
+def test_memory_blocklist_revokes_the_login_of_a_token():
+    """Test that revoking a token with refresh_jti also revokes the paired refresh token."""
+    blocklist = MemoryTokenBlocklist(max_token_lifetime_seconds=3600, clock=lambda: 1000.0)
+    access = dict(_payload('access1'), refresh_jti='refresh1')
+    blocklist.revoke_token(access)
+
+    assert blocklist.is_revoked(dict(_payload('refresh1'), type='refresh'))
+    assert blocklist.is_revoked(dict(_payload('access2'), refresh_jti='refresh1'))
+    assert not blocklist.is_revoked(dict(_payload('access3'), refresh_jti='refresh2'))
+
+def test_memory_blocklist_drops_expired_entries():
+    """Test that expired entries are purged so the set stays compact."""
+    now = [1000.0]
+    blocklist = MemoryTokenBlocklist(max_token_lifetime_seconds=3600, clock=lambda: now[0])
+    for n in range(1000):
+        blocklist.revoke_token(_payload(f'old{n}', exp=1100))
+    now[0] = 1200.0
+    for n in range(100):
+        blocklist.revoke_token(_payload(f'new{n}', exp=2000))
+
+    assert blocklist.stats()['entries'] == 100
+
+fakeredis = pytest.importorskip('fakeredis')
+
+def test_redis_blocklist_is_shared_between_processes():
+    """Test that a token revoked by one worker is blocked in another."""
+    server = fakeredis.FakeServer()
+    worker_a = RedisTokenBlocklist(fakeredis.FakeRedis(server=server), max_token_lifetime_seconds=3600)
+    worker_b = RedisTokenBlocklist(fakeredis.FakeRedis(server=server), max_token_lifetime_seconds=3600)
+
+    worker_a.revoke_token(_payload('a', exp=4102444800))
+    worker_a.revoke_user('user2')
+
+    assert worker_b.is_revoked(_payload('a'))
+    assert worker_b.is_revoked(_payload('b', sub='user2'))
+    assert not worker_b.is_revoked(_payload('c'))
@@ -1,17 +1,19 @@
+import threading
+import time
 import pytest
-from unittest.mock import MagicMock, patch
-from app.services.user_service import UserService
+from unittest.mock import MagicMock
+from app.repositories.cache import TTLCache
+from app.services.background_jobs import BackgroundJobRegistry
+from app.services.user_service import UserDeletionError, UserService
 
 @pytest.fixture
 def user_service():
     """Fixture to provide a UserService instance with mocked dependencies."""
-    with patch('app.services.user_service.UserRepository') as MockUserRepository, \
-         patch('app.services.user_service.TodoRepository') as MockTodoRepository:
-        
-        service = UserService()
-        service.user_repo = MockUserRepository.return_value
-        service.todo_repo = MockTodoRepository.return_value
-        yield service
+    password_hasher = MagicMock()
+    password_hasher.needs_rehash.return_value = False
+    return UserService(
+        MagicMock(), MagicMock(), MagicMock(), password_hasher, MagicMock(), BackgroundJobRegistry(TTLCache(), max_workers=2)
+    )
         
 def test_signup_user_success(user_service):
     """Test successful user signup."""
@@ -29,27 +31,30 @@ def test_signup_user_success(user_service):
     }
     user_service.user_repo.add_user.return_value = (created_user, None)
 
-    with patch('app.services.user_service.generate_password_hash', return_value="hashed_password"):
-        user_data, error = user_service.signup_user(username, password, email)
+    user_service.password_hasher.hash.return_value = "hashed_password"
+    user_data, error = user_service.signup_user(username, password, email)
 
-        assert error is None
-        assert user_data is not None
-        assert user_data['username'] == username
-        user_service.user_repo.add_user.assert_called_once()
+    assert error is None
+    assert user_data is not None
+    assert user_data['username'] == username
+    user_service.user_repo.add_user.assert_called_once()
+    assert user_service.user_repo.add_user.call_args.args[0]['password_hash'] == "hashed_password"
+    user_service.password_hasher.hash.assert_called_once_with(password)
 
 def test_signup_user_username_exists(user_service):
     """Test user signup when username already exists."""
     username = "existinguser"
     password = "password123"
 
-    # Configure mock to simulate existing user
-    user_service.user_repo.get_user_by_username.return_value = {"username": username}
+    # The repository rejects the duplicate; the service does not query the username itself
+    user_service.user_repo.add_user.return_value = (None, "Username already exists")
 
     user_data, error = user_service.signup_user(username, password)
 
     assert user_data is None
     assert error == "Username already exists"
-    user_service.user_repo.add_user.assert_not_called()
+    user_service.user_repo.get_user_by_username.assert_not_called()
+    user_service.user_repo.add_user.assert_called_once()
 
 def test_authenticate_user_success(user_service):
     """Test successful user authentication."""
@@ -60,9 +65,50 @@ def test_authenticate_user_success(user_service):
     mock_user = {"username": username, "password_hash": hashed_password}
     user_service.user_repo.get_user_by_username.return_value = mock_user
 
-    with patch('app.services.user_service.check_password_hash', return_value=True):
-        authenticated_user = user_service.authenticate_user(username, password)
-        assert authenticated_user == mock_user
+    user_service.password_hasher.verify.return_value = True
+    authenticated_user = user_service.authenticate_user(username, password)
+    assert authenticated_user == mock_user
+    user_service.password_hasher.verify.assert_called_once_with(hashed_password, password)
+
+def test_authenticate_user_rehashes_outdated_hash(user_service):
+    """Test that a successful login upgrades an outdated hash in the background."""
+    mock_user = {"id": "user123", "username": "authuser", "password_hash": "pbkdf2:sha256:1000$salt$hash"}
+    user_service.user_repo.get_user_by_username.return_value = mock_user
+    user_service.password_hasher.verify.return_value = True
+    user_service.password_hasher.needs_rehash.return_value = True
+    user_service.password_hasher.hash.return_value = "scrypt:32768:8:1$salt$newhash"
+
+    authenticated_user = user_service.authenticate_user("authuser", "authpassword")
+
+    assert authenticated_user == mock_user
+    for _ in range(100):
+        if user_service.user_repo.update_password_hash.called:
+            break
+        time.sleep(0.01)
+    # Conditional on the hash that was just verified
+    user_service.user_repo.update_password_hash.assert_called_once_with(
+        "user123", "pbkdf2:sha256:1000$salt$hash", "scrypt:32768:8:1$salt$newhash"
+    )
+    user_service.password_hasher.hash.assert_called_once_with("authpassword")
+    user_service.user_repo.update_user.assert_not_called()
+
+def test_concurrent_logins_schedule_one_rehash(user_service):
+    """Test that logins while an upgrade is pending do not queue more KDF runs."""
+    mock_user = {"id": "user123", "username": "authuser", "password_hash": "pbkdf2:sha256:1000$salt$hash"}
+    user_service.user_repo.get_user_by_username.return_value = mock_user
+    user_service.password_hasher.verify.return_value = True
+    user_service.password_hasher.needs_rehash.return_value = True
+    release = threading.Event()
+    user_service.password_hasher.hash.side_effect = lambda password: release.wait(5) and "scrypt:32768:8:1$salt$newhash"
+
+    for _ in range(5):
+        assert user_service.authenticate_user("authuser", "authpassword") == mock_user
+    release.set()
+    user_service._rehash_executor.shutdown(wait=True)
+
+    user_service.password_hasher.hash.assert_called_once_with("authpassword")
+    user_service.user_repo.update_password_hash.assert_called_once()
+    assert user_service._rehashing == set()
 
 def test_authenticate_user_fail_wrong_password(user_service):
     """Test user authentication with wrong password."""
@@ -73,9 +119,9 @@ def test_authenticate_user_fail_wrong_password(user_service):
     mock_user = {"username": username, "password_hash": hashed_password}
     user_service.user_repo.get_user_by_username.return_value = mock_user
 
-    with patch('app.services.user_service.check_password_hash', return_value=False):
-        authenticated_user = user_service.authenticate_user(username, password)
-        assert authenticated_user is None
+    user_service.password_hasher.verify.return_value = False
+    authenticated_user = user_service.authenticate_user(username, password)
+    assert authenticated_user is None
 
 def test_authenticate_user_fail_user_not_found(user_service):
     """Test user authentication when user is not found."""
@@ -85,4 +131,91 @@ def test_authenticate_user_fail_user_not_found(user_service):
     user_service.user_repo.get_user_by_username.return_value = None
 
     authenticated_user = user_service.authenticate_user(username, password)
-    assert authenticated_user is None
\ No newline at end of file
+    assert authenticated_user is None
+
+def test_update_user_profile_returns_the_repository_result(user_service):
+    """Test that only profile fields are passed on and a taken username is reported."""
+    user_service.user_repo.update_user.return_value = (None, "Username already exists")
+
+    result = user_service.update_user_profile("user123", {"username": "taken", "email": "new@example.com", "id": "other"})
+
+    assert result == (None, "Username already exists")
+    user_service.user_repo.update_user.assert_called_once_with("user123", {"username": "taken", "email": "new@example.com"})
+
+def test_delete_user_success(user_service):
+    """Test deleting a user after cascading to their todos."""
+    calls = []
+    user_service.todo_repo.delete_todos_by_user_id.side_effect = lambda *args, **kwargs: calls.append('todos') or (2, [])
+    user_service.user_repo.delete_user.side_effect = lambda user_id: calls.append('user') or True
+
+    result = user_service.delete_user("user123")
+
+    assert result is True
+    assert calls == ['todos', 'user']
+    user_service.user_repo.get_user_by_id.assert_not_called()
+    user_service.user_repo.delete_user.assert_called_once_with("user123")
+    assert user_service.todo_repo.delete_todos_by_user_id.call_args.args == ("user123",)
+    user_service.todo_repo.delete_todo.assert_not_called()
+    user_service.token_blocklist.revoke_user.assert_called_once_with("user123")
+
+def test_delete_user_not_found(user_service):
+    """Test deleting a user that does not exist."""
+    user_service.todo_repo.delete_todos_by_user_id.return_value = (0, [])
+    user_service.user_repo.delete_user.return_value = False
+
+    result = user_service.delete_user("nonexistent")
+
+    assert result is False
+    user_service.token_blocklist.revoke_user.assert_not_called()
+
+def test_delete_user_keeps_user_when_cascade_fails(user_service):
+    """Test that the user is not deleted while some of their todos remain."""
+    user_service.todo_repo.delete_todos_by_user_id.return_value = (8, ["todo9", "todo10"])
+
+    with pytest.raises(UserDeletionError):
+        user_service.delete_user("user123")
+
+    user_service.user_repo.delete_user.assert_not_called()
+    user_service.token_blocklist.revoke_user.assert_not_called()
+
+def _wait_for_job(user_service, job_id):
+    for _ in range(100):
+        job = user_service.get_deletion_job(job_id)
+        if job['state'] in ('completed', 'failed'):
+            return job
+        time.sleep(0.01)
+    return job
+
+def test_delete_user_in_background(user_service):
+    """Test that the cascade and then the user delete run as a pollable background job."""
+    user_service.user_repo.get_user_by_id.return_value = {"id": "user123"}
+    user_service.todo_repo.delete_todos_by_user_id.return_value = (3, [])
+
+    job_id = user_service.delete_user_in_background("user123")
+    assert job_id is not None
+
+    job = _wait_for_job(user_service, job_id)
+    assert job['state'] == 'completed'
+    assert job['owner_id'] == "user123"
+    assert job['progress'] == {"deleted": 3, "failed": 0}
+    user_service.user_repo.delete_user.assert_called_once_with("user123")
+    user_service.token_blocklist.revoke_user.assert_called_once_with("user123")
+
+def test_delete_user_in_background_keeps_user_when_cascade_fails(user_service):
+    """Test that a failed cascade fails the job and leaves the user in place."""
+    user_service.user_repo.get_user_by_id.return_value = {"id": "user123"}
+    user_service.todo_repo.delete_todos_by_user_id.return_value = (1, ["todo2"])
+
+    job = _wait_for_job(user_service, user_service.delete_user_in_background("user123"))
+
+    assert job['state'] == 'failed'
+    user_service.user_repo.delete_user.assert_not_called()
+    user_service.token_blocklist.revoke_user.assert_not_called()
+
+def test_delete_user_in_background_not_found(user_service):
+    """Test that no job is started for a missing user."""
+    user_service.user_repo.get_user_by_id.return_value = None
+
+    assert user_service.delete_user_in_background("nonexistent") is None
+    user_service.todo_repo.delete_todos_by_user_id.assert_not_called()
+    user_service.user_repo.delete_user.assert_not_called()
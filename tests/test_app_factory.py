@@ -0,0 +1,136 @@
+from flask_jwt_extended import create_access_token
+from app import create_app
+
+def test_create_app_uses_named_config():
+    """Test that the factory applies the named configuration."""
+    app = create_app('testing')
+
+    assert app.config['TESTING'] is True
+    assert app.config['PASSWORD_HASH_BACKEND'] == 'inline'
+
+def test_create_app_registers_namespaces_and_commands():
+    """Test that all namespaces and CLI commands are registered."""
+    app = create_app('testing')
+    rules = {rule.rule for rule in app.url_map.iter_rules()}
+
+    assert '/auth/login' in rules
+    assert '/users/' in rules
+    assert '/todos/' in rules
+    assert {'export-users', 'bench-kdf', 'seed-data', 'provision-tables', 'reserve-usernames'} <= set(app.cli.commands)
+
+def test_protected_endpoint_returns_401_without_token():
+    """Test that JWT errors are not turned into 500s when DEBUG is off."""
+    app = create_app('production')
+    app.config['JWT_SECRET_KEY'] = 'test-secret-key-that-is-long-enough'
+
+    response = app.test_client().get('/todos/')
+
+    assert response.status_code == 401
+
+def test_metrics_endpoint_reports_process_counters():
+    """Test that the metrics endpoint requires a token and exposes pool and cache counters."""
+    app = create_app('testing')
+    app.config['JWT_SECRET_KEY'] = 'test-secret-key-that-is-long-enough'
+    with app.app_context():
+        token = create_access_token(identity="metrics-reader")
+
+    assert app.test_client().get('/metrics/').status_code == 401
+    response = app.test_client().get('/metrics/', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 200
+    assert set(response.json) == {'dynamodb_connections', 'user_cache', 'todo_list_cache', 'jwt_verification_cache'}
+    assert 'pool_miss_ratio' in response.json['dynamodb_connections']
+
+def test_memory_backend_is_seeded_only_on_request(mocker):
+    """Test that create_app seeds the memory backend when MEMORY_SEED_USERS is set."""
+    mock_seed_service = mocker.patch('app.services.seed_service.SeedService')
+    mocker.patch('config.TestingConfig.STORAGE_BACKEND', 'memory')
+
+    create_app('testing')
+    mock_seed_service.return_value.seed.assert_not_called()
+
+    mocker.patch('config.TestingConfig.MEMORY_SEED_USERS', 5)
+    create_app('testing')
+    mock_seed_service.return_value.seed.assert_called_once_with(5, 3, 'password123')
+
+def test_seed_data_writes_to_the_app_repositories(mocker):
+    """Test that seed-data uses the app's own configuration and repositories."""
+    mocker.patch('config.TestingConfig.STORAGE_BACKEND', 'memory')
+    app = create_app('testing')
+
+    with app.app_context():
+        result = app.test_cli_runner().invoke(args=['seed-data', '--users', '3', '--todos-per-user', '2', '--batch-size', '2'])
+
+    assert result.exit_code == 0
+    assert "Created 3 users and 6 todos." in result.output
+    assert app.extensions['services'].user_repo.get_user_by_username("testuser3") is not None
+
+def test_provision_tables_uses_the_app_config(mocker):
+    """Test that provision-tables reads the settings of the app it runs in."""
+    mock_provision = mocker.patch('app.repositories.provisioning.provision_tables')
+    app = create_app('testing')
+    app.config['DYNAMODB_USERS_TABLE_NAME'] = 'app-users'
+
+    with app.app_context():
+        result = app.test_cli_runner().invoke(args=['provision-tables'])
+
+    assert result.exit_code == 0
+    assert mock_provision.call_args.args[0].DYNAMODB_USERS_TABLE_NAME == 'app-users'
+
+def test_background_user_deletion_can_be_polled_with_the_same_token(mocker):
+    """Test that the token that starts a background deletion can poll it until the user is gone."""
+    import threading
+    import time
+    mocker.patch('config.TestingConfig.STORAGE_BACKEND', 'memory')
+    app = create_app('testing')
+    app.config['JWT_SECRET_KEY'] = 'test-secret-key-that-is-long-enough'
+    client = app.test_client()
+    client.post('/auth/signup', json={'username': 'leaving', 'password': 'password123'})
+    login = client.post('/auth/login', json={'username': 'leaving', 'password': 'password123'}).json
+    headers = {'Authorization': f"Bearer {login['access_token']}"}
+    user_id = app.extensions['services'].user_repo.get_user_by_username('leaving')['id']
+    todo_repo = app.extensions['services'].todo_repo
+    cascade_started, release_cascade = threading.Event(), threading.Event()
+    delete_todos = todo_repo.delete_todos_by_user_id
+
+    def blocking_delete_todos(*args, **kwargs):
+        cascade_started.set()
+        release_cascade.wait(5)
+        return delete_todos(*args, **kwargs)
+    mocker.patch.object(todo_repo, 'delete_todos_by_user_id', side_effect=blocking_delete_todos)
+
+    response = client.delete(f'/users/{user_id}?background=true', headers=headers)
+    assert response.status_code == 202
+    job_url = f"/users/{user_id}/deletion-jobs/{response.json['job_id']}"
+    assert cascade_started.wait(5)
+
+    poll = client.get(job_url, headers=headers)
+    assert poll.status_code == 200
+    assert poll.json['state'] == 'running'
+
+    release_cascade.set()
+    for _ in range(100):
+        if client.get(job_url, headers=headers).status_code == 401:
+            break
+        time.sleep(0.01)
+    assert client.get(job_url, headers=headers).status_code == 401
+    assert app.extensions['services'].user_repo.get_user_by_id(user_id) is None
+
+def test_reserve_usernames_uses_the_app_repository(mocker):
+    """Test that reserve-usernames backfills through the app's user repository."""
+    mocker.patch('config.TestingConfig.STORAGE_BACKEND', 'memory')
+    app = create_app('testing')
+
+    with app.app_context():
+        result = app.test_cli_runner().invoke(args=['reserve-usernames'])
+    assert result.exit_code == 1
+    assert 'STORAGE_BACKEND=dynamodb' in result.output
+
+    user_repo = app.extensions['services'].user_repo = mocker.MagicMock()
+    user_repo.reserve_usernames.return_value = (3, [])
+    with app.app_context():
+        result = app.test_cli_runner().invoke(args=['reserve-usernames', '--segments', '2'])
+
+    assert result.exit_code == 0
+    user_repo.reserve_usernames.assert_called_once_with(2, app.config['USER_EXPORT_PAGE_SIZE'])
+    assert 'USERNAME_INDEX_FALLBACK=False' in result.output
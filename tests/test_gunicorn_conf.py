@@ -0,0 +1,41 @@
+import importlib.util
+import os
+import pytest
+from types import SimpleNamespace
+from config import per_process_backends
+
+GUNICORN_CONF = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'gunicorn.conf.py')
+
+def _settings(**overrides):
+    settings = {'STORAGE_BACKEND': 'dynamodb', 'CACHE_BACKEND': 'redis', 'JWT_BLOCKLIST_BACKEND': 'redis'}
+    settings.update(overrides)
+    return SimpleNamespace(**settings)
+
+def _load_gunicorn_conf():
+    spec = importlib.util.spec_from_file_location('gunicorn_conf', GUNICORN_CONF)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def _server(workers):
+    return SimpleNamespace(cfg=SimpleNamespace(workers=workers))
+
+def test_per_process_backends():
+    """Test that every memory backend is reported."""
+    assert per_process_backends(_settings()) == []
+    assert per_process_backends(_settings(STORAGE_BACKEND='sqlite')) == []
+    assert per_process_backends(_settings(STORAGE_BACKEND='memory', JWT_BLOCKLIST_BACKEND='memory')) == [
+        'STORAGE_BACKEND=memory', 'JWT_BLOCKLIST_BACKEND=memory'
+    ]
+
+def test_gunicorn_refuses_per_process_backends_with_several_workers():
+    """Test that Gunicorn stops before forking workers that would not share state."""
+    conf = _load_gunicorn_conf()
+    conf.current_config = _settings(CACHE_BACKEND='memory')
+
+    with pytest.raises(RuntimeError, match='CACHE_BACKEND=memory'):
+        conf.on_starting(_server(workers=3))
+    conf.on_starting(_server(workers=1))
+
+    conf.current_config = _settings()
+    conf.on_starting(_server(workers=3))
@@ -0,0 +1,67 @@
+import inspect
+import pytest
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+from app.jwt_cache import CachingJWTManager, VerifiedTokenCache
+
+@pytest.fixture
+def app():
+    """A minimal app with one protected endpoint behind the caching JWTManager."""
+    app = Flask(__name__)
+    app.config['JWT_SECRET_KEY'] = 'test-secret-key-that-is-long-enough'
+    CachingJWTManager(app, max_entries=2)
+
+    @app.route('/me')
+    @jwt_required()
+    def me():
+        return {'user_id': get_jwt_identity()}
+
+    return app
+
+def _get_me(app, token):
+    return app.test_client().get('/me', headers={'Authorization': f'Bearer {token}'})
+
+def test_override_matches_the_private_jwt_manager_method():
+    """Fails when a Flask-JWT-Extended upgrade changes the private method CachingJWTManager overrides."""
+    def parameters(function):
+        return [(name, parameter.kind, parameter.default) for name, parameter in inspect.signature(function).parameters.items()]
+
+    assert parameters(CachingJWTManager._decode_jwt_from_config) == parameters(JWTManager._decode_jwt_from_config)
+
+def test_repeated_token_is_verified_once(app, mocker):
+    """Test that the second request with a token is served from the cache."""
+    with app.app_context():
+        token = create_access_token(identity='user1')
+    token_cache = app.extensions['flask-jwt-extended'].token_cache
+    verify = mocker.spy(JWTManager, '_decode_jwt_from_config')
+
+    assert _get_me(app, token).json == {'user_id': 'user1'}
+    assert _get_me(app, token).json == {'user_id': 'user1'}
+
+    assert verify.call_count == 1
+    assert token_cache.stats() == {'entries': 1, 'hits': 1, 'verifications': 1}
+
+def test_invalid_tokens_are_never_cached(app):
+    """Test that a token failing verification is rejected every time."""
+    with app.app_context():
+        token = create_access_token(identity='user1')
+    tampered = token[:-2] + ('AA' if not token.endswith('AA') else 'BB')
+
+    assert _get_me(app, tampered).status_code == 422
+    assert _get_me(app, tampered).status_code == 422
+    assert app.extensions['flask-jwt-extended'].token_cache.stats()['entries'] == 0
+
+def test_cache_respects_exp_and_max_entries():
+    """Test that entries expire with the token and the least recently used entry is evicted."""
+    now = [1000.0]
+    token_cache = VerifiedTokenCache(max_entries=2, clock=lambda: now[0])
+    token_cache.set('a', {'sub': 'a', 'exp': 1010})
+    token_cache.set('b', {'sub': 'b', 'exp': 2000})
+    token_cache.get('a')
+    token_cache.set('c', {'sub': 'c', 'exp': 2000})
+
+    assert token_cache.get('b') is None
+    assert token_cache.get('a') == {'sub': 'a', 'exp': 1010}
+    now[0] = 1010.0
+    assert token_cache.get('a') is None
+    assert token_cache.get('c')['sub'] == 'c'